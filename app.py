@@ -1,5 +1,5 @@
 import os
-from flask import Flask, render_template
+from flask import Flask, Response, render_template
 from config import Config
 from extensions import db, bcrypt, cors, mail # Note: We don't import 'jwt' here to avoid conflict
 from flask_migrate import Migrate
@@ -11,7 +11,6 @@ from models import User, Vehicle, ParkingLot, ParkingSpot, ParkingTransaction, S
 # Import Blueprints
 from blueprints.auth import auth_bp
 from blueprints.admin import admin_bp
-from blueprints.gate import gate_bp
 from blueprints.user import user_bp
 
 def create_app():
@@ -34,10 +33,16 @@ def create_app():
     
     migrate = Migrate(app, db)
 
+    from services import metrics
+    metrics.configure(app.config)
+
     # 3. REGISTER BLUEPRINTS
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
-    app.register_blueprint(gate_bp, url_prefix='/api/gate')
+    # Gate is optional: admin/user-only servers and CLI scripts skip its OCR stack entirely
+    if app.config['ENABLE_GATE']:
+        from blueprints.gate import gate_bp
+        app.register_blueprint(gate_bp, url_prefix='/api/gate')
     
     # Note: We use '/user' instead of '/api/user' for the dashboard URL to look cleaner
     app.register_blueprint(user_bp, url_prefix='/user') 
@@ -55,24 +60,23 @@ def create_app():
                 return None
         return dict(get_jwt_identity=safe_get_jwt_identity)
 
-    # Helper to sort parking spots numerically
-    @app.context_processor
-    def utility_processor():
-        def spot_sorter(spots):
-            return sorted(spots, key=lambda x: x.spot_number)
-        return dict(spot_sorter=spot_sorter)
-
     # 5. ROOT ROUTE
     @app.route('/')
     def index():
         return render_template('auth/login.html')
 
+    # 6. METRICS (Prometheus scrape target; gate stage latencies + denial counters)
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
     return app
 
 app = create_app()
 
 # --- 🌱 DATABASE SEEDER ---
 def seed_database():
+    from services import provisioning
     with app.app_context():
         db.create_all()
         
@@ -93,16 +97,9 @@ def seed_database():
                 db.session.add(lot)
                 db.session.commit() # Commit individually to guarantee ID order 1-5
                 
-                # Generate Spots
-                for i in range(1, caps + 1):
-                    # Faculty Reservation Logic (First 20%)
-                    is_reserved = (i <= (caps * 0.2))
-                    spot = ParkingSpot(
-                        lot_id=lot.lot_id, 
-                        spot_number=i,
-                        reserved_for_faculty=is_reserved
-                    )
-                    db.session.add(spot)
+                # Generate Spots (Faculty Reservation Logic: first SPOT_RESERVED_RATIO, 20% by default)
+                provisioning.add_spots(lot.lot_id, 1, caps,
+                                       reserved=provisioning.reserved_rule(caps, app.config['SPOT_RESERVED_RATIO']))
             db.session.commit()
             print("✅ 5 Lots Created (Inc. Mech Lot).")
 
@@ -126,4 +123,17 @@ def seed_database():
 
 if __name__ == '__main__':
     seed_database()
+    # debug=True runs this file twice: the reloader's watcher, then the child that serves
+    # (WERKZEUG_RUN_MAIN=true). Only the serving process gets a sender and the OCR stack.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from services import outbox
+        outbox.get_sender(app) # Deliver mail left in the outbox by the previous run
+        if app.config['ENABLE_GATE']:
+            from services import plate_index
+            with app.app_context():
+                plate_index.ensure_built() # The first fuzzy match doesn't pay for loading every vehicle
+        if app.config['ENABLE_GATE'] and app.config['GATE_WARMUP']:
+            from blueprints.gate import warm_up
+            with app.app_context():
+                warm_up() # Load OCR workers + allocator before the first scan
     app.run(debug=True, port=5000)
\ No newline at end of file
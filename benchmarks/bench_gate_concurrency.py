@@ -0,0 +1,327 @@
+"""
+Concurrent gate stress test: many threads drive entry / exit at once and the
+database must never end up with a double-booked spot or a car inside twice.
+
+Usage:  python benchmarks/bench_gate_concurrency.py [--threads 8] [--seconds 10] [--vehicles 120] [--spots 40]
+                                                   [--processes 1]
+
+Runs the real gate endpoints through the Flask test client on a throwaway SQLite
+database, using the manual plate / manual ID inputs so no camera or OCR model is
+needed. Every thread picks random vehicles and either enters them (plate scan,
+then ID scan for students) or exits them. Afterwards the spot and transaction
+tables are checked for consistency; the script exits non-zero on any violation.
+
+--processes N starts N gate processes (each its own app, spot allocator and gate
+journal, --threads threads apiece) against the same SQLite file, the way several
+gate servers share one database, and checks the same invariants across all of them.
+It then runs two cases with long-lived processes that random traffic rarely hits:
+a car leaves through one gate process and another one, which saw the campus full,
+admits the next car; and a spot is reserved from an admin process without the
+gate (ENABLE_GATE=0) while a gate process still has it free for students.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ['ENABLE_GATE'] = '0' if '--gate-less' in sys.argv else '1'   # Read by config at import
+
+import config
+
+DB_DIR = os.environ.get('GATE_STRESS_DIR') or tempfile.mkdtemp(prefix='gate_stress_')   # Shared with --processes workers
+config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(DB_DIR, 'stress.db')
+config.Config.MAIL_SUPPRESS_SEND = True
+config.Config.GATE_JOURNAL_PATH = os.path.join(DB_DIR, 'gate_journal.jsonl')
+
+from app import app
+from extensions import db, bcrypt
+from models import User, Vehicle, ParkingLot, ParkingSpot, ParkingTransaction
+
+
+ADMIN_EMAIL, ADMIN_PASSWORD = "admin@gate-stress.local", "stress"
+REPLY = "@@ "   # Marks a --serve reply; the app prints its own lines on stdout too
+
+
+def seed(vehicles, spots, lots=2, faculty_share=0.2):
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(name="Admin", email=ADMIN_EMAIL, phone="9", role='admin', department="ADMIN",
+                            password_hash=bcrypt.generate_password_hash(ADMIN_PASSWORD).decode('utf-8')))
+        per_lot = max(1, spots // lots)
+        for i in range(lots):
+            lot = ParkingLot(location=f"Lot {i + 1}", number_of_spots=per_lot)
+            db.session.add(lot); db.session.commit()
+            for n in range(1, per_lot + 1):
+                db.session.add(ParkingSpot(lot_id=lot.lot_id, spot_number=n, reserved_for_faculty=n <= per_lot * 0.2))
+        db.session.commit()
+
+        plates = []
+        for i in range(vehicles):
+            faculty = i < vehicles * faculty_share
+            user = User(name=f"User {i}", email=f"u{i}@rvce.edu.in", phone="9", password_hash="x",
+                        usn=None if faculty else f"1RV22CS{i:03d}", role='faculty' if faculty else 'student',
+                        department='CSE', preferences=",".join(str(l + 1) for l in random.sample(range(lots), lots)))
+            db.session.add(user); db.session.commit()
+            plate = f"KA{i % 100:02d}ST{1000 + i}"
+            db.session.add(Vehicle(license_plate=plate, type='car', user_id=user.user_id))
+            plates.append((plate, user.usn))
+        db.session.commit()
+        # Vehicle fills plate_canonical itself; the gate's exact match finds nobody without it
+        assert not Vehicle.query.filter_by(plate_canonical=None).count(), "vehicles seeded without plate_canonical"
+    return plates
+
+
+def enter(client, plate, usn):
+    """Plate scan, then the ID scan for students; returns (status code, reply) of the last step."""
+    resp = client.post('/api/gate/scan_plate_entry', json={"manual_plate": plate})
+    data = resp.get_json() or {}
+    if data.get("status") == "step1_success":
+        resp = client.post('/api/gate/verify_id_and_grant', json={"plate": plate, "expected_usn": usn, "manual_id": usn})
+        data = resp.get_json() or {}
+    return resp.status_code, data
+
+
+def leave(client, plate):
+    resp = client.post('/api/gate/scan_exit_id', json={"manual_id": plate})
+    return resp.status_code, resp.get_json() or {}
+
+
+def worker(plates, deadline, counts, latencies, seed_value):
+    rng = random.Random(seed_value)
+    client = app.test_client()
+    while time.time() < deadline:
+        plate, usn = rng.choice(plates)
+        started = time.perf_counter()
+        if rng.random() < 0.6:
+            code, data = enter(client, plate, usn)
+            key = f"entry {code} {data.get('msg') if code != 200 else data.get('status')}"
+        else:
+            code, data = leave(client, plate)
+            key = f"exit {code} {data.get('status')}"
+        latencies.append(time.perf_counter() - started)
+        counts[key] += 1
+
+
+def check_consistency():
+    problems = []
+    with app.app_context():
+        # Writes that missed GATE_DB_DEADLINE under contention went to the gate journal; apply them first
+        from services import gate_journal
+        journal = gate_journal.get_journal(app)
+        journaled = journal.journaled
+        journal.reconcile()
+        open_txns = ParkingTransaction.query.filter_by(exit_time=None).all()
+        by_spot = Counter((t.lot_id, t.spot_number) for t in open_txns)
+        by_plate = Counter(t.license_plate for t in open_txns)
+        problems += [f"spot {k} booked {n}x" for k, n in by_spot.items() if n > 1]
+        problems += [f"plate {k} inside {n}x" for k, n in by_plate.items() if n > 1]
+        occupied = {(s.lot_id, s.spot_number) for s in ParkingSpot.query.filter_by(status='occupied')}
+        problems += [f"spot {k} has an open transaction but is not occupied" for k in set(by_spot) - occupied]
+        problems += [f"spot {k} is occupied without an open transaction" for k in occupied - set(by_spot)]
+    return problems, len(open_txns), journaled
+
+
+def run_threads(plates, threads, seconds, seed_value, start_at=None):
+    """Drives the gate from `threads` threads until `seconds` after start_at; returns (counts, latencies, elapsed)."""
+    counts = Counter(); latencies = []
+    if start_at: time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + seconds
+    pool = [threading.Thread(target=worker, args=(plates, deadline, counts, latencies, seed_value + i))
+            for i in range(threads)]
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # The gate prints a line per email
+        for t in pool: t.start()
+        for t in pool: t.join()
+    return counts, latencies, time.perf_counter() - t0
+
+
+def run_processes(args, plates):
+    """
+    One worker process per --processes, all on DB_DIR's database. Workers wait for a
+    common start time, so they all import the app first and then hit the gate together.
+    """
+    with open(os.path.join(DB_DIR, 'plates.json'), 'w') as f: json.dump(plates, f)
+    env = dict(os.environ, GATE_STRESS_DIR=DB_DIR)
+    start_at = time.time() + 5 + args.processes   # Time for every worker to import the app and the gate
+    workers = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--worker',
+                                 '--threads', str(args.threads), '--seconds', str(args.seconds),
+                                 '--seed', str(args.seed + 1000 * (i + 1)), '--start-at', str(start_at)],
+                                env=env, stdout=subprocess.PIPE, text=True)
+               for i in range(args.processes)]
+    counts = Counter(); latencies = []; elapsed = journaled = 0
+    for proc in workers:
+        out, _ = proc.communicate()
+        result = json.loads(out.strip().splitlines()[-1])   # Last line; the app prints warnings before it
+        counts.update(result['counts']); latencies += result['latencies']; journaled += result['journaled']
+        elapsed = max(elapsed, result['elapsed'])
+    return counts, latencies, elapsed, journaled
+
+
+def worker_process(args):
+    """--worker: drive the gate of this process, apply its own journal, report on the last stdout line."""
+    with open(os.path.join(DB_DIR, 'plates.json')) as f: plates = [tuple(p) for p in json.load(f)]
+    counts, latencies, elapsed = run_threads(plates, args.threads, args.seconds, args.seed, start_at=args.start_at)
+    with app.app_context():
+        from services import gate_journal
+        journal = gate_journal.get_journal(app)
+        journaled = journal.journaled
+        journal.reconcile()   # Whatever fails here is adopted by the parent's journal in check_consistency()
+    print(json.dumps({"counts": counts, "latencies": latencies, "elapsed": elapsed, "journaled": journaled}))
+
+
+def serve(args):
+    """
+    --serve: a long-lived gate (or, with --gate-less, admin-only) process for run_scenarios().
+    Reads one JSON call per stdin line and answers each on a line starting with REPLY.
+    """
+    client = app.test_client()
+    if args.gate_less:
+        client.post('/api/auth/login', data={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    for line in sys.stdin:
+        call = json.loads(line)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if call["op"] == 'entry': code, data = enter(client, call["plate"], call["usn"])
+            elif call["op"] == 'exit': code, data = leave(client, call["plate"])
+            else: code, data = client.post(f'/api/admin/toggle_faculty/{call["lot_id"]}/{call["spot_number"]}').status_code, {}
+        print(REPLY + json.dumps({"code": code, **data}), flush=True)
+
+
+class Process:
+    """Parent side of a --serve process."""
+
+    def __init__(self, name, gate=True):
+        self.name = name
+        argv = [sys.executable, os.path.abspath(__file__), '--serve'] + ([] if gate else ['--gate-less'])
+        self.proc = subprocess.Popen(argv, env=dict(os.environ, GATE_STRESS_DIR=DB_DIR),
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+    def call(self, op, **kwargs):
+        self.proc.stdin.write(json.dumps(dict(kwargs, op=op)) + "\n"); self.proc.stdin.flush()
+        for line in self.proc.stdout:
+            if line.startswith(REPLY): return json.loads(line[len(REPLY):])
+        raise RuntimeError(f"{self.name} exited")
+
+    def close(self):
+        self.proc.stdin.close(); self.proc.wait()
+
+
+def parked():
+    """plate -> (lot_id, spot_number, reserved_for_faculty) for every car inside, from the database."""
+    with app.app_context():
+        rows = db.session.query(ParkingTransaction.license_plate, ParkingSpot.lot_id, ParkingSpot.spot_number,
+                                ParkingSpot.reserved_for_faculty) \
+                         .join(ParkingSpot, (ParkingSpot.lot_id == ParkingTransaction.lot_id) &
+                                            (ParkingSpot.spot_number == ParkingTransaction.spot_number)) \
+                         .filter(ParkingTransaction.exit_time == None).all()
+    return {plate: (lot_id, spot_number, reserved) for plate, lot_id, spot_number, reserved in rows}
+
+
+def free_spots():
+    with app.app_context():
+        return ParkingSpot.query.filter_by(status='available').count()
+
+
+def run_scenarios(plates):
+    """
+    Each process only hears about its own writes, so these check that the gate goes back
+    to the database before it says "Campus Full" or hands a student a spot. Returns problems.
+    """
+    problems = []
+    gate_a, gate_b, admin = Process("gate A"), Process("gate B"), Process("admin", gate=False)
+    try:
+        # Fill the campus through gate A: students take the open spots, faculty the reserved ones
+        for plate, usn in sorted(plates, key=lambda p: p[1] is None):
+            if not free_spots(): break
+            if plate not in parked(): gate_a.call('entry', plate=plate, usn=usn)
+        inside = parked()
+        waiting = [p for p in plates if p[0] not in inside]
+        faculty = [p for p in waiting if p[1] is None]
+        students = [p for p in waiting if p[1] is not None]
+        if free_spots() or len(faculty) < 2 or not students:
+            return [f"scenarios need a full campus and cars outside; raise --vehicles above {len(plates)}"]
+
+        # 1. Gate B sees the campus full, a car leaves through gate A, gate B admits the next car
+        reply = gate_b.call('entry', plate=faculty[0][0], usn=None)
+        if reply.get("msg") != "Campus Full": problems.append(f"full campus: gate B answered {reply}")
+        leaving = next(iter(inside))
+        gate_a.call('exit', plate=leaving)
+        reply = gate_b.call('entry', plate=faculty[1][0], usn=None)
+        if reply.get("status") != "allowed":
+            problems.append(f"spot {inside[leaving][:2]} freed through gate A, but gate B answered {reply}")
+
+        # 2. A spot gate B knows as free and open is reserved from the gate-less admin process
+        plate = next(p for p, (_, _, reserved) in parked().items() if not reserved)
+        lot_id, spot_number, _ = parked()[plate]
+        gate_b.call('exit', plate=plate)
+        admin.call('toggle', lot_id=lot_id, spot_number=spot_number)
+        with app.app_context():
+            if not ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number).one().reserved_for_faculty:
+                problems.append(f"admin process did not reserve spot {(lot_id, spot_number)}")
+        student = students[0][0]
+        reply = gate_b.call('entry', plate=student, usn=students[0][1])
+        spot = parked().get(student)
+        if spot and spot[2]: problems.append(f"student {student} given reserved spot {spot[:2]}")
+        elif reply.get("msg") != "Campus Full": problems.append(f"only a reserved spot is free, but gate B answered {reply}")
+    finally:
+        for process in (gate_a, gate_b, admin): process.close()
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8, help="Gate threads (per process with --processes)")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--vehicles', type=int, default=120)
+    parser.add_argument('--spots', type=int, default=40)
+    parser.add_argument('--processes', type=int, default=1, help="Gate processes sharing one SQLite file")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--gate-less', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    if args.worker:
+        worker_process(args)
+        sys.exit(0)
+    if args.serve:
+        serve(args)
+        sys.exit(0)
+
+    plates = seed(args.vehicles, args.spots)
+    scenario_problems = []
+    if args.processes > 1:
+        counts, latencies, elapsed, journaled = run_processes(args, plates)
+        check_consistency()   # Replays what the workers left journaled before the scenarios start
+        scenario_problems = run_scenarios(plates)
+    else:
+        counts, latencies, elapsed = run_threads(plates, args.threads, args.seconds, args.seed)
+        journaled = 0
+
+    problems, inside, journaled_here = check_consistency()
+    problems = scenario_problems + problems
+    journaled += journaled_here
+    latencies.sort()
+    print(f"processes / threads        : {args.processes} / {args.threads}{' each' if args.processes > 1 else ''}")
+    print(f"vehicles / spots           : {args.vehicles} / {args.spots}")
+    print(f"gate operations            : {len(latencies)} in {elapsed:.1f}s = {len(latencies) / elapsed:.0f} ops/s")
+    if latencies:
+        print(f"latency p50 / p99          : {latencies[len(latencies) // 2] * 1000:.1f} / "
+              f"{latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    for key, n in sorted(counts.items()): print(f"  {key:<40} {n}")
+    print(f"cars inside at the end     : {inside}")
+    print(f"decisions journaled        : {journaled}  (DB write missed GATE_DB_DEADLINE, replayed before the check)")
+    if problems:
+        for p in problems[:20]: print(f"❌ {p}")
+        sys.exit(1)
+    print("✅ No double-booked spots, no car inside twice, spot status matches open transactions")
@@ -0,0 +1,103 @@
+"""
+Gate latency with the email outbox vs. the old synchronous mail.send.
+
+Usage:  python benchmarks/bench_outbox.py [--cars 50] [--smtp-delay 0.3] [--fail-every 0]
+
+Starts tools/fake_smtp.py with `--smtp-delay` seconds per connection (roughly a
+TLS handshake + login to smtp.gmail.com), then admits `--cars` faculty cars
+through /api/gate/scan_plate_entry on a throwaway SQLite database. Reports the
+gate's response time, then waits for the background sender to drain the outbox
+and reports how many SMTP connections it needed. For comparison it also times
+one synchronous mail.send per car, which is what every entry used to wait for.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+os.environ['ENABLE_GATE'] = '1'
+
+from fake_smtp import start_fake_smtp
+import config
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cars', type=int, default=50)
+    parser.add_argument('--smtp-delay', type=float, default=0.3)
+    parser.add_argument('--fail-every', type=int, default=0, help="Fake SMTP rejects every Nth message (retries)")
+    parser.add_argument('--sync-samples', type=int, default=5)
+    args = parser.parse_args()
+
+    smtp, port = start_fake_smtp(delay=args.smtp_delay, fail_every=args.fail_every)
+    db_dir = tempfile.mkdtemp()
+    config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'outbox.db')
+    config.Config.GATE_JOURNAL_PATH = os.path.join(db_dir, 'gate_journal.jsonl')
+    config.Config.MAIL_SERVER, config.Config.MAIL_PORT, config.Config.MAIL_USE_TLS = '127.0.0.1', port, False
+    config.Config.OUTBOX_BACKOFF = 0.2
+    config.Config.OUTBOX_POLL_INTERVAL = 0.2
+
+    from app import app
+    from extensions import db, mail
+    from models import User, Vehicle, ParkingLot, ParkingSpot, OutboxEmail
+    from services import outbox
+    from flask_mail import Message
+
+    with app.app_context():
+        db.create_all()
+        lot = ParkingLot(location="Bench Lot", number_of_spots=args.cars)
+        db.session.add(lot); db.session.commit()
+        db.session.add_all([ParkingSpot(lot_id=lot.lot_id, spot_number=n) for n in range(1, args.cars + 1)])
+        for i in range(args.cars):
+            user = User(name=f"Prof {i}", email=f"prof{i}@rvce.edu.in", phone="9", password_hash="x",
+                        role='faculty', department='CSE', preferences=str(lot.lot_id))
+            db.session.add(user); db.session.commit()
+            db.session.add(Vehicle(license_plate=f"KA01FC{1000 + i}", type='car', user_id=user.user_id))
+        db.session.commit()
+        # Vehicle fills plate_canonical itself; the gate's exact match finds nobody without it
+        assert not Vehicle.query.filter_by(plate_canonical=None).count(), "vehicles seeded without plate_canonical"
+
+    client = app.test_client()
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.cars):
+            started = time.perf_counter()
+            resp = client.post('/api/gate/scan_plate_entry', json={"manual_plate": f"KA01FC{1000 + i}"})
+            latencies.append(time.perf_counter() - started)
+            assert resp.status_code == 200, resp.get_json()
+
+    t0 = time.perf_counter()
+    with app.app_context():
+        sender = outbox.get_sender()
+        while OutboxEmail.query.filter(OutboxEmail.status.in_(('pending', 'sending'))).count():
+            time.sleep(0.05); db.session.remove()
+        drain = time.perf_counter() - t0
+        stats = sender.stats()
+
+        # Old behaviour: one fresh SMTP connection inside every gate request
+        smtp.fail_every = 0
+        sync = []
+        for i in range(args.sync_samples):
+            started = time.perf_counter()
+            mail.send(Message("Entry Approved", recipients=[f"prof{i}@rvce.edu.in"], body="sync"))
+            sync.append(time.perf_counter() - started)
+
+    print(f"cars admitted              : {args.cars}  (fake SMTP delay {args.smtp_delay * 1000:.0f} ms/connection)")
+    print(f"gate latency p50 / p99     : {percentile(latencies, 0.5):.1f} / {percentile(latencies, 0.99):.1f} ms  (outbox)")
+    print(f"sync mail.send per entry   : {percentile(sync, 0.5):.1f} ms extra on every entry before")
+    print(f"outbox drained in          : {drain:.2f}s after the last entry")
+    print(f"emails delivered           : {stats['queue']['sent']}  retried {stats['retried']}  dead {stats['queue']['dead']}")
+    print(f"SMTP connections (outbox)  : {stats['smtp_connections']}  vs {args.cars} for per-request sends")
+    print(f"fake SMTP saw              : {len(smtp.messages)} messages over {smtp.connections} connections")
+    smtp.shutdown()
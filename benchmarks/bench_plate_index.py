@@ -0,0 +1,98 @@
+"""
+Gate plate matching: linear difflib scan vs the in-memory PlateIndex.
+
+Usage:  python benchmarks/bench_plate_index.py [--sizes 100,1000,5000] [--scans 50]
+
+Generates random Karnataka-style plates and noisy OCR soups, checks that the
+index returns the same (vehicle, score) as the linear scan, and prints the
+average latency per scan for each fleet size.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.plate_index import PlateIndex, linear_best_match
+
+MATCH_THRESHOLD = 0.65
+
+# Letters easyocr commonly swaps with digits (and vice versa)
+OCR_SWAPS = {'0': 'O', '1': 'I', '5': 'S', '8': 'B', '2': 'Z', '6': 'G'}
+
+def random_plate(rng):
+    return "KA{:02d}{}{:04d}".format(
+        rng.randint(1, 60),
+        "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.choice([1, 2]))),
+        rng.randint(0, 9999)
+    )
+
+def noisy_soup(rng, plate):
+    """Simulates a binary + gray OCR pass: garbage, a damaged plate read, more garbage."""
+    chars = list(plate)
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(chars))
+        roll = rng.random()
+        if roll < 0.5: chars[i] = OCR_SWAPS.get(chars[i], chars[i])
+        elif roll < 0.8: chars[i] = rng.choice(string.ascii_uppercase + string.digits)
+        else: chars[i] = ""
+    noise = lambda: "".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(rng.randint(0, 8)))
+    read = "".join(chars)
+    return noise() + read + noise() + read + noise()
+
+def bench(size, scans, rng):
+    plates = set()
+    while len(plates) < size: plates.add(random_plate(rng))
+    vehicles = [SimpleNamespace(id=i + 1, license_plate=p) for i, p in enumerate(sorted(plates))]
+    by_id = {v.id: v for v in vehicles}
+
+    t0 = time.perf_counter()
+    index = PlateIndex(); index.rebuild(vehicles)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    soups = [noisy_soup(rng, rng.choice(vehicles).license_plate) for _ in range(scans)]
+    # A few unreadable frames, which are the worst case for pruning
+    soups += ["".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(20)) for _ in range(max(1, scans // 10))]
+
+    linear_t = 0.0; index_t = 0.0; gate_t = 0.0
+    for soup in soups:
+        t0 = time.perf_counter()
+        expected_v, expected_score = linear_best_match(soup, vehicles)
+        linear_t += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        got_id, got_score = index.match(soup)
+        index_t += time.perf_counter() - t0
+
+        got_v = by_id.get(got_id)
+        if got_v is not expected_v or got_score != expected_score:
+            raise AssertionError(f"Mismatch for {soup!r}: linear={expected_v and expected_v.license_plate} {expected_score} "
+                                 f"index={got_v and got_v.license_plate} {got_score}")
+
+        # What the gate actually runs: anything under the threshold is denied regardless
+        t0 = time.perf_counter()
+        gate_id, gate_score = index.match(soup, min_score=MATCH_THRESHOLD)
+        gate_t += time.perf_counter() - t0
+        if expected_score >= MATCH_THRESHOLD and (by_id.get(gate_id) is not expected_v or gate_score != expected_score):
+            raise AssertionError(f"Gate-threshold mismatch for {soup!r}")
+
+    n = len(soups)
+    print(f"{size:>7} plates | build {build_ms:8.1f} ms | linear {linear_t / n * 1000:9.2f} ms/scan "
+          f"| index {index_t / n * 1000:8.2f} ms/scan | index@{MATCH_THRESHOLD} {gate_t / n * 1000:7.2f} ms/scan "
+          f"| speedup x{linear_t / gate_t:6.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default="100,500,1000,2000,5000")
+    parser.add_argument('--scans', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for size in [int(s) for s in args.sizes.split(',')]:
+        bench(size, args.scans, rng)
+    print("✅ Index results identical to the linear scan.")
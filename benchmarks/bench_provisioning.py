@@ -0,0 +1,123 @@
+"""
+Lot provisioning: one ParkingSpot object per spot vs. bulk Core inserts / one guarded DELETE.
+
+Usage:  python benchmarks/bench_provisioning.py [--sizes 100,1000,10000,50000] [--orm-max 20000]
+
+For every lot size, on a throwaway SQLite database:
+  create   builds the lot's spots (20% reserved) and commits
+  shrink   removes the upper half of the spots and commits
+  delete   removes the rest together with the lot
+The "orm" rows repeat what admin.create_lot / edit_lot / delete_lot used to do (session.add
+per spot, load + session.delete per removed spot, cascade delete); the "bulk" rows call
+services/provisioning.py. Peak Python memory is measured with tracemalloc. Sizes above
+--orm-max skip the ORM path, which gets slow.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ['ENABLE_GATE'] = '0'
+
+import config
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='100,1000,10000,50000')
+    parser.add_argument('--orm-max', type=int, default=20000, help="Largest lot timed with the per-object ORM path")
+    args = parser.parse_args()
+    sizes = [int(x) for x in args.sizes.split(',') if x.strip()]
+
+    db_dir = tempfile.mkdtemp()
+    config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'provisioning.db')
+    config.Config.GATE_JOURNAL_PATH = os.path.join(db_dir, 'gate_journal.jsonl')
+
+    from app import app
+    from extensions import db
+    from models import ParkingLot, ParkingSpot
+    from services import provisioning
+
+    def orm_paths(capacity):
+        state = {}
+        def create():
+            lot = ParkingLot(location=f"ORM {capacity}", number_of_spots=capacity)
+            db.session.add(lot); db.session.commit()
+            for i in range(1, capacity + 1):
+                db.session.add(ParkingSpot(lot_id=lot.lot_id, spot_number=i, status='available',
+                                           reserved_for_faculty=i <= capacity * 0.2))
+            db.session.commit()
+            state['lot_id'] = lot.lot_id
+        def shrink():
+            keep = capacity // 2
+            spots = ParkingSpot.query.filter(ParkingSpot.lot_id == state['lot_id'], ParkingSpot.spot_number > keep).all()
+            assert not any(s.status == 'occupied' for s in spots)
+            for s in spots: db.session.delete(s)
+            db.session.get(ParkingLot, state['lot_id']).number_of_spots = keep
+            db.session.commit()
+        def delete():
+            lot = db.session.get(ParkingLot, state['lot_id'])
+            assert ParkingSpot.query.filter_by(lot_id=lot.lot_id, status='occupied').count() == 0
+            db.session.delete(lot); db.session.commit()
+        return create, shrink, delete
+
+    def bulk_paths(capacity):
+        state = {}
+        def create():
+            lot = ParkingLot(location=f"Bulk {capacity}", number_of_spots=capacity)
+            db.session.add(lot); db.session.flush()
+            provisioning.add_spots(lot.lot_id, 1, capacity, reserved=provisioning.reserved_rule(capacity, 0.2))
+            db.session.commit()
+            state['lot_id'] = lot.lot_id
+        def shrink():
+            keep = capacity // 2
+            _, blocker = provisioning.remove_spots_above(state['lot_id'], keep)
+            assert blocker is None
+            db.session.get(ParkingLot, state['lot_id']).number_of_spots = keep
+            db.session.commit()
+        def delete():
+            _, blocker = provisioning.remove_spots_above(state['lot_id'], 0)
+            assert blocker is None
+            db.session.delete(db.session.get(ParkingLot, state['lot_id'])); db.session.commit()
+        return create, shrink, delete
+
+    print(f"{'spots':>7} {'path':<5} {'create ms':>10} {'MB':>7} {'shrink ms':>10} {'MB':>7} {'delete ms':>10} {'MB':>7}")
+    with app.app_context():
+        db.create_all()
+        for capacity in sizes:
+            for name, paths in (("orm", orm_paths), ("bulk", bulk_paths)):
+                if name == "orm" and capacity > args.orm_max:
+                    print(f"{capacity:>7} {name:<5} {'(skipped, --orm-max)':>30}")
+                    continue
+                cells = []
+                for step in paths(capacity):
+                    ms, mb = measure(step)
+                    db.session.expunge_all()
+                    cells.append(f"{ms:>10.1f} {mb:>7.1f}")
+                print(f"{capacity:>7} {name:<5} " + " ".join(cells))
+            # Both paths must leave the same thing behind: nothing
+            assert ParkingSpot.query.count() == 0 and ParkingLot.query.count() == 0
+
+        # Guard: a shrink over an occupied spot removes nothing
+        lot = ParkingLot(location="Guard", number_of_spots=100); db.session.add(lot); db.session.flush()
+        provisioning.add_spots(lot.lot_id, 1, 100)
+        ParkingSpot.query.filter_by(lot_id=lot.lot_id, spot_number=80).update({'status': 'occupied'})
+        db.session.commit()
+        deleted, blocker = provisioning.remove_spots_above(lot.lot_id, 50)
+        db.session.rollback()
+        remaining = ParkingSpot.query.filter_by(lot_id=lot.lot_id).count()
+        print(f"\nGuard: shrink 100 -> 50 with spot #80 occupied deleted {deleted}, blocked by #{blocker}, {remaining} spots left")
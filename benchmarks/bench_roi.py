@@ -0,0 +1,105 @@
+"""
+OCR on plate/ID crops (ROI) vs. OCR on the full frame.
+
+Usage:  python benchmarks/bench_roi.py --frames path/to/samples [--kind plate]
+        python benchmarks/bench_roi.py              # synthetic frames
+
+Sample frames are named after the plate (or USN) they show, e.g.
+KA01AB1234.jpg or KA01AB1234_night.jpg. For every frame both pipelines build
+their binary + gray passes, run easyocr in-process, and match the soup against
+all plates in the folder with the gate's matcher. Reports per-frame latency,
+pixels sent to OCR, and match accuracy. If the easyocr model cannot be loaded,
+only the ROI detection stage is measured.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import cv2
+import numpy as np
+
+from services import roi
+from services.ocr_service import clean_soup
+from services.plate_index import linear_best_match
+
+MATCH_THRESHOLD = 0.65
+
+
+def synthetic_frames(count, seed):
+    """Cars at random positions on a cluttered 1280x720 background."""
+    from fake_camera import render_frame
+    rng = random.Random(seed)
+    folder = tempfile.mkdtemp(prefix="roi_frames_")
+    for i in range(count):
+        plate = "KA{:02d}{}{:04d}".format(rng.randint(1, 60), rng.choice(["AB", "MN", "Z", "CK"]), rng.randint(0, 9999))
+        frame = render_frame(plate, offset=rng.randint(-100, 100))
+        frame = cv2.resize(frame, (1280, 720))
+        noise = np.random.default_rng(i).integers(-20, 20, frame.shape)
+        frame = np.clip(frame.astype(int) + noise, 0, 255).astype(np.uint8)
+        for _ in range(6): # Background clutter
+            x, y = rng.randint(0, 1200), rng.randint(0, 60)
+            cv2.circle(frame, (x, y), rng.randint(5, 40), (rng.randint(0, 255),) * 3, -1)
+        cv2.imwrite(os.path.join(folder, f"{plate}.jpg"), frame)
+    return folder
+
+
+def load_reader():
+    try:
+        import easyocr
+        return easyocr.Reader(['en'], gpu=False), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', help="Folder of sample frames named <PLATE>[_anything].jpg")
+    parser.add_argument('--kind', default='plate', choices=sorted(roi.ASPECT_RANGES))
+    parser.add_argument('--synthetic', type=int, default=20, help="Frames to generate when --frames is not given")
+    args = parser.parse_args()
+
+    folder = args.frames or synthetic_frames(args.synthetic, seed=3)
+    paths = sorted(glob.glob(os.path.join(folder, "*.jpg")) + glob.glob(os.path.join(folder, "*.png")))
+    if not paths: sys.exit(f"No .jpg/.png frames in {folder}")
+    expected = {p: os.path.splitext(os.path.basename(p))[0].split('_')[0].upper() for p in paths}
+    vehicles = [SimpleNamespace(id=i + 1, license_plate=plate) for i, plate in enumerate(sorted(set(expected.values())))]
+
+    reader, reader_error = load_reader()
+    if reader_error: print(f"⚠️ easyocr unavailable ({reader_error}); measuring ROI detection only.\n")
+
+    totals = {name: {"prep": 0.0, "ocr": 0.0, "pixels": 0, "correct": 0} for name in ("full", "roi")}
+    roi_found = 0
+    for path in paths:
+        frame = cv2.imread(path)
+        for name, use_roi in (("full", False), ("roi", True)):
+            t0 = time.perf_counter()
+            passes, used_roi = roi.ocr_passes(frame, args.kind, use_roi=use_roi)
+            totals[name]["prep"] += time.perf_counter() - t0
+            totals[name]["pixels"] += sum(p.shape[0] * p.shape[1] for p in passes)
+            if name == "roi" and used_roi: roi_found += 1
+            if reader is None: continue
+
+            t0 = time.perf_counter()
+            results = [reader.readtext(p, detail=0) for p in passes]
+            totals[name]["ocr"] += time.perf_counter() - t0
+            vehicle, score = linear_best_match(clean_soup([t for res in results for t in res]), vehicles)
+            if vehicle and score >= MATCH_THRESHOLD and vehicle.license_plate == expected[path]:
+                totals[name]["correct"] += 1
+
+    n = len(paths)
+    print(f"{n} frames from {folder} ({args.kind}); ROI found in {roi_found}/{n}")
+    for name, t in totals.items():
+        line = (f"{name:>4} | prep {t['prep'] / n * 1000:7.1f} ms/frame | "
+                f"{t['pixels'] / n / 1e6:5.2f} MP to OCR/frame")
+        if reader is not None:
+            line += f" | OCR {t['ocr'] / n * 1000:8.1f} ms/frame | accuracy {t['correct']}/{n}"
+        print(line)
@@ -0,0 +1,324 @@
+"""
+Rush-hour load generator for the gate API: how many cars per minute can one gate server admit?
+
+Usage:  python benchmarks/bench_rush_hour.py [--curve rush] [--minutes 60] [--speed 60] [--concurrency 4]
+                                             [--ocr-ms 0] [--users 1500] [--lots 5] [--spots 100]
+                                             [--save] [--compare benchmarks/results/<earlier>.json]
+
+Seeds `--users` users (with `--faculty-share` faculty), one vehicle each, and `--lots`
+lots of `--spots` spots on a throwaway SQLite database, then replays an arrival curve
+against the real endpoints through the Flask test client:
+
+  entry   POST /api/gate/scan_plate_entry  {"manual_plate"}  (+ /verify_id_and_grant {"manual_id"} for students)
+  exit    POST /api/gate/scan_exit_id      {"manual_id"}     after each admitted car has parked for --dwell minutes
+
+`--curve` is either a preset (rush, flat, morning) or "minute:cars_per_minute,..." points,
+interpolated linearly, e.g. "0:10,20:150,40:40". Arrivals are a Poisson process following
+the curve. `--speed` is simulated seconds per real second (60 = one simulated minute per
+second); `--speed 0` releases every event at once to find the saturation throughput.
+Latency is measured from the event's scheduled time, so it includes time spent queued
+behind busy workers. `--ocr-ms` makes every scan request hold its worker for that long
+(+-30%), like the OCR call the manual inputs skip. `--unknown-share` of arrivals have
+plates nobody registered (OCR misses / visitors).
+
+`--save` writes the summary (plus the /api/gate/latency stage breakdown) to
+benchmarks/results/; `--compare` prints the change against an earlier run.
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ['ENABLE_GATE'] = '1'
+os.environ.setdefault('OUTBOX_SENDER', '0')   # Mail stays queued; SMTP is not what is measured here
+
+import config
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+CURVES = {
+    'rush':    "0:5,10:40,20:120,30:150,40:90,50:30,60:10",
+    'morning': "0:20,15:90,30:60,60:20",
+    'flat':    "0:60,60:60",
+}
+SCAN_ENDPOINTS = {'gate.scan_plate_entry', 'gate.verify_id_and_grant', 'gate.scan_exit_id'}
+
+
+# --- ARRIVAL CURVE ---
+def parse_curve(spec):
+    points = sorted((float(m), float(r)) for m, r in (p.split(':') for p in CURVES.get(spec, spec).split(',')))
+    if not points: raise ValueError("empty curve")
+    return points
+
+def rate_at(points, minute):
+    if minute <= points[0][0]: return points[0][1]
+    for (m0, r0), (m1, r1) in zip(points, points[1:]):
+        if minute <= m1: return r0 + (r1 - r0) * (minute - m0) / ((m1 - m0) or 1)
+    return points[-1][1]
+
+def arrivals(points, minutes, rng):
+    """Arrival times (simulated minutes) of a Poisson process whose rate follows the curve (thinning)."""
+    peak = max(r for _, r in points)
+    t, times = 0.0, []
+    if peak <= 0: return times
+    while True:
+        t += rng.expovariate(peak)
+        if t >= minutes: return times
+        if rng.random() < rate_at(points, t) / peak: times.append(t)
+
+
+# --- SEED DATA ---
+def seed(app, users, lots, spots, faculty_share, rng):
+    from extensions import db
+    from models import User, Vehicle, ParkingLot, ParkingSpot
+    with app.app_context():
+        db.create_all()
+        for i in range(lots):
+            lot = ParkingLot(location=f"Lot {i + 1}", number_of_spots=spots)
+            db.session.add(lot); db.session.flush()
+            db.session.add_all([ParkingSpot(lot_id=lot.lot_id, spot_number=n, reserved_for_faculty=n <= spots * 0.2)
+                                for n in range(1, spots + 1)])
+        people = []
+        for i in range(users):
+            faculty = rng.random() < faculty_share
+            user = User(name=f"Driver {i}", email=f"driver{i}@rvce.edu.in", phone="9", password_hash="x",
+                        usn=None if faculty else f"1RV22LD{i:04d}", role='faculty' if faculty else 'student',
+                        department='CSE', preferences=",".join(str(l + 1) for l in rng.sample(range(lots), lots)))
+            db.session.add(user); db.session.flush()
+            plate = f"KA{i % 100:02d}RH{1000 + i}"
+            db.session.add(Vehicle(license_plate=plate, type='car', user_id=user.user_id))
+            people.append((plate, user.usn))
+        db.session.commit()
+        # Vehicle fills plate_canonical itself; the gate's exact match finds nobody without it
+        assert not Vehicle.query.filter_by(plate_canonical=None).count(), "vehicles seeded without plate_canonical"
+    return people
+
+
+# --- REPLAY ---
+class Replay:
+    """
+    Open-loop replay: events sit in a heap keyed by simulated time and are released at
+    their real-time equivalent; `concurrency` workers run them. Admitted cars schedule
+    their own exit event `dwell` simulated minutes later.
+    """
+
+    def __init__(self, app, args, people, rng):
+        self.app, self.args, self.rng = app, args, rng
+        self.heap = []
+        self.cond = threading.Condition()
+        self.pending = 0
+        self.idle = list(people)                 # Registered cars not on campus
+        rng.shuffle(self.idle)
+        self.counts = Counter()
+        self.latency = defaultdict(list)         # kind -> seconds from scheduled time to response
+        self.requests = defaultdict(list)        # endpoint -> seconds per HTTP request
+        self.admitted = 0
+        self.t0 = None
+
+    def real_time(self, minute):
+        return 0.0 if not self.args.speed else minute * 60.0 / self.args.speed
+
+    def push(self, minute, kind, car):
+        with self.cond:
+            heapq.heappush(self.heap, (minute, self.rng.random(), kind, car))
+            self.pending += 1
+            self.cond.notify()
+
+    def next_event(self):
+        with self.cond:
+            while True:
+                if not self.heap:
+                    if self.pending == 0: return None
+                    self.cond.wait(0.05); continue
+                minute, _, kind, car = self.heap[0]
+                due = self.t0 + self.real_time(minute)
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    self.cond.wait(min(wait, 0.05)); continue
+                heapq.heappop(self.heap)
+                return minute, due, kind, car
+
+    def done(self):
+        with self.cond:
+            self.pending -= 1
+            self.cond.notify_all()
+
+    def post(self, client, endpoint, body):
+        started = time.perf_counter()
+        resp = client.post(f'/api/gate/{endpoint}', json=body)
+        self.requests[endpoint].append(time.perf_counter() - started)
+        return resp.status_code, resp.get_json() or {}
+
+    def run_event(self, client, minute, kind, car):
+        if kind == 'arrival':
+            # Each arrival is a registered car that is not on campus right now, or a visitor plate
+            if self.rng.random() < self.args.unknown_share:
+                kind, car = 'visitor', (f"MH12ZZ{self.rng.randrange(10000):04d}", None)
+            else:
+                with self.cond: car = self.idle.pop() if self.idle else None
+                if car is None: return "entry skipped (every registered car is inside)"
+                kind = 'entry'
+        plate, usn = car
+        if kind == 'exit':
+            code, data = self.post(client, 'scan_exit_id', {"manual_id": plate})
+            with self.cond: self.idle.append(car)
+            return f"exit {code} {data.get('status')}"
+
+        code, data = self.post(client, 'scan_plate_entry', {"manual_plate": plate})
+        if data.get('status') == 'step1_success':
+            code, data = self.post(client, 'verify_id_and_grant',
+                                   {"plate": plate, "expected_usn": usn, "manual_id": usn})
+        if data.get('status') == 'allowed':
+            with self.cond: self.admitted += 1
+            dwell = self.rng.uniform(*self.args.dwell)
+            if minute + dwell < self.args.minutes: self.push(minute + dwell, 'exit', car)
+        elif kind == 'entry':
+            with self.cond: self.idle.append(car)
+        return f"{kind} {code} {data.get('status') if code == 200 else data.get('msg', data.get('status'))}"
+
+    def worker(self):
+        client = self.app.test_client()
+        while True:
+            event = self.next_event()
+            if event is None: return
+            minute, due, kind, car = event
+            try:
+                key = self.run_event(client, minute, kind, car)
+            except Exception as e:
+                key = f"{kind} exception {type(e).__name__}"
+            self.latency['exit' if kind == 'exit' else 'entry'].append(time.perf_counter() - due)
+            with self.cond: self.counts[key] += 1
+            self.done()
+
+    def run(self, times):
+        self.t0 = time.perf_counter() + 0.2
+        for minute in times: self.push(minute, 'arrival', None)
+        threads = [threading.Thread(target=self.worker, daemon=True) for _ in range(self.args.concurrency)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        return time.perf_counter() - self.t0
+
+
+# --- REPORT ---
+def percentiles(values):
+    if not values: return {}
+    values = sorted(values)
+    pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 2)
+    return {"n": len(values), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": pick(1.0)}
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def summarize(replay, elapsed, arrivals_count):
+    events = sum(replay.counts.values())
+    http = sum(len(v) for v in replay.requests.values())
+    errors = sum(n for k, n in replay.counts.items() if ' 5' in k or 'exception' in k)
+    denied = sum(n for k, n in replay.counts.items() if ' 4' in k)
+    return {
+        "arrivals": arrivals_count,
+        "events": events,
+        "http_requests": http,
+        "elapsed_s": round(elapsed, 2),
+        "admitted": replay.admitted,
+        "admitted_per_min": round(replay.admitted / elapsed * 60, 1) if elapsed else None,
+        "requests_per_s": round(http / elapsed, 1) if elapsed else None,
+        "denial_rate": round(denied / events, 4) if events else 0.0,
+        "error_rate": round(errors / events, 4) if events else 0.0,
+        "latency": {kind: percentiles(v) for kind, v in sorted(replay.latency.items())},
+        "endpoints": {ep: percentiles(v) for ep, v in sorted(replay.requests.items())},
+        "outcomes": dict(sorted(replay.counts.items())),
+    }
+
+def print_summary(result):
+    s = result["summary"]
+    print(f"curve / minutes / speed     : {result['args']['curve']} / {result['args']['minutes']} / "
+          f"{result['args']['speed'] or 'max'}   concurrency {result['args']['concurrency']}, OCR sim {result['args']['ocr_ms']} ms")
+    print(f"arrivals / events / requests: {s['arrivals']} / {s['events']} / {s['http_requests']} in {s['elapsed_s']}s")
+    print(f"cars admitted               : {s['admitted']}  = {s['admitted_per_min']} cars/min   ({s['requests_per_s']} req/s)")
+    print(f"denial rate / error rate    : {s['denial_rate'] * 100:.1f}% / {s['error_rate'] * 100:.2f}%")
+    for kind, p in s["latency"].items():
+        print(f"  {kind:<8} end-to-end      : p50 {p['p50_ms']:.1f}  p95 {p['p95_ms']:.1f}  p99 {p['p99_ms']:.1f} ms  (n={p['n']})")
+    for ep, p in s["endpoints"].items():
+        print(f"  {ep:<24}: p50 {p['p50_ms']:.1f}  p95 {p['p95_ms']:.1f}  p99 {p['p99_ms']:.1f} ms")
+    for key, n in s["outcomes"].items(): print(f"    {key:<44} {n}")
+
+def compare(result, path):
+    with open(path) as f: before = json.load(f)
+    print(f"\nvs {os.path.basename(path)} ({before.get('git')}):")
+    b, a = before["summary"], result["summary"]
+    for key in ("admitted_per_min", "requests_per_s", "denial_rate", "error_rate"):
+        if b.get(key) is not None and a.get(key) is not None:
+            print(f"  {key:<24} {b[key]:>10} -> {a[key]:<10} ({a[key] - b[key]:+.2f})")
+    for group in ("latency", "endpoints"):
+        for name, p in a[group].items():
+            old = b.get(group, {}).get(name)
+            if not old: continue
+            print(f"  {name:<24} p95 {old['p95_ms']:>8.1f} -> {p['p95_ms']:<8.1f} ms ({(p['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0:+.0f}%)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--curve', default='rush', help=f"Preset {sorted(CURVES)} or 'minute:rate,...' (cars/min)")
+    parser.add_argument('--minutes', type=float, default=60, help="Simulated minutes to replay")
+    parser.add_argument('--speed', type=float, default=60, help="Simulated seconds per real second (0 = as fast as possible)")
+    parser.add_argument('--concurrency', type=int, default=4, help="Requests the gate server handles at once")
+    parser.add_argument('--ocr-ms', type=float, default=0, help="Simulated OCR time per scan request")
+    parser.add_argument('--users', type=int, default=1500)
+    parser.add_argument('--faculty-share', type=float, default=0.2)
+    parser.add_argument('--unknown-share', type=float, default=0.03, help="Arrivals with unregistered plates")
+    parser.add_argument('--lots', type=int, default=5)
+    parser.add_argument('--spots', type=int, default=100, help="Spots per lot")
+    parser.add_argument('--dwell', type=float, nargs=2, default=(20, 240), metavar=('MIN', 'MAX'),
+                        help="Simulated minutes a car stays before its exit scan")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', action='store_true', help="Write the result to benchmarks/results/")
+    parser.add_argument('--out', help="Write the result JSON here instead")
+    parser.add_argument('--compare', help="Earlier result JSON to diff against")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    db_dir = tempfile.mkdtemp(prefix='rush_')
+    config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'rush.db')
+    config.Config.GATE_JOURNAL_PATH = os.path.join(db_dir, 'gate_journal.jsonl')
+    from app import app
+
+    if args.ocr_ms:
+        @app.before_request
+        def simulate_ocr():
+            from flask import request
+            if request.endpoint in SCAN_ENDPOINTS:
+                time.sleep(args.ocr_ms / 1000 * random.uniform(0.7, 1.3))
+
+    people = seed(app, args.users, args.lots, args.spots, args.faculty_share, rng)
+    times = arrivals(parse_curve(args.curve), args.minutes, rng)
+    replay = Replay(app, args, people, rng)
+    with contextlib.redirect_stdout(io.StringIO()): # The gate prints a line per scan
+        elapsed = replay.run(times)
+
+    with app.test_client() as client:
+        stages = client.get('/api/gate/latency').get_json()
+    result = {"time": datetime.now().isoformat(timespec='seconds'), "git": git_revision(), "args": vars(args),
+              "summary": summarize(replay, elapsed, len(times)), "stages": stages}
+    print_summary(result)
+
+    if args.save or args.out:
+        path = args.out or os.path.join(RESULTS_DIR, f"rush_{datetime.now():%Y%m%d_%H%M%S}_{result['git'] or 'nogit'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f: json.dump(result, f, indent=2)
+        print(f"\n💾 Saved {path}")
+    if args.compare: compare(result, args.compare)
@@ -0,0 +1,49 @@
+"""
+Cold-start time of the web app and maintenance scripts.
+
+Usage:  python benchmarks/bench_startup.py [--runs 5]
+
+Each case runs in a fresh interpreter, so module import and model loading
+costs are measured the way a real process start pays them.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CASES = [
+    ("web app, gate enabled (lazy OCR)", "import app", {"ENABLE_GATE": "1"}),
+    ("web app, gate disabled",           "import app", {"ENABLE_GATE": "0"}),
+    ("setup_db.py / create_admin.py",    "import os; os.environ.setdefault('ENABLE_GATE', '0'); from app import create_app; create_app()", {}),
+    # What every process used to pay before the OCR stack became lazy
+    ("old eager gate imports",           "import cv2, numpy, requests, easyocr", {}),
+    ("old eager imports + model load",   "import cv2, numpy, requests, easyocr; easyocr.Reader(['en'], gpu=False)", {}),
+]
+
+def time_case(code, env_overrides, runs):
+    env = dict(os.environ, **env_overrides)
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True)
+        elapsed = time.perf_counter() - t0
+        if proc.returncode != 0:
+            return None, proc.stderr.decode(errors='replace').strip().splitlines()[-1]
+        samples.append(elapsed)
+    return samples, None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for label, code, env in CASES:
+        samples, error = time_case(code, env, args.runs)
+        if error:
+            print(f"{label:<36} | failed: {error}")
+            continue
+        print(f"{label:<36} | median {statistics.median(samples) * 1000:8.0f} ms | min {min(samples) * 1000:8.0f} ms")
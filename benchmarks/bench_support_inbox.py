@@ -0,0 +1,112 @@
+"""
+Support inbox: the old load-everything listing vs. keyset pages, status tabs and FTS5 search.
+
+Usage:  python benchmarks/bench_support_inbox.py [--messages 300000] [--repeat 5]
+
+Fills a throwaway SQLite database with --messages support messages (three per second,
+about a fifth of them still unread) and times, median of --repeat runs:
+  all        what admin.view_messages used to do (every message, newest first)
+  page 1     first page of services/support_inbox.page()
+  page deep  the page after a cursor half way down the inbox
+  unread     first page of the unread tab
+  search     a rare word (one ticket), a sender's email, a common word, and the
+             same rare word through the LIKE fallback used without FTS5
+Then checks that walking the pages (plain and searched) visits every message exactly once.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ['ENABLE_GATE'] = '0'
+
+import config
+
+WORDS = "parking gate spot sticker refund fee lot slot car bike faculty student pass entry exit camera plate".split()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=300000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'inbox.db')
+    config.Config.GATE_JOURNAL_PATH = os.path.join(db_dir, 'gate_journal.jsonl')
+
+    from sqlalchemy import insert
+    from app import app
+    from extensions import db
+    from models import SupportMessage
+    from services import support_inbox
+
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        base = datetime(2026, 1, 1)
+        for start in range(0, args.messages, 20000):
+            rows = [{"sender_email": f"user{i % 5000}@rvce.edu.in",
+                     "message": ' '.join(rng.choice(WORDS) for _ in range(12)) + f" ticket{i}",
+                     "status": 'unread' if i % 5 == 0 else rng.choice(('read', 'replied')),
+                     "created_at": base + timedelta(seconds=i // 3)}
+                    for i in range(start, min(start + 20000, args.messages))]
+            db.session.execute(insert(SupportMessage.__table__), rows)
+        # Like messages from contact_admin: created_at as the database writes it (no microseconds)
+        db.session.execute(db.text("UPDATE support_messages SET created_at = substr(created_at, 1, 19)"))
+        db.session.commit()
+        print(f"{args.messages} messages inserted (FTS triggers included) in {time.perf_counter() - started:.1f} s, "
+              f"FTS5 {'on' if support_inbox.fts_available() else 'OFF'}\n")
+
+        rare = f"ticket{args.messages // 3}"
+        _, deep_cursor = support_inbox.page(limit=args.messages // 2)
+        cases = [
+            ("all (old)",        lambda: SupportMessage.query.order_by(SupportMessage.created_at.desc()).all()),
+            ("page 1",           lambda: support_inbox.page()[0]),
+            ("page deep",        lambda: support_inbox.page(after=deep_cursor)[0]),
+            ("unread",           lambda: support_inbox.page(status='unread')[0]),
+            ("search rare",      lambda: support_inbox.page(query=rare)[0]),
+            ("search sender",    lambda: support_inbox.page(query="user4242@rvce.edu.in")[0]),
+            ("search common",    lambda: support_inbox.page(query="refund")[0]),
+            ("search rare LIKE", lambda: (setattr(support_inbox, '_fts', False), support_inbox.page(query=rare)[0],
+                                          setattr(support_inbox, '_fts', None))[1]),
+        ]
+        print(f"{'query':<18} {'ms':>9} {'rows':>8}")
+        for name, fn in cases:
+            ms, rows = timed(fn, args.repeat)
+            db.session.expunge_all()
+            print(f"{name:<18} {ms:>9.1f} {len(rows):>8}")
+
+        # Pages neither skip nor repeat messages that share a created_at second
+        seen, cursor = 0, None
+        while True:
+            rows, cursor = support_inbox.page(after=cursor, limit=5000)
+            seen += len(rows)
+            db.session.expunge_all()
+            if not cursor: break
+        print(f"\nWalked every page: {seen} of {args.messages} messages")
+        seen, cursor = 0, None
+        while True:
+            rows, cursor = support_inbox.page(after=cursor, query="refund", limit=5000)
+            seen += len(rows)
+            db.session.expunge_all()
+            if not cursor: break
+        matches = db.session.execute(db.text(
+            "SELECT count(*) FROM support_messages WHERE message LIKE '%refund%' OR sender_email LIKE '%refund%'")).scalar()
+        print(f"Walked every 'refund' search page: {seen} of {matches} matching messages")
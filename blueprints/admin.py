@@ -1,29 +1,12 @@
-import json
-import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, Response
 from flask_jwt_extended import jwt_required, get_jwt
-from flask_mail import Message
-from extensions import db, mail
-from models import ParkingLot, ParkingSpot, ParkingTransaction, Vehicle, User, SupportMessage
+from extensions import db
+from models import ParkingLot, ParkingSpot, ParkingTransaction, Vehicle, User, SupportMessage, PendingVehicle
+from services import spot_allocator, outbox, occupancy, spot_events, provisioning, support_inbox
+from services import approvals as approval_queue
 from flask import jsonify
 admin_bp = Blueprint('admin', __name__)
 
-PENDING_FILE = 'pending_vehicles.json'
-
-# --- HELPER FUNCTIONS FOR JSON ---
-def load_pending():
-    if not os.path.exists(PENDING_FILE):
-        return []
-    try:
-        with open(PENDING_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
-
-def save_pending(data):
-    with open(PENDING_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
-
 # --- 🔒 SECURITY MIDDLEWARE ---
 @admin_bp.before_request
 @jwt_required()
@@ -65,49 +48,75 @@ def spot_details(lot_id, spot_number):
 
 @admin_bp.route('/dashboard')
 def dashboard():
-    lots = ParkingLot.query.all()
-    pending_count = len(load_pending())
-    
-    # Sort spots numerically
-    for lot in lots:
-        lot.spots.sort(key=lambda x: x.spot_number)
-        
-    return render_template('admin/dashboard.html', lots=lots, pending_count=pending_count)
+    # Lot summaries only (one GROUP BY); each lot's spot grid is fetched from /lot_grid when shown
+    lots = occupancy.lot_summaries()
+    pending_count = approval_queue.pending_count()
+    return render_template('admin/dashboard.html', lots=lots, totals=occupancy.totals(lots), pending_count=pending_count)
+
+@admin_bp.route('/occupancy')
+def occupancy_summary():
+    lots = occupancy.lot_summaries()
+    return jsonify({"lots": lots, **occupancy.totals(lots)})
+
+@admin_bp.route('/lot_grid/<int:lot_id>')
+def lot_grid(lot_id):
+    # Columnar: spot_number / status / reserved arrays, already in spot order
+    return jsonify(occupancy.spot_grid(lot_id))
+
+@admin_bp.route('/events')
+def spot_event_stream():
+    # Server-Sent Events: spot / lot / resync deltas (services/spot_events.py); snapshot first unless resuming
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    since = int(last_id) if last_id and last_id.isdigit() else None
+    body = spot_events.stream(since, heartbeat=current_app.config.get('SPOT_EVENTS_HEARTBEAT', 15.0))
+    return Response(body, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@admin_bp.route('/events_stats')
+def spot_event_stats():
+    return jsonify(spot_events.get_bus().stats())
 
 @admin_bp.route('/create_lot', methods=['POST'])
 def create_lot():
     location = request.form.get('location')
     capacity = int(request.form.get('capacity'))
+    # Faculty spots: explicit ranges ("1-40,101-120") or the first SPOT_RESERVED_RATIO of the lot
+    try:
+        ranges = provisioning.parse_ranges(request.form.get('reserved_spots'))
+        ratio = float(request.form.get('reserved_ratio') or current_app.config.get('SPOT_RESERVED_RATIO', 0.2))
+    except ValueError as e:
+        flash(f'❌ Invalid faculty spots: {e}', 'error')
+        return redirect(url_for('admin.dashboard'))
     
     new_lot = ParkingLot(location=location, number_of_spots=capacity)
     db.session.add(new_lot)
-    db.session.commit()
+    db.session.flush()
     
-    # Auto-generate spots (20% reserved for faculty)
-    for i in range(1, capacity + 1):
-        is_reserved = True if i <= (capacity * 0.2) else False
-        spot = ParkingSpot(
-            lot_id=new_lot.lot_id, 
-            spot_number=i, 
-            status='available', 
-            reserved_for_faculty=is_reserved
-        )
-        db.session.add(spot)
+    # Auto-generate spots in bulk (no ORM object per spot), committed together with the lot
+    provisioning.add_spots(new_lot.lot_id, 1, capacity, reserved=provisioning.reserved_rule(capacity, ratio, ranges),
+                           chunk=current_app.config.get('SPOT_INSERT_CHUNK', 5000))
     
     db.session.commit()
+    spot_allocator.lot_changed(new_lot.lot_id)
+    spot_events.lot(new_lot.lot_id)
     flash('✅ Parking Lot Created Successfully!', 'success')
     return redirect(url_for('admin.dashboard'))
 
 @admin_bp.route('/delete_lot/<int:lot_id>', methods=['POST'])
 def delete_lot(lot_id):
     lot = ParkingLot.query.get_or_404(lot_id)
-    active_spots = ParkingSpot.query.filter_by(lot_id=lot_id, status='occupied').count()
-    if active_spots > 0:
+    # One guarded DELETE: nothing is removed while any spot of the lot is occupied
+    _, blocker = provisioning.remove_spots_above(lot_id, 0)
+    if blocker is not None:
+        db.session.rollback()
+        active_spots = ParkingSpot.query.filter_by(lot_id=lot_id, status='occupied').count()
         flash(f'❌ Cannot delete lot! {active_spots} cars are still parked here.', 'error')
         return redirect(url_for('admin.dashboard'))
 
     db.session.delete(lot)
     db.session.commit()
+    spot_allocator.lot_deleted(lot_id)
+    spot_events.lot(lot_id, deleted=True)
     flash('🗑️ Parking Lot Deleted!', 'success')
     return redirect(url_for('admin.dashboard'))
 
@@ -118,29 +127,26 @@ def edit_lot(lot_id):
     current_capacity = lot.number_of_spots
     
     if new_capacity > current_capacity:
-        for i in range(current_capacity + 1, new_capacity + 1):
-            spot = ParkingSpot(lot_id=lot.lot_id, spot_number=i, status='available')
-            db.session.add(spot)
+        # New spots are open to all; reserve them afterwards with toggle_faculty
+        provisioning.add_spots(lot_id, current_capacity + 1, new_capacity,
+                               chunk=current_app.config.get('SPOT_INSERT_CHUNK', 5000))
         lot.number_of_spots = new_capacity
         db.session.commit()
+        spot_allocator.lot_changed(lot_id)
+        spot_events.lot(lot_id)
         flash(f'✅ Capacity increased to {new_capacity}.', 'success')
 
     elif new_capacity < current_capacity:
-        spots_to_remove = ParkingSpot.query.filter(
-            ParkingSpot.lot_id == lot_id,
-            ParkingSpot.spot_number > new_capacity
-        ).all()
-        
-        for spot in spots_to_remove:
-            if spot.status == 'occupied':
-                flash(f'❌ Cannot reduce capacity! Spot #{spot.spot_number} is occupied.', 'error')
-                return redirect(url_for('admin.dashboard'))
-        
-        for spot in spots_to_remove:
-            db.session.delete(spot)
+        _, blocker = provisioning.remove_spots_above(lot_id, new_capacity)
+        if blocker is not None:
+            db.session.rollback()
+            flash(f'❌ Cannot reduce capacity! Spot #{blocker} is occupied.', 'error')
+            return redirect(url_for('admin.dashboard'))
         
         lot.number_of_spots = new_capacity
         db.session.commit()
+        spot_allocator.lot_changed(lot_id)
+        spot_events.lot(lot_id)
         flash(f'⚠️ Capacity reduced to {new_capacity}.', 'success')
 
     return redirect(url_for('admin.dashboard'))
@@ -149,7 +155,9 @@ def edit_lot(lot_id):
 def toggle_faculty(lot_id, spot_number):
     spot = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number).first_or_404()
     if spot.status == 'occupied':
-        active_txn = ParkingTransaction.query.join(Vehicle).join(User).filter(
+        # No FK between transactions and vehicles, so the join condition is spelled out
+        active_txn = ParkingTransaction.query.join(Vehicle, Vehicle.license_plate == ParkingTransaction.license_plate) \
+                                             .join(User, User.user_id == Vehicle.user_id).filter(
                 ParkingTransaction.lot_id == lot_id,
                 ParkingTransaction.spot_number == spot_number,
                 ParkingTransaction.exit_time == None,
@@ -161,69 +169,81 @@ def toggle_faculty(lot_id, spot_number):
 
     spot.reserved_for_faculty = not spot.reserved_for_faculty
     db.session.commit()
+    spot_allocator.spot_changed(spot)
+    spot_events.spot(lot_id, spot_number, spot.status, reserved=spot.reserved_for_faculty)
     status = "Faculty Only" if spot.reserved_for_faculty else "Open to All"
     flash(f'Spot #{spot_number} is now {status}.', 'success')
     return redirect(url_for('admin.dashboard'))
 
 # --- 📋 APPROVAL ROUTES ---
-# ... inside blueprints/admin.py ...
-
 @admin_bp.route('/approvals')
 def approvals():
-    pending_list = load_pending()
-    
-    # --- ENRICH DATA WITH USER INFO ---
-    # The JSON only has 'user_id'. We need Name, Dept, USN from the DB.
-    final_list = []
-    
-    for item in pending_list:
-        user = User.query.get(item['user_id'])
-        if user:
-            # Add user details to the dictionary temporarily for display
-            item['user_name'] = user.name
-            item['user_dept'] = user.department
-            item['user_usn'] = user.usn
-            item['user_email'] = user.email
-            final_list.append(item)
-    
-    return render_template('admin/approvals.html', pending=final_list)
+    # Keyset-paginated, oldest first; ?after=<cursor>&department=CSE&role=student
+    department = request.args.get('department', '').strip()
+    role = request.args.get('role', '').strip()
+    pending, next_cursor = approval_queue.page(
+        after=request.args.get('after'), department=department or None, role=role or None,
+        limit=current_app.config.get('APPROVALS_PAGE_SIZE', 50))
+    return render_template('admin/approvals.html', pending=pending, next_cursor=next_cursor,
+                           department=department, role=role, first_page=not request.args.get('after'),
+                           pending_count=approval_queue.pending_count())
+
+def _flash_decision(result, action, plate=None):
+    verb = "Approved & Registered" if action == 'approve' else "Rejected"
+    if result["conflict"]:
+        flash('⚠️ Another admin decided some of these requests meanwhile; nothing was saved, please retry.', 'error')
+    elif result["done"]:
+        what = f'Vehicle {plate}' if plate else f'{result["done"]} vehicles'
+        flash(f'{"✅" if action == "approve" else "🚫"} {what} {verb}!', 'success' if action == 'approve' else 'error')
+    for plate, reason in result["skipped"]:
+        flash(f'❌ Vehicle {plate} skipped: {reason}.', 'error')
+    if not (result["conflict"] or result["done"] or result["skipped"]):
+        flash('Vehicle not found in queue.', 'error')
+
+@admin_bp.route('/approvals/bulk', methods=['POST'])
+def bulk_decide():
+    # Selected rows of one page, decided in one transaction
+    action = request.form.get('action')
+    ids = [int(x) for x in request.form.getlist('ids') if x.isdigit()]
+    if action not in ('approve', 'reject') or not ids:
+        flash('Select at least one request and an action.', 'error')
+    else:
+        _flash_decision(approval_queue.decide(ids, action), action)
+    back = request.form.get('next', '')
+    return redirect(back if back.startswith(url_for('admin.approvals')) else url_for('admin.approvals'))
 
 @admin_bp.route('/approve/<plate>')
 def approve_vehicle(plate):
-    pending = load_pending()
-    vehicle_data = next((item for item in pending if item["license_plate"] == plate), None)
-    
-    if vehicle_data:
-        new_vehicle = Vehicle(
-            license_plate=vehicle_data['license_plate'],
-            type=vehicle_data['type'],
-            user_id=vehicle_data['user_id']
-        )
-        db.session.add(new_vehicle)
-        db.session.commit()
-        
-        pending = [v for v in pending if v['license_plate'] != plate]
-        save_pending(pending)
-        flash(f'✅ Vehicle {plate} Approved & Registered!', 'success')
-    else:
-        flash('Vehicle not found in queue.', 'error')
+    request_row = PendingVehicle.query.filter_by(license_plate=plate, status='pending').first()
+    result = approval_queue.decide([request_row.id], 'approve') if request_row else {"done": 0, "skipped": [], "conflict": False}
+    _flash_decision(result, 'approve', plate)
     return redirect(url_for('admin.approvals'))
 
 @admin_bp.route('/reject/<plate>')
 def reject_vehicle(plate):
-    pending = load_pending()
-    pending = [v for v in pending if v['license_plate'] != plate]
-    save_pending(pending)
-    flash(f'🚫 Vehicle {plate} Rejected.', 'error')
+    # Kept as 'rejected' so the owner sees it on their dashboard until they clear it
+    request_row = PendingVehicle.query.filter_by(license_plate=plate, status='pending').first()
+    result = approval_queue.decide([request_row.id], 'reject') if request_row else {"done": 0, "skipped": [], "conflict": False}
+    _flash_decision(result, 'reject', plate)
     return redirect(url_for('admin.approvals'))
 
 # --- 💬 SUPPORT INBOX ROUTES (The Missing Part) ---
 
 @admin_bp.route('/messages')
 def view_messages():
-    # This was missing in your file!
-    messages = SupportMessage.query.order_by(SupportMessage.created_at.desc()).all()
-    return render_template('admin/messages.html', messages=messages)
+    # Keyset-paginated, newest first; ?after=<cursor>&status=unread&q=<search>
+    status = request.args.get('status', '').strip()
+    query = request.args.get('q', '').strip()
+    messages, next_cursor = support_inbox.page(
+        after=request.args.get('after'), status=status or None, query=query or None,
+        limit=current_app.config.get('SUPPORT_PAGE_SIZE', 50))
+    return render_template('admin/messages.html', messages=messages, next_cursor=next_cursor,
+                           status=status, query=query, first_page=not request.args.get('after'),
+                           unread_count=support_inbox.unread_count())
+
+def _back_to_inbox(back):
+    # Stay on the inbox page / filter the admin acted from
+    return redirect(back if (back or '').startswith(url_for('admin.view_messages')) else url_for('admin.view_messages'))
 
 @admin_bp.route('/mark_read/<int:msg_id>')
 def mark_read(msg_id):
@@ -231,7 +251,7 @@ def mark_read(msg_id):
     msg.status = 'read'
     db.session.commit()
     flash('Message marked as read.', 'success')
-    return redirect(url_for('admin.view_messages'))
+    return _back_to_inbox(request.args.get('next'))
 
 @admin_bp.route('/reply_message', methods=['POST'])
 def reply_message():
@@ -240,19 +260,21 @@ def reply_message():
     
     support_msg = SupportMessage.query.get_or_404(msg_id)
     
-    try:
-        email = Message(
-            subject=f"Re: Support Request (Ticket #{msg_id})",
-            sender=current_app.config['MAIL_USERNAME'],
-            recipients=[support_msg.sender_email],
-            body=f"Hello,\n\nRegarding your issue:\n> {support_msg.message}\n\n{reply_body}\n\nBest Regards,\nRVCE Parking Admin Team"
-        )
-        mail.send(email)
-        
-        support_msg.status = 'replied'
-        db.session.commit()
-        flash(f'✅ Reply sent to {support_msg.sender_email}!', 'success')
-    except Exception as e:
-        flash(f"❌ Failed to send email: {str(e)}", 'error')
+    # Queued in the outbox with the status change; the background sender delivers it
+    outbox.enqueue(
+        f"Re: Support Request (Ticket #{msg_id})",
+        [support_msg.sender_email],
+        f"Hello,\n\nRegarding your issue:\n> {support_msg.message}\n\n{reply_body}\n\nBest Regards,\nRVCE Parking Admin Team",
+        sender=current_app.config['MAIL_USERNAME']
+    )
+    support_msg.status = 'replied'
+    db.session.commit()
+    outbox.wake()
+    flash(f'✅ Reply queued for {support_msg.sender_email}!', 'success')
         
-    return redirect(url_for('admin.view_messages'))
\ No newline at end of file
+    return _back_to_inbox(request.form.get('next'))
+
+@admin_bp.route('/outbox_stats')
+def outbox_stats():
+    # Queue depth by status (pending / sending / sent / dead) and the sender's counters
+    return jsonify(outbox.get_sender().stats())
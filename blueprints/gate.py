@@ -1,14 +1,15 @@
-import cv2
-import easyocr
-import numpy as np
-import requests
 import difflib
-from flask import Blueprint, request, jsonify, render_template
+import threading
+from collections import Counter
+from functools import partial, wraps
+from flask import Blueprint, request, jsonify, render_template, current_app, g
 from datetime import datetime
-from extensions import db, mail
-from flask_mail import Message
+from extensions import db
+from sqlalchemy.exc import IntegrityError, OperationalError
 from models import Vehicle, User, ParkingLot, ParkingSpot, ParkingTransaction
-from blueprints.utils import get_user_sorted_lots
+from services.lot_order import get_user_sorted_lots
+from services.gate_notifications import queue_entry_email, queue_exit_email
+from services import plate_index, spot_allocator, outbox, ocr_pool, ocr_cache, ocr_service, camera, motion, debug_capture, metrics, gate_journal, scan_debounce, spot_events
 
 gate_bp = Blueprint('gate', __name__)
 
@@ -19,110 +20,308 @@ ENTRY_PLATE_IP = MY_PHONE_IP
 ENTRY_ID_IP    = MY_PHONE_IP 
 EXIT_ID_IP     = MY_PHONE_IP 
 
-reader = easyocr.Reader(['en'], gpu=False)
-
-# --- HELPER 1: FETCH IMAGE ---
+MATCH_THRESHOLD = 0.65
+
+# cv2 / numpy / requests are only imported inside the helpers that use them, and easyocr
+# only ever loads in the worker processes of services/ocr_pool.py, so importing this
+# blueprint (and starting the admin/user web tier) stays cheap.
+
+# --- WARM-UP (Call on gate servers so the first car doesn't pay for model loading) ---
+def warm_up():
+    import cv2  # noqa: F401
+    for url in {ENTRY_PLATE_IP, ENTRY_ID_IP, EXIT_ID_IP}:
+        camera.get_grabber(url, current_app.config)
+    ocr_pool.get_pool(current_app.config).warmup()
+    plate_index.ensure_built()
+    spot_allocator.ensure_built()
+    gate_journal.get_journal() # Replays decisions journaled before a restart
+    if current_app.config.get('GATE_AUTO_SCAN'):
+        for role in AUTO_ROLES: start_auto_scan(role)
+
+@gate_bp.cli.command('warmup')
+def warmup_command():
+    """Start the camera grabbers and OCR workers, and build the plate index and spot allocator."""
+    warm_up()
+    print("✅ Gate warmed up: cameras polling, OCR workers loaded, plate index and spot allocator built.")
+
+# --- HELPER 1: FETCH IMAGE (Freshest frame from the background grabber) ---
+@metrics.timed('fetch_image')
 def fetch_image(base_url):
-    try:
-        url = f"{base_url}/shot.jpg"
-        resp = requests.get(url, timeout=3)
-        if resp.status_code == 200:
-            arr = np.asarray(bytearray(resp.content), dtype=np.uint8)
-            frame = cv2.imdecode(arr, -1)
-            return frame, None
-        return None, "Camera Unreachable"
-    except Exception as e:
-        return None, str(e)
+    return camera.get_grabber(base_url, current_app.config).get_frame()
 
 # --- HELPER 2: ROBUST OCR SOUP ---
-def read_ocr_soup(image, debug_filename="debug_ocr.jpg"):
-    cv2.imwrite(debug_filename, image)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, 80, 255, cv2.THRESH_BINARY)
-    res_bin = reader.readtext(binary, detail=0)
-    res_gray = reader.readtext(gray, detail=0)
-    raw_soup = "".join(res_bin + res_gray).upper().replace(" ", "").replace("-", "").replace(".", "")
-    soup_fixed = raw_soup.replace('_', '').replace(';', '').replace(':', '')
-    print(f"🥣 SOUP ({debug_filename}): {soup_fixed}")
+@metrics.timed('ocr')
+def read_ocr_soup(image, gate="ocr", kind='plate', accept=None):
+    """
+    OCR soup for a frame. Runs the cheap single pass first and only escalates to the
+    binary + gray dual pass when confidence is low or `accept(soup)` says it's unusable.
+    """
+    # Re-scans of a car still standing at the barrier reuse the last soup of the same gate and kind
+    cache = ocr_cache.get_cache(current_app.config)
+    frame_hash = ocr_cache.dhash(image)
+    namespace = (kind, gate)
+    cached = cache.get(namespace, frame_hash)
+    if cached is not None:
+        metrics.count('gate_ocr_cache_hits_total')
+        print(f"🥣 SOUP ({gate}, cached): {cached}")
+        return cached
+
+    # Only plate / ID card crops are OCR'd, on the worker pool (raises OCRUnavailable when saturated)
+    result = ocr_service.get_cascade(current_app.config).run(image, kind, accept)
+    soup_fixed = result.soup
+    print(f"🥣 SOUP ({gate}, {result.backend}): {soup_fixed}")
+    if accept and metrics.registry.enabled and not accept(soup_fixed):
+        metrics.count('gate_ocr_misses_total', gate=gate) # Even the last backend found nothing usable
+    cache.put(namespace, frame_hash, soup_fixed)
     return soup_fixed
 
-# --- HELPER 3: SMART MATCHING (Sliding Window) ---
-def find_best_match(soup, all_vehicles):
-    def normalize(text):
-        return text.replace('S', '5').replace('Z', '2').replace('I', '1') \
-                   .replace('O', '0').replace('B', '8').replace('D', '0') \
-                   .replace('G', '6').replace('Q', '0').replace('U', '0')
-
-    norm_soup = normalize(soup)
-    best_vehicle = None; best_score = 0.0
-
-    for v in all_vehicles:
-        plate = v.license_plate.upper()
-        norm_plate = normalize(plate)
-        n = len(norm_plate)
-
-        if plate in soup: return v, 1.0
-
-        max_plate_score = 0.0
-        for i in range(len(norm_soup)):
-            chunk = norm_soup[i : i + n]
-            chunk_short = norm_soup[i : i + n - 1] if (i + n - 1) <= len(norm_soup) else ""
-            
-            if len(chunk) > n * 0.6:
-                score = difflib.SequenceMatcher(None, norm_plate, chunk).ratio()
-                if score > max_plate_score: max_plate_score = score
-            if len(chunk_short) > n * 0.6:
-                score = difflib.SequenceMatcher(None, norm_plate, chunk_short).ratio()
-                if score > max_plate_score: max_plate_score = score
-
-        if max_plate_score > best_score:
-            best_score = max_plate_score; best_vehicle = v
-
-    return best_vehicle, best_score
-
-# --- HELPER 4: EMAIL NOTIFICATIONS 📧 ---
-def send_entry_email(user, lot, spot_number):
+@metrics.timed('debug_capture')
+def capture_debug(gate, image, status_code, payload, soup, expected=None):
+    """
+    Hands the frame to the background debug writer if this gate's capture mode wants it
+    (by default only denied scans). Never blocks the scan: the closest plate is matched
+    in memory, and its owner's plate is loaded by the writer.
+    """
+    capture = debug_capture.get_capture(current_app.config)
+    if not capture.wants(gate, failed=status_code >= 400): return
+    meta = {"status": payload.get("status"), "msg": payload.get("msg"), "soup": soup}
+    resolve = None
+    if expected is not None:
+        meta["expected"] = expected
+    else:
+        # The decision has just brought the index up to date; below MATCH_THRESHOLD the score is a lower bound
+        index = plate_index.plate_index if plate_index.plate_index.built else plate_index.ensure_built()
+        vehicle_id, score = index.match(soup, min_score=MATCH_THRESHOLD)
+        meta["score"] = round(score, 3)
+        if vehicle_id is None: meta["best_plate"] = None
+        else: resolve = partial(best_plate, current_app._get_current_object(), vehicle_id)
+    capture.submit(gate, image, status_code, meta, resolve=resolve)
+
+def best_plate(app, vehicle_id):
+    # Runs on the debug writer thread
+    with app.app_context():
+        vehicle = db.session.get(Vehicle, vehicle_id)
+        return {"best_plate": vehicle.license_plate if vehicle else None}
+
+# --- HELPER 3: SMART MATCHING (Indexed Exact Lookup, then In-Memory Plate Index) ---
+@metrics.timed('match')
+def find_best_match(soup):
+    """
+    Same result as the old sliding-window scan over Vehicle.query.all().
+    Clean reads resolve with one indexed query on the canonical plate column;
+    only the rest go to the fuzzy in-memory index (see services/plate_index.py).
+    """
+    vehicle = plate_index.exact_match(soup)
+    if vehicle: return vehicle, 1.0
+    vehicle_id, score = plate_index.ensure_built().match(soup, min_score=MATCH_THRESHOLD)
+    if vehicle_id is None: return None, score
+    return Vehicle.query.get(vehicle_id), score
+
+def plate_found(soup):
+    # Cascade acceptance test for plate scans (index only, no DB query)
+    return plate_index.ensure_built().match(soup, min_score=MATCH_THRESHOLD)[1] >= MATCH_THRESHOLD
+
+@metrics.timed('id_match')
+def id_matches(expected_usn, soup):
+    if expected_usn and expected_usn in soup: return True
+    return difflib.SequenceMatcher(None, expected_usn, soup).ratio() > 0.45
+
+# --- HELPER 4: SPOT ALLOCATION (In-Memory Free-Spot Pools) ---
+@metrics.timed('allocate')
+def allocate_spot(preferred_lots, faculty):
+    """
+    Lowest available spot in the first preferred lot with space, as (lot, spot_number),
+    or (None, None) when the campus is full. Faculty may take reserved spots.
+    The spot row is flipped with one conditional UPDATE (committed by the caller).
+    The allocator only hears about this process's writes, so a miss there (another
+    process took the spot or reserved it) reloads the lot, and the campus is only
+    full once the preferred lots were reloaded from the database and still have no spot.
+    """
+    allocator = spot_allocator.ensure_built()
+    lots = {lot.lot_id: lot for lot in preferred_lots}
+    resynced = False
+    while True:
+        picked = allocator.take(list(lots), faculty)
+        if picked is None:
+            if resynced: return None, None
+            resync_lots(lots) # Spots freed or unreserved by other processes
+            resynced = True
+            continue
+        lot_id, spot_number = picked
+        query = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number, status='available')
+        if not faculty: query = query.filter_by(reserved_for_faculty=False)
+        try:
+            updated = query.update({'status': 'occupied'}, synchronize_session=False)
+        except OperationalError:
+            allocator.release(lot_id, spot_number) # DB locked / down: hand the spot back, the caller falls back
+            raise
+        if updated: return lots[lot_id], spot_number
+        metrics.count('gate_allocator_resyncs_total')
+        resync_lots([lot_id])
+
+def resync_lots(lot_ids):
+    """Reloads these lots into the allocator from the database, keeping the spots this process journaled taken."""
+    for lot_id in lot_ids: spot_allocator.lot_changed(lot_id)
+    gate_journal.get_journal().hold_pending(lot_ids)
+
+@metrics.timed('commit')
+def open_transaction(plate, lot, spot_number):
+    """
+    Commits the spot UPDATE from allocate_spot and the queued entry email together with the new open transaction.
+    The partial unique indexes on parking_transactions reject a second open transaction
+    for the same plate (two gates scanning one car) or spot; returns False in that case.
+    """
+    db.session.add(ParkingTransaction(license_plate=plate, lot_id=lot.lot_id, spot_number=spot_number, entry_time=datetime.now()))
     try:
-        msg = Message(f"Entry Approved: {lot.location}", recipients=[user.email])
-        msg.body = f"Hello {user.name},\n\nEntry Approved.\n📍 LOT: {lot.location}\n🔢 SPOT: #{spot_number}\n\nDrive carefully!"
-        mail.send(msg)
-        print(f"📧 ENTRY EMAIL SENT to {user.email}")
-    except Exception as e:
-        print(f"⚠️ EMAIL FAILED: {str(e)}")
-
-def send_exit_email(user, txn, lot):
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        # The spot row was rolled back to 'available'; unless it's the spot that is really taken, hand it back
+        if not ParkingTransaction.query.filter_by(lot_id=lot.lot_id, spot_number=spot_number, exit_time=None).first():
+            spot_allocator.spot_released(lot.lot_id, spot_number)
+        return False
+    except OperationalError:
+        db.session.rollback()
+        spot_allocator.spot_released(lot.lot_id, spot_number)
+        raise
+
+def admit(plate, preferred_lots, user, faculty):
+    """
+    Allocates a spot and records the entry; returns (lot_id, location, spot_number, outcome) with
+    outcome 'allowed', 'campus_full', 'already_inside', or 'journaled' when the database
+    could not take the write within GATE_DB_DEADLINE. Then the spot comes from the in-memory
+    allocator and the decision goes to the gate journal (services/gate_journal.py), so the
+    barrier still opens and the reconciler writes it to the DB later.
+    """
+    locations = {lot.lot_id: lot.location for lot in preferred_lots} # Readable after a rollback
     try:
-        # Calculate Duration
-        duration = txn.exit_time - txn.entry_time
-        hours, remainder = divmod(duration.seconds, 3600)
-        minutes = remainder // 60
-        time_str = f"{hours}h {minutes}m"
-
-        msg = Message(f"Exit Summary: {txn.license_plate}", recipients=[user.email])
-        msg.body = f"""
-        Hello {user.name},
-        
-        Your parking session has ended.
-        
-        🚗 VEHICLE:   {txn.license_plate}
-        📍 LOCATION:  {lot.location}
-        
-        🕒 START TIME: {txn.entry_time.strftime('%I:%M %p')}
-        🕒 END TIME:   {txn.exit_time.strftime('%I:%M %p')}
-        ⏳ DURATION:   {time_str}
-        
-        Thank you for using Smart Parking!
-        """
-        mail.send(msg)
-        print(f"📧 EXIT EMAIL SENT to {user.email}")
-    except Exception as e:
-        print(f"⚠️ EXIT EMAIL FAILED: {str(e)}")
-
+        with gate_journal.db_deadline(current_app.config.get('GATE_DB_DEADLINE', 0.5)):
+            lot, spot_number = allocate_spot(preferred_lots, faculty)
+            if not lot: return None, None, None, 'campus_full'
+            queue_entry_email(user, lot, spot_number)
+            if not open_transaction(plate, lot, spot_number): return None, None, None, 'already_inside'
+        outbox.wake()
+        spot_events.spot(lot.lot_id, spot_number, 'occupied')
+        return lot.lot_id, locations[lot.lot_id], spot_number, 'allowed'
+    except OperationalError as e:
+        db.session.rollback()
+        picked = spot_allocator.ensure_built().take(list(locations), faculty)
+        if picked is None: return None, None, None, 'campus_full'
+        gate_journal.get_journal().append('entry', plate, picked[0], picked[1], datetime.now(), error=str(e).splitlines()[0][:200])
+        metrics.count('gate_journaled_total', type='entry')
+        spot_events.spot(picked[0], picked[1], 'occupied')
+        return picked[0], locations[picked[0]], picked[1], 'journaled'
+
+def inside_now(plate):
+    """Open session per the DB, unless a not-yet-replayed journal record says otherwise."""
+    pending = gate_journal.get_journal().pending(plate)
+    if pending: return pending["type"] == 'entry'
+    with metrics.span('lookup'):
+        return ParkingTransaction.query.filter_by(license_plate=plate, exit_time=None).first() is not None
+
+# --- HELPER 5: SCAN DEBOUNCE (Guard pressed SCAN again for the same car) ---
+def debounced(gate):
+    """
+    Wraps a soup -> (payload, status_code) decision: the same soup, or the same matched plate
+    (see repeat_decision), within SCAN_DEBOUNCE_WINDOW gets the previous decision back.
+    """
+    def wrap(decide):
+        @wraps(decide)
+        def inner(soup_fixed):
+            debouncer = scan_debounce.get_debouncer(current_app.config)
+            repeat = debouncer.claim(gate, soup_fixed)
+            if repeat:
+                metrics.count('gate_scans_suppressed_total', gate=gate)
+                return repeat
+            g.debounce_soup, g.debounce_plate, g.debounce_matched = soup_fixed, None, None
+            payload = status_code = None
+            try:
+                payload, status_code = decide(soup_fixed)
+                return payload, status_code
+            finally:
+                # On an exception (OCR / DB busy) nothing is remembered, but waiting scans are released
+                debouncer.settle(gate, (soup_fixed, g.pop('debounce_plate', None)), payload, status_code,
+                                 plate=g.pop('debounce_matched', None))
+        return inner
+    return wrap
+
+def repeat_decision(gate, plate):
+    """Called by a decision once the plate is matched: the earlier decision for it, if still fresh."""
+    g.debounce_matched = plate
+    if plate == g.get('debounce_soup'): return None # Clean read: already claimed as the soup
+    repeat = scan_debounce.get_debouncer(current_app.config).claim(gate, plate)
+    if repeat:
+        metrics.count('gate_scans_suppressed_total', gate=gate)
+        return repeat
+    g.debounce_plate = plate # Owned now; the debounced() wrapper settles it
+    return None
+
+
+@gate_bp.errorhandler(ocr_pool.OCRUnavailable)
+def ocr_unavailable(e):
+    # Backpressure: tell the console to retry instead of queueing behind other gates
+    metrics.count('gate_ocr_busy_total')
+    return jsonify({"status": "busy", "msg": str(e)}), 503
+
+@gate_bp.errorhandler(OperationalError)
+def database_unavailable(e):
+    # Reads that cannot wait (writes fall back to the gate journal instead)
+    db.session.rollback()
+    metrics.count('gate_db_busy_total')
+    return jsonify({"status": "busy", "msg": "Database busy, scan again"}), 503
+
+# --- LATENCY TRACE (One per scan request; spans in the helpers above add to it) ---
+SCAN_ROUTES = {'gate.scan_plate_entry', 'gate.verify_id_and_grant', 'gate.scan_exit_id'}
+
+@gate_bp.before_request
+def start_trace():
+    if request.endpoint in SCAN_ROUTES: metrics.begin(request.endpoint.split('.', 1)[1])
+
+@gate_bp.after_request
+def finish_trace(response):
+    metrics.end(response.status_code)
+    return response
 
 @gate_bp.route('/console')
 def console():
     return render_template('gate/console.html')
 
+@gate_bp.route('/ocr_stats')
+def ocr_stats():
+    stats = ocr_pool.get_pool(current_app.config).stats()
+    stats["cache"] = ocr_cache.get_cache(current_app.config).stats()
+    stats["cascade"] = ocr_service.get_cascade(current_app.config).stats()
+    stats["debounce"] = scan_debounce.get_debouncer(current_app.config).stats()
+    return jsonify(stats)
+
+@gate_bp.route('/debug_capture', methods=['GET', 'POST'])
+def debug_capture_settings():
+    """
+    GET: writer stats. POST {"gate": "plate_entry", "mode": "off|failures|sample|all"}
+    switches capture for one gate at runtime.
+    """
+    capture = debug_capture.get_capture(current_app.config)
+    if request.method == 'POST':
+        data = request.json or {}
+        if data.get('mode') not in debug_capture.MODES or not data.get('gate'):
+            return jsonify({"status": "error", "msg": f"Need a gate and a mode in {debug_capture.MODES}"}), 400
+        capture.set_mode(data['gate'], data['mode'])
+    return jsonify(capture.stats())
+
+@gate_bp.route('/camera_stats')
+def camera_stats():
+    return jsonify(camera.all_stats())
+
+@gate_bp.route('/journal_stats')
+def journal_stats():
+    return jsonify(gate_journal.get_journal().stats())
+
+@gate_bp.route('/latency')
+def latency():
+    # p50 / p95 / p99 per route and stage since start-up (Prometheus histograms are on /metrics)
+    return jsonify(metrics.registry.summary())
+
 # ==========================================================
 # 🚗 ENTRY LOGIC (Steps 1 & 2)
 # ==========================================================
@@ -134,37 +333,48 @@ def scan_plate_entry():
     else:
         frame, error = fetch_image(ENTRY_PLATE_IP)
         if error: return jsonify({"status": "error", "msg": error}), 500
-        soup_fixed = read_ocr_soup(frame, "debug_plate_entry.jpg")
-
-    all_vehicles = Vehicle.query.all()
-    found_vehicle, score = find_best_match(soup_fixed, all_vehicles)
-
-    if not found_vehicle or score < 0.65:
-        return jsonify({"status": "denied", "msg": "No Plate Found", "debug_ocr": soup_fixed}), 404
+        soup_fixed = read_ocr_soup(frame, "plate_entry", accept=plate_found)
+
+    payload, status_code = entry_decision(soup_fixed)
+    if not manual and not payload.get("repeat"): capture_debug("plate_entry", frame, status_code, payload, soup_fixed)
+    return jsonify(payload), status_code
+
+@debounced("plate_entry")
+def entry_decision(soup_fixed):
+    """
+    Step 1 decision for an OCR soup (or manual plate): returns (payload, status_code).
+    Shared by the SCAN button and the motion-triggered auto scanner.
+    """
+    found_vehicle, score = find_best_match(soup_fixed)
+
+    if not found_vehicle or score < MATCH_THRESHOLD:
+        metrics.count('gate_denials_total', reason='no_plate')
+        return {"status": "denied", "msg": "No Plate Found", "debug_ocr": soup_fixed}, 404
+
+    repeat = repeat_decision("plate_entry", found_vehicle.license_plate)
+    if repeat: return repeat
     
-    if ParkingTransaction.query.filter_by(license_plate=found_vehicle.license_plate, exit_time=None).first():
-        return jsonify({"status": "denied", "msg": "Vehicle Already Inside!"}), 400
+    if inside_now(found_vehicle.license_plate):
+        metrics.count('gate_denials_total', reason='already_inside')
+        return {"status": "denied", "msg": "Vehicle Already Inside!"}, 400
 
     user = User.query.get(found_vehicle.user_id)
 
     if user.role == 'faculty':
         print(f"🎓 FACULTY: {user.name} - Bypassing ID Check")
-        preferred_lots = get_user_sorted_lots(user)
-        allocated_spot = None; allocated_lot = None
-        for lot in preferred_lots:
-            spot = ParkingSpot.query.filter_by(lot_id=lot.lot_id, status='available').first()
-            if spot: allocated_spot = spot; allocated_lot = lot; break
-        
-        if not allocated_spot: return jsonify({"status": "denied", "msg": "Campus Full"}), 400
-        
-        allocated_spot.status = 'occupied'
-        new_txn = ParkingTransaction(license_plate=found_vehicle.license_plate, lot_id=allocated_lot.lot_id, spot_number=allocated_spot.spot_number, entry_time=datetime.now())
-        db.session.add(new_txn); db.session.commit()
-        send_entry_email(user, allocated_lot, allocated_spot.spot_number)
+        owner = user.name
+        lot_id, location, spot_number, outcome = admit(found_vehicle.license_plate, get_user_sorted_lots(user), user, faculty=True)
+        if outcome == 'campus_full':
+            metrics.count('gate_denials_total', reason='campus_full')
+            return {"status": "denied", "msg": "Campus Full"}, 400
+        if outcome == 'already_inside':
+            metrics.count('gate_denials_total', reason='already_inside')
+            return {"status": "denied", "msg": "Vehicle Already Inside!"}, 400
         
-        return jsonify({"status": "allowed", "owner": user.name, "lot": allocated_lot.location, "spot": allocated_spot.spot_number, "msg": f"Welcome Faculty {user.name}!"})
+        return {"status": "allowed", "owner": owner, "lot": location, "spot": spot_number, "msg": f"Welcome Faculty {owner}!",
+                "journaled": outcome == 'journaled'}, 200
 
-    return jsonify({"status": "step1_success", "plate": found_vehicle.license_plate, "owner_name": user.name, "expected_usn": user.usn, "msg": f"Verified. Scan ID."})
+    return {"status": "step1_success", "plate": found_vehicle.license_plate, "owner_name": user.name, "expected_usn": user.usn, "msg": f"Verified. Scan ID."}, 200
 
 
 @gate_bp.route('/verify_id_and_grant', methods=['POST'])
@@ -178,35 +388,38 @@ def verify_id_and_grant():
     else:
         frame, error = fetch_image(ENTRY_ID_IP)
         if error: return jsonify({"status": "error", "msg": error}), 500
-        soup_fixed = read_ocr_soup(frame, "debug_id_entry.jpg")
-
-    match = False
-    if expected_usn and expected_usn in soup_fixed: match = True
-    else:
-        score = difflib.SequenceMatcher(None, expected_usn, soup_fixed).ratio()
-        if score > 0.45: match = True
-
-    if not match: return jsonify({"status": "denied", "msg": f"ID Mismatch (Expected {expected_usn})", "debug_data": soup_fixed}), 400
-
+        soup_fixed = read_ocr_soup(frame, "id_entry", kind='id',
+                                   accept=lambda soup: id_matches(expected_usn, soup))
+
+    if not id_matches(expected_usn, soup_fixed):
+        metrics.count('gate_denials_total', reason='id_mismatch')
+        payload = {"status": "denied", "msg": f"ID Mismatch (Expected {expected_usn})", "debug_data": soup_fixed}
+        if not manual_id: capture_debug("id_entry", frame, 400, payload, soup_fixed, expected=expected_usn)
+        return jsonify(payload), 400
+    if not manual_id: capture_debug("id_entry", frame, 200, {"status": "verified"}, soup_fixed, expected=expected_usn)
+
+    payload, status_code = grant_entry(plate)
+    return jsonify(payload), status_code
+
+@debounced("id_entry")
+def grant_entry(plate):
+    # Step 2 once the ID matched; debounced on the plate, so pressing Scan ID again returns the same spot
+    g.debounce_matched = plate
     vehicle = Vehicle.query.filter_by(license_plate=plate).first()
     user = User.query.get(vehicle.user_id)
-    preferred_lots = get_user_sorted_lots(user)
-    
-    allocated_spot = None; allocated_lot = None
-    for lot in preferred_lots:
-        query = ParkingSpot.query.filter_by(lot_id=lot.lot_id, status='available')
-        if user.role != 'faculty': query = query.filter_by(reserved_for_faculty=False)
-        spot = query.first()
-        if spot: allocated_spot = spot; allocated_lot = lot; break
-            
-    if not allocated_spot: return jsonify({"status": "denied", "msg": "Campus Full"}), 400
-
-    allocated_spot.status = 'occupied'
-    new_txn = ParkingTransaction(license_plate=plate, lot_id=allocated_lot.lot_id, spot_number=allocated_spot.spot_number, entry_time=datetime.now())
-    db.session.add(new_txn); db.session.commit()
-    send_entry_email(user, allocated_lot, allocated_spot.spot_number)
+    owner = user.name
+    if inside_now(plate):
+        metrics.count('gate_denials_total', reason='already_inside')
+        return {"status": "denied", "msg": "Vehicle Already Inside!"}, 400
+    lot_id, location, spot_number, outcome = admit(plate, get_user_sorted_lots(user), user, faculty=user.role == 'faculty')
+    if outcome == 'campus_full':
+        metrics.count('gate_denials_total', reason='campus_full')
+        return {"status": "denied", "msg": "Campus Full"}, 400
+    if outcome == 'already_inside':
+        metrics.count('gate_denials_total', reason='already_inside')
+        return {"status": "denied", "msg": "Vehicle Already Inside!"}, 400
 
-    return jsonify({"status": "allowed", "owner": user.name, "lot": allocated_lot.location, "spot": allocated_spot.spot_number})
+    return {"status": "allowed", "owner": owner, "lot": location, "spot": spot_number, "journaled": outcome == 'journaled'}, 200
 
 
 # ==========================================================
@@ -221,30 +434,288 @@ def scan_exit_id():
     else:
         frame, error = fetch_image(EXIT_ID_IP)
         if error: return jsonify({"status": "error", "msg": error}), 500
-        soup_fixed = read_ocr_soup(frame, "debug_exit_plate.jpg")
-
-    all_vehicles = Vehicle.query.all()
-    found_vehicle, score = find_best_match(soup_fixed, all_vehicles)
+        soup_fixed = read_ocr_soup(frame, "exit_plate", accept=plate_found)
+
+    payload, status_code = exit_decision(soup_fixed)
+    if not manual_plate and not payload.get("repeat"): capture_debug("exit_plate", frame, status_code, payload, soup_fixed)
+    return jsonify(payload), status_code
+
+@debounced("exit_plate")
+def exit_decision(soup_fixed):
+    """
+    Exit decision for an OCR soup (or manual plate): returns (payload, status_code).
+    """
+    found_vehicle, score = find_best_match(soup_fixed)
+
+    if not found_vehicle or score < MATCH_THRESHOLD:
+        metrics.count('gate_denials_total', reason='no_plate')
+        return {"status": "denied", "msg": "No Plate Found", "debug": soup_fixed}, 404
+
+    plate = found_vehicle.license_plate
+    repeat = repeat_decision("exit_plate", plate)
+    if repeat: return repeat
+    pending = gate_journal.get_journal().pending(plate)
+    if pending and pending["type"] == 'exit':
+        metrics.count('gate_denials_total', reason='not_inside')
+        return {"status": "denied", "msg": f"Vehicle {plate} not inside."}, 404
 
-    if not found_vehicle or score < 0.65:
-        return jsonify({"status": "denied", "msg": "No Plate Found", "debug": soup_fixed}), 404
+    user = User.query.get(found_vehicle.user_id)
+    owner = user.name
+    if pending:
+        # Entered while the DB was busy and not replayed yet: the exit has to follow it through the journal
+        return journal_exit(plate, owner, pending["lot_id"], pending["spot_number"], "entry not replayed yet")
 
-    active_txn = ParkingTransaction.query.filter_by(license_plate=found_vehicle.license_plate, exit_time=None).first()
+    with metrics.span('lookup'):
+        active_txn = ParkingTransaction.query.filter_by(license_plate=plate, exit_time=None).first()
     
     if not active_txn:
-        return jsonify({"status": "denied", "msg": f"Vehicle {found_vehicle.license_plate} not inside."}), 404
+        metrics.count('gate_denials_total', reason='not_inside')
+        return {"status": "denied", "msg": f"Vehicle {plate} not inside."}, 404
 
     # CHECKOUT
-    user = User.query.get(found_vehicle.user_id)
-    spot = ParkingSpot.query.filter_by(lot_id=active_txn.lot_id, spot_number=active_txn.spot_number).first()
-    current_lot = ParkingLot.query.get(active_txn.lot_id) # Need lot details for email
+    with metrics.span('lookup'):
+        spot = ParkingSpot.query.filter_by(lot_id=active_txn.lot_id, spot_number=active_txn.spot_number).first()
+        current_lot = ParkingLot.query.get(active_txn.lot_id) # Need lot details for email
+    lot_id, spot_number = active_txn.lot_id, active_txn.spot_number
 
-    if spot: spot.status = 'available'
-    
-    active_txn.exit_time = datetime.now()
-    db.session.commit()
+    # Close the transaction only if no other gate closed it in the meantime
+    exit_time = datetime.now()
+    try:
+        with gate_journal.db_deadline(current_app.config.get('GATE_DB_DEADLINE', 0.5)):
+            with metrics.span('commit'):
+                closed = ParkingTransaction.query.filter_by(transaction_id=active_txn.transaction_id, exit_time=None) \
+                                                 .update({'exit_time': exit_time})
+            if not closed:
+                db.session.rollback()
+                metrics.count('gate_denials_total', reason='not_inside')
+                return {"status": "denied", "msg": f"Vehicle {plate} not inside."}, 404
+            active_txn.exit_time = exit_time
+            if spot: spot.status = 'available'
+
+            # EXIT EMAIL 📧 (queued in the same commit)
+            queue_exit_email(user, active_txn, current_lot)
+            with metrics.span('commit'):
+                db.session.commit()
+    except OperationalError as e:
+        db.session.rollback()
+        return journal_exit(plate, owner, lot_id, spot_number, str(e).splitlines()[0][:200])
+    if spot:
+        spot_allocator.spot_released(lot_id, spot_number)
+        spot_events.spot(lot_id, spot_number, 'available')
+    outbox.wake()
+
+    return {"status": "allowed", "msg": f"Goodbye {owner}!", "plate": plate}, 200
+
+def journal_exit(plate, owner, lot_id, spot_number, reason):
+    # The spot stays taken in the allocator until the reconciler has written the exit
+    gate_journal.get_journal().append('exit', plate, lot_id, spot_number, datetime.now(), error=reason)
+    metrics.count('gate_journaled_total', type='exit')
+    return {"status": "allowed", "msg": f"Goodbye {owner}!", "plate": plate, "journaled": True}, 200
 
-    # SEND EXIT EMAIL 📧
-    send_exit_email(user, active_txn, current_lot)
 
-    return jsonify({"status": "allowed", "msg": f"Goodbye {user.name}!", "plate": active_txn.license_plate})
\ No newline at end of file
+# ==========================================================
+# 📋 BATCH REPLAY (Scans Written Down While the Gate Was Offline)
+# ==========================================================
+def parse_event_time(value):
+    """ISO-8601 string -> naive local datetime (what datetime.now() stores), or None if unusable."""
+    try:
+        when = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if when.tzinfo is not None: when = when.astimezone().replace(tzinfo=None)
+    return when
+
+@gate_bp.route('/events/batch', methods=['POST'])
+def replay_events():
+    """
+    POST {"events": [{"type": "entry"|"exit", "plate": "KA01AB1234", "time": "2026-10-17T08:05:00",
+                      "usn": "1RV22CS001" (optional, checked for students)}, ...], "notify": true}
+
+    Replays the events in time order against one snapshot: all plates are matched at once
+    (services/plate_index.match_many), open transactions, users and lots are loaded with one
+    query each, and everything is committed in a single transaction. entry_time / exit_time
+    keep the times the guard wrote down. Returns one result per event, in request order.
+    A conflict with a live gate (the same car scanned in meanwhile) rolls back the whole
+    batch with 409 so it can simply be sent again.
+    """
+    data = request.json or {}
+    events = data.get('events')
+    limit = current_app.config.get('GATE_BATCH_MAX_EVENTS', 1000)
+    if not isinstance(events, list) or not events:
+        return jsonify({"status": "error", "msg": "Need a non-empty 'events' list"}), 400
+    if len(events) > limit:
+        return jsonify({"status": "error", "msg": f"At most {limit} events per batch"}), 413
+    notify = data.get('notify', True)
+
+    results = [None] * len(events)
+    todo = []
+    latest = datetime.now()
+    for i, event in enumerate(events):
+        event = event if isinstance(event, dict) else {}
+        kind, plate = event.get('type'), str(event.get('plate') or '').strip().upper()
+        when = parse_event_time(event.get('time'))
+        if kind not in ('entry', 'exit') or not plate or when is None or when > latest:
+            results[i] = {"index": i, "status": "error", "msg": "Need type entry/exit, a plate and a past ISO time"}
+            continue
+        todo.append((when, i, kind, plate, str(event.get('usn') or '').strip().upper()))
+    todo.sort()
+
+    # --- One snapshot for the whole batch ---
+    with metrics.span('match'):
+        matches = plate_index.match_many([plate for _, _, _, plate, _ in todo], min_score=MATCH_THRESHOLD)
+    vehicles = {p: v for p, (v, score) in matches.items() if v is not None and score >= MATCH_THRESHOLD}
+    with metrics.span('lookup'):
+        found_plates = {v.license_plate for v in vehicles.values()}
+        inside = {t.license_plate: t for t in ParkingTransaction.query.filter(
+            ParkingTransaction.license_plate.in_(found_plates), ParkingTransaction.exit_time.is_(None))} if found_plates else {}
+        users = {u.user_id: u for u in User.query.filter(
+            User.user_id.in_({v.user_id for v in vehicles.values()}))} if vehicles else {}
+        all_lots = ParkingLot.query.all()
+    lots = {lot.lot_id: lot for lot in all_lots}
+
+    released, touched_lots, emailed = [], set(), False
+    def apply():
+        nonlocal emailed
+        for when, i, kind, typed, usn in todo:
+            vehicle = vehicles.get(typed)
+            if vehicle is None:
+                metrics.count('gate_denials_total', reason='no_plate')
+                results[i] = {"index": i, "type": kind, "plate": typed, "status": "denied", "msg": "No Plate Found"}
+                continue
+            plate, user = vehicle.license_plate, users.get(vehicle.user_id)
+            result = {"index": i, "type": kind, "plate": plate, "time": when.isoformat()}
+            results[i] = result
+
+            if kind == 'entry':
+                if plate in inside:
+                    metrics.count('gate_denials_total', reason='already_inside')
+                    result.update(status="denied", msg="Vehicle Already Inside!"); continue
+                if usn and user.role != 'faculty' and not id_matches(user.usn, usn):
+                    metrics.count('gate_denials_total', reason='id_mismatch')
+                    result.update(status="denied", msg=f"ID Mismatch (Expected {user.usn})"); continue
+                lot, spot_number = allocate_spot(get_user_sorted_lots(user, all_lots), faculty=user.role == 'faculty')
+                if not lot:
+                    metrics.count('gate_denials_total', reason='campus_full')
+                    result.update(status="denied", msg="Campus Full"); continue
+                touched_lots.add(lot.lot_id)
+                txn = ParkingTransaction(license_plate=plate, lot_id=lot.lot_id, spot_number=spot_number, entry_time=when)
+                db.session.add(txn)
+                inside[plate] = txn
+                if notify: queue_entry_email(user, lot, spot_number); emailed = True
+                result.update(status="allowed", owner=user.name, lot=lot.location, spot=spot_number)
+            else:
+                txn = inside.get(plate)
+                if txn is None:
+                    metrics.count('gate_denials_total', reason='not_inside')
+                    result.update(status="denied", msg=f"Vehicle {plate} not inside."); continue
+                if when < txn.entry_time:
+                    result.update(status="denied", msg="Exit time is before the entry time"); continue
+                with metrics.span('commit'):
+                    if txn.transaction_id is not None:
+                        # Only close it if no live gate closed it in the meantime
+                        closed = ParkingTransaction.query.filter_by(transaction_id=txn.transaction_id, exit_time=None) \
+                                                         .update({'exit_time': when}, synchronize_session=False)
+                        if not closed:
+                            result.update(status="denied", msg=f"Vehicle {plate} not inside."); continue
+                    ParkingSpot.query.filter_by(lot_id=txn.lot_id, spot_number=txn.spot_number) \
+                                     .update({'status': 'available'}, synchronize_session=False)
+                txn.exit_time = when
+                del inside[plate]
+                released.append((txn.lot_id, txn.spot_number))
+                if notify: queue_exit_email(user, txn, lots[txn.lot_id]); emailed = True
+                result.update(status="allowed", owner=user.name)
+
+    try:
+        # New transactions and emails are inserted together at commit, not flushed one per event
+        with db.session.no_autoflush: apply()
+        with metrics.span('commit'):
+            db.session.commit()
+    except (IntegrityError, OperationalError) as e:
+        db.session.rollback()
+        # Spots taken from the allocator were rolled back in the DB; reload those lots
+        for lot_id in touched_lots: spot_allocator.lot_changed(lot_id)
+        if isinstance(e, OperationalError):
+            return jsonify({"status": "busy", "msg": "Database busy; nothing was saved, send the batch again"}), 503
+        return jsonify({"status": "conflict", "msg": "A live gate changed one of these cars meanwhile; nothing was saved, send the batch again"}), 409
+    for lot_id, spot_number in released: spot_allocator.spot_released(lot_id, spot_number)
+    if emailed: outbox.wake()
+    if released or touched_lots: spot_events.resync("batch replay")
+
+    summary = Counter(r["status"] for r in results)
+    return jsonify({"status": "success", "summary": dict(summary), "results": results})
+
+
+# ==========================================================
+# 🎥 AUTO SCAN (Motion-Triggered, No SCAN Button)
+# ==========================================================
+# role -> (camera, gate name for logs / debug captures, decision)
+AUTO_ROLES = {
+    'entry': (ENTRY_PLATE_IP, "plate_entry", entry_decision),
+    'exit':  (EXIT_ID_IP, "exit_plate", exit_decision),
+}
+
+auto_feed = motion.DecisionFeed()
+_scanners = {}
+_scanners_lock = threading.Lock()
+
+def start_auto_scan(role):
+    app = current_app._get_current_object()
+    config = app.config
+    with _scanners_lock:
+        scanner = _scanners.get(role)
+        if scanner and scanner.running: return scanner
+
+        camera_url, gate, decide = AUTO_ROLES[role]
+        def scan(frame):
+            metrics.begin(f"auto_{role}")
+            status_code = 500
+            try:
+                soup = read_ocr_soup(frame, gate, accept=plate_found)
+                payload, status_code = decide(soup)
+                capture_debug(gate, frame, status_code, payload, soup)
+                return payload, status_code
+            finally:
+                metrics.end(status_code)
+
+        detector = motion.MotionDetector(
+            presence=config.get('AUTO_SCAN_PRESENCE', 0.02),
+            motion=config.get('AUTO_SCAN_MOTION', 0.005),
+            stable_frames=config.get('AUTO_SCAN_STABLE_FRAMES', 3)
+        )
+        scanner = motion.AutoScanner(app, role, camera.get_grabber(camera_url, config), scan, auto_feed,
+                                     detector, max_attempts=config.get('AUTO_SCAN_MAX_ATTEMPTS', 2))
+        _scanners[role] = scanner.start()
+        print(f"🎥 AUTO SCAN started for {role} camera {camera_url}")
+    return scanner
+
+def stop_auto_scan(role):
+    with _scanners_lock:
+        scanner = _scanners.pop(role, None)
+    if scanner: scanner.stop()
+
+@gate_bp.route('/auto/<role>', methods=['POST'])
+def toggle_auto_scan(role):
+    if role not in AUTO_ROLES:
+        return jsonify({"status": "error", "msg": f"Unknown gate role '{role}'"}), 404
+    if (request.json or {}).get('enabled', True): start_auto_scan(role)
+    else: stop_auto_scan(role)
+    return jsonify({"status": "success", "role": role, "running": role in _scanners})
+
+@gate_bp.route('/auto/events')
+def auto_events():
+    """
+    Long-poll for auto-scan decisions. Call once without ?after= to get the current seq,
+    then keep calling with ?after=<last seq>.
+    """
+    after = request.args.get('after', type=int)
+    if after is None:
+        _, seq = auto_feed.wait(after=-1, timeout=0)
+        return jsonify({"seq": seq, "events": []})
+    events, seq = auto_feed.wait(after, timeout=20)
+    return jsonify({"seq": seq, "events": events})
+
+@gate_bp.route('/auto/stats')
+def auto_stats():
+    # frames_seen vs ocr_calls = OCR work saved compared with scanning every frame
+    return jsonify([s.stats() for s in list(_scanners.values())])
+
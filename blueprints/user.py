@@ -1,14 +1,13 @@
-import os
 import re
-import json
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from models import Vehicle, User, ParkingLot, ParkingSpot, ParkingTransaction
+from models import Vehicle, User, ParkingLot, ParkingSpot, ParkingTransaction, PendingVehicle
 from extensions import db
+from services import plate_index
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 user_bp = Blueprint('user', __name__)
-PENDING_FILE = 'pending_vehicles.json'
 
 # --- HELPER: SORT LOTS ---
 def get_user_sorted_lots(user):
@@ -39,18 +38,12 @@ def dashboard():
     # Define vehicle_plates list for use in Active Session and History queries
     vehicle_plates = [v.license_plate for v in my_vehicles]
     
-    # 2. Pull Pending/Rejected from JSON (Filter out those already in the DB)
-    pending_list = []
-    if os.path.exists(PENDING_FILE):
-        try:
-            with open(PENDING_FILE, 'r') as f:
-                all_pending = json.load(f)
-                # Only show JSON entries if the plate isn't already approved in DB
-                pending_list = [v for v in all_pending 
-                               if str(v['user_id']) == str(user.user_id) 
-                               and v['license_plate'] not in vehicle_plates]
-        except: 
-            pending_list = []
+    # 2. Pull this user's Pending/Rejected requests (Filter out those already in the DB)
+    pending_list = PendingVehicle.query.filter(
+        PendingVehicle.user_id == user.user_id,
+        PendingVehicle.status.in_(('pending', 'rejected'))
+    ).order_by(PendingVehicle.created_at).all()
+    pending_list = [p for p in pending_list if p.license_plate not in vehicle_plates]
 
     # 3. Active Session
     active_txn = None
@@ -117,27 +110,23 @@ def register_vehicle():
         flash('Vehicle already registered!', 'error')
         return redirect(url_for('user.register_vehicle'))
 
-    # C. Save to Pending
-    new_request = {
-        "user_id": current_user_id,
-        "license_plate": plate,
-        "model": model,
-        "dl_number": dl_clean,
-        "status": "pending",
-        "dl_file": "simulated_doc.pdf", 
-        "rc_file": "simulated_doc.pdf"
-    }
-    
-    data = []
-    if os.path.exists(PENDING_FILE):
-        try:
-            with open(PENDING_FILE, 'r') as f:
-                data = json.load(f)
-        except: data = []
-    
-    data.append(new_request)
-    with open(PENDING_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+    # C. Save to Pending (one row; the partial unique index allows one open request per plate)
+    new_request = PendingVehicle(
+        user_id=user.user_id,
+        license_plate=plate,
+        model=model,
+        dl_number=dl_clean,
+        status='pending',
+        dl_file="simulated_doc.pdf", 
+        rc_file="simulated_doc.pdf"
+    )
+    db.session.add(new_request)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        flash('Vehicle is already awaiting approval!', 'error')
+        return redirect(url_for('user.register_vehicle'))
         
     flash('Vehicle submitted for approval!', 'success')
     return redirect(url_for('user.dashboard'))
@@ -155,19 +144,21 @@ def delete_vehicle(plate):
     # 1. Try to delete from DB
     vehicle = Vehicle.query.filter_by(license_plate=plate, user_id=user.user_id).first()
     if vehicle:
+        vehicle_id = vehicle.id
         db.session.delete(vehicle)
         db.session.commit()
+        plate_index.vehicle_removed(vehicle_id)
         return jsonify({'status': 'success', 'msg': 'Vehicle removed from database'})
 
-    # 2. Try to clear from JSON (Removes Rejected/Pending badges)
-    if os.path.exists(PENDING_FILE):
-        with open(PENDING_FILE, 'r') as f:
-            pending = json.load(f)
-        new_pending = [v for v in pending if not (v['license_plate'] == plate and str(v['user_id']) == str(current_user_id))]
-        if len(new_pending) != len(pending):
-            with open(PENDING_FILE, 'w') as f:
-                json.dump(new_pending, f, indent=4)
-            return jsonify({'status': 'success', 'msg': 'Request cleared'})
+    # 2. Try to clear the request (Removes Rejected/Pending badges)
+    cleared = PendingVehicle.query.filter(
+        PendingVehicle.license_plate == plate,
+        PendingVehicle.user_id == user.user_id,
+        PendingVehicle.status.in_(('pending', 'rejected'))
+    ).delete(synchronize_session=False)
+    if cleared:
+        db.session.commit()
+        return jsonify({'status': 'success', 'msg': 'Request cleared'})
 
     return jsonify({'status': 'error', 'msg': 'Record not found'}), 404
 
@@ -25,9 +25,84 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024 
 
     # --- 4. EMAIL ---
-    MAIL_SERVER = 'smtp.gmail.com'
-    MAIL_PORT = 587
-    MAIL_USE_TLS = True
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')  # 127.0.0.1 + tools/fake_smtp.py for local testing
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '1') == '1'
     MAIL_USERNAME = 'your-mail@gmail.com'
     MAIL_PASSWORD = 'your-mail@gmail.com'
-    MAIL_DEFAULT_SENDER = ('RVCE Parking', 'your-mail@gmail.com')
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = ('RVCE Parking', 'your-mail@gmail.com')
+
+    # --- 5. GATE OCR WORKER POOL ---
+    OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 2))          # Processes, each holding one easyocr model
+    OCR_QUEUE_LIMIT = int(os.environ.get('OCR_QUEUE_LIMIT', 8))  # Images queued/running before scans get a 503
+    OCR_TIMEOUT = float(os.environ.get('OCR_TIMEOUT', 10))       # Seconds a scan waits for its OCR results
+
+    OCR_USE_ROI = os.environ.get('OCR_USE_ROI', '1') == '1'      # OCR only plate/ID-card crops when one is found
+
+    OCR_CASCADE = os.environ.get('OCR_CASCADE', '1') == '1'      # Try one cheap gray pass before the dual pass
+    OCR_CASCADE_MIN_CONFIDENCE = float(os.environ.get('OCR_CASCADE_MIN_CONFIDENCE', 0.6))  # Mean easyocr confidence to trust it
+
+    # OCR result cache for repeated scans of the same parked car (keyed by frame dHash)
+    OCR_CACHE_SIZE = int(os.environ.get('OCR_CACHE_SIZE', 32))                # Soups kept (LRU)
+    OCR_CACHE_TTL = float(os.environ.get('OCR_CACHE_TTL', 5))                 # Seconds; keep short so the next car never hits
+    OCR_CACHE_MAX_DISTANCE = int(os.environ.get('OCR_CACHE_MAX_DISTANCE', 5)) # Max differing bits of 256 to count as same frame
+    SCAN_DEBOUNCE_WINDOW = float(os.environ.get('SCAN_DEBOUNCE_WINDOW', 3))   # Seconds a repeat scan of the same car gets the last decision (0 = off)
+
+    # --- 6. STARTUP ---
+    ENABLE_GATE = os.environ.get('ENABLE_GATE', '1') == '1'   # '0' = admin/user tier only, no OCR stack
+    GATE_WARMUP = os.environ.get('GATE_WARMUP', '0') == '1'   # '1' = load OCR workers when app.py starts
+
+    # --- 7. GATE CAMERAS (Background frame grabbers) ---
+    CAMERA_MODE = os.environ.get('CAMERA_MODE', 'poll')                        # 'poll' shot.jpg or 'mjpeg' /video
+    CAMERA_POLL_INTERVAL = float(os.environ.get('CAMERA_POLL_INTERVAL', 0.2))  # Seconds between shots
+    CAMERA_BUFFER_FRAMES = int(os.environ.get('CAMERA_BUFFER_FRAMES', 5))      # Frames kept per camera
+    CAMERA_MAX_FRAME_AGE = float(os.environ.get('CAMERA_MAX_FRAME_AGE', 1.0))  # Older frames are stale -> fetch live
+
+    # --- 8. AUTO SCAN (Motion-triggered OCR, no button press needed) ---
+    GATE_AUTO_SCAN = os.environ.get('GATE_AUTO_SCAN', '0') == '1'          # Start entry/exit scanners in warm_up
+    AUTO_SCAN_PRESENCE = float(os.environ.get('AUTO_SCAN_PRESENCE', 0.02)) # Fraction of pixels changed vs empty scene = vehicle
+    AUTO_SCAN_MOTION = float(os.environ.get('AUTO_SCAN_MOTION', 0.005))    # Fraction changed between frames = still moving
+    AUTO_SCAN_STABLE_FRAMES = int(os.environ.get('AUTO_SCAN_STABLE_FRAMES', 3))
+    AUTO_SCAN_MAX_ATTEMPTS = int(os.environ.get('AUTO_SCAN_MAX_ATTEMPTS', 2))  # OCR tries per vehicle if no plate matched
+
+    # --- 9. DEBUG CAPTURE (Forensic gate images, written by a background thread) ---
+    DEBUG_CAPTURE_DIR = os.environ.get('DEBUG_CAPTURE_DIR', os.path.join(BASE_DIR, 'instance', 'debug_captures'))
+    DEBUG_CAPTURE_MODE = os.environ.get('DEBUG_CAPTURE_MODE', 'failures')          # off / failures / sample / all
+    DEBUG_CAPTURE_GATES = os.environ.get('DEBUG_CAPTURE_GATES', '')                # Per-gate override, e.g. 'id_entry=off,exit_plate=all'
+    DEBUG_CAPTURE_SAMPLE_EVERY = int(os.environ.get('DEBUG_CAPTURE_SAMPLE_EVERY', 10))  # 'sample': keep 1 in N successful scans
+    DEBUG_CAPTURE_MAX_FILES = int(os.environ.get('DEBUG_CAPTURE_MAX_FILES', 200))  # Oldest captures deleted beyond this
+    DEBUG_CAPTURE_QUEUE = int(os.environ.get('DEBUG_CAPTURE_QUEUE', 16))           # Pending writes; more are dropped, not waited on
+
+    # --- 10. EMAIL OUTBOX (Gate/admin mail is queued in the DB and sent in the background) ---
+    OUTBOX_SENDER = os.environ.get('OUTBOX_SENDER', '1') == '1'                 # '0' = this process only queues
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 20))             # Emails claimed per round
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 2.0))    # Seconds between checks when idle
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))          # Then status 'dead'
+    OUTBOX_BACKOFF = float(os.environ.get('OUTBOX_BACKOFF', 30))                 # Seconds before 1st retry, doubling
+    OUTBOX_KEEPALIVE = float(os.environ.get('OUTBOX_KEEPALIVE', 30))             # Idle seconds before the SMTP connection closes
+    OUTBOX_RETENTION_DAYS = float(os.environ.get('OUTBOX_RETENTION_DAYS', 30))   # Sent rows are deleted after this; 0 = keep
+
+    # --- 11. METRICS (Per-stage gate latency, Prometheus text on /metrics) ---
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'   # '0' = spans and counters become no-ops
+    METRICS_LOG = os.environ.get('METRICS_LOG', '0') == '1'           # '1' = one JSON log line per gate scan
+
+    # --- 12. BATCH REPLAY (Scans written down while the gate was offline) ---
+    GATE_BATCH_MAX_EVENTS = int(os.environ.get('GATE_BATCH_MAX_EVENTS', 1000))  # Per POST /api/gate/events/batch
+
+    # --- 13. GATE JOURNAL (Barrier keeps working while the database is locked or down) ---
+    GATE_DB_DEADLINE = float(os.environ.get('GATE_DB_DEADLINE', 0.5))   # Seconds a gate write waits on a locked DB
+    GATE_JOURNAL_PATH = os.environ.get('GATE_JOURNAL_PATH', os.path.join(BASE_DIR, 'instance', 'gate_journal.jsonl'))  # Each process writes <name>.<pid>.jsonl
+    GATE_JOURNAL_RECONCILE_INTERVAL = float(os.environ.get('GATE_JOURNAL_RECONCILE_INTERVAL', 5))  # Seconds between replay attempts
+
+    # --- 14. LIVE SPOT EVENTS (Server-Sent Events on /api/admin/events) ---
+    SPOT_EVENTS_HISTORY = int(os.environ.get('SPOT_EVENTS_HISTORY', 1024))        # Events kept for reconnects (Last-Event-ID)
+    SPOT_EVENTS_HEARTBEAT = float(os.environ.get('SPOT_EVENTS_HEARTBEAT', 15))    # Seconds between keep-alive comments
+    SPOT_EVENTS_QUEUE = int(os.environ.get('SPOT_EVENTS_QUEUE', 256))             # Per client; a slower client gets a fresh snapshot
+
+    # --- 15. SPOT PROVISIONING (Bulk create / resize of lots) ---
+    SPOT_RESERVED_RATIO = float(os.environ.get('SPOT_RESERVED_RATIO', 0.2))   # First share of a new lot kept for faculty
+    SPOT_INSERT_CHUNK = int(os.environ.get('SPOT_INSERT_CHUNK', 5000))        # Rows per executemany when adding spots
+
+    # --- 16. ADMIN CONSOLES (Paginated approval queue / support inbox) ---
+    APPROVALS_PAGE_SIZE = int(os.environ.get('APPROVALS_PAGE_SIZE', 50))   # Requests per page (keyset pagination)
+    SUPPORT_PAGE_SIZE = int(os.environ.get('SUPPORT_PAGE_SIZE', 50))       # Inbox messages per page (keyset pagination)
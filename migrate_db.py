@@ -0,0 +1,141 @@
+import json
+import os
+os.environ.setdefault('ENABLE_GATE', '0') # Maintenance scripts never need the gate's OCR stack
+
+from sqlalchemy import inspect, text
+
+from app import create_app
+from extensions import db
+from models import Vehicle, PendingVehicle, User, SUPPORT_FTS_DDL
+from services.plate_index import canonical
+
+# Brings an existing parking.db up to date with models.py. Every step is safe to re-run.
+# (Fresh databases get all of this from db.create_all() in setup_db.py / app.py.)
+
+def add_column(table, column, ddl):
+    columns = {c['name'] for c in inspect(db.engine).get_columns(table)}
+    if column in columns: return False
+    db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    db.session.commit()
+    return True
+
+def create_index(name, table, columns, unique=False):
+    db.session.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    db.session.commit()
+
+# --- 1. CANONICAL PLATE COLUMN (Gate exact-match fast path) ---
+def migrate_plate_canonical():
+    if add_column('vehicles', 'plate_canonical', 'VARCHAR(20)'):
+        print("➕ Added vehicles.plate_canonical")
+    create_index('ix_vehicles_plate_canonical', 'vehicles', 'plate_canonical')
+
+    filled = 0
+    for v in Vehicle.query.all():
+        value = canonical(v.license_plate)
+        if v.plate_canonical != value:
+            v.plate_canonical = value; filled += 1
+    db.session.commit()
+    print(f"✅ plate_canonical up to date ({filled} vehicles filled)")
+
+
+# --- 2. ONE OPEN TRANSACTION PER PLATE / PER SPOT (Race-free gate allocation) ---
+def migrate_open_transaction_constraints():
+    dupes = db.session.execute(text(
+        "SELECT 'plate ' || license_plate, COUNT(*) FROM parking_transactions WHERE exit_time IS NULL "
+        "GROUP BY license_plate HAVING COUNT(*) > 1 "
+        "UNION ALL SELECT 'spot ' || lot_id || '/' || spot_number, COUNT(*) FROM parking_transactions "
+        "WHERE exit_time IS NULL GROUP BY lot_id, spot_number HAVING COUNT(*) > 1")).all()
+    if dupes:
+        for what, n in dupes: print(f"❌ {n} open transactions for {what}")
+        print("⚠️ Close the duplicates above (set exit_time) and re-run; unique indexes NOT created.")
+        return
+    db.session.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_txn_open_plate "
+                            "ON parking_transactions (license_plate) WHERE exit_time IS NULL"))
+    db.session.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_txn_open_spot "
+                            "ON parking_transactions (lot_id, spot_number) WHERE exit_time IS NULL"))
+    db.session.commit()
+    print("✅ Open-transaction unique indexes in place")
+
+
+# --- 3. COMPOSITE INDEXES (See tools/query_audit.py) ---
+def migrate_indexes():
+    dupes = db.session.execute(text(
+        "SELECT lot_id, spot_number, COUNT(*) FROM parking_spots GROUP BY lot_id, spot_number HAVING COUNT(*) > 1")).all()
+    if dupes:
+        for lot_id, spot_number, n in dupes: print(f"❌ Spot {lot_id}/{spot_number} exists {n}x")
+        print("⚠️ Remove the duplicate spots above and re-run; ux_spots_lot_number NOT created.")
+    else:
+        create_index('ux_spots_lot_number', 'parking_spots', 'lot_id, spot_number', unique=True)
+    create_index('ix_spots_lot_status', 'parking_spots', 'lot_id, status, reserved_for_faculty')
+    create_index('ix_txn_plate_exit', 'parking_transactions', 'license_plate, exit_time')
+    create_index('ix_vehicles_user_id', 'vehicles', 'user_id')
+    create_index('ix_support_messages_created_at', 'support_messages', 'created_at')
+    create_index('ix_users_dept_role', 'users', 'upper(department), role')
+    print("✅ Composite indexes in place")
+
+
+# --- 4. APPROVAL QUEUE (pending_vehicles.json -> pending_vehicles table) ---
+PENDING_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pending_vehicles.json')
+
+def migrate_pending_vehicles():
+    create_index('ix_pending_vehicles_user_id', 'pending_vehicles', 'user_id')
+    create_index('ix_pending_vehicles_license_plate', 'pending_vehicles', 'license_plate')
+    create_index('ix_pending_status_created', 'pending_vehicles', 'status, created_at')
+    db.session.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_pending_open_plate "
+                            "ON pending_vehicles (license_plate) WHERE status = 'pending'"))
+    db.session.commit()
+    if not os.path.exists(PENDING_JSON):
+        print("✅ Approval queue table in place (no pending_vehicles.json to import)")
+        return
+
+    try:
+        with open(PENDING_JSON) as f: entries = json.load(f)
+    except ValueError:
+        print(f"⚠️ {PENDING_JSON} is not valid JSON; fix or remove it and re-run")
+        return
+    users = {u for (u,) in db.session.query(User.user_id)}
+    registered = {p for (p,) in db.session.query(Vehicle.license_plate)}
+    queued = {p for (p,) in db.session.query(PendingVehicle.license_plate).filter_by(status='pending')}
+    imported = skipped = 0
+    for entry in entries:
+        plate, user_id = entry.get('license_plate'), int(entry.get('user_id') or 0)
+        status = entry.get('status') or 'pending'
+        # Unknown users, plates already registered and duplicate open requests are not carried over
+        if not plate or user_id not in users or plate in registered or (status == 'pending' and plate in queued):
+            skipped += 1; continue
+        db.session.add(PendingVehicle(user_id=user_id, license_plate=plate, model=entry.get('model'),
+                                      type=entry.get('type'), dl_number=entry.get('dl_number'),
+                                      dl_file=entry.get('dl_file'), rc_file=entry.get('rc_file'), status=status))
+        if status == 'pending': queued.add(plate)
+        imported += 1
+    db.session.commit()
+    os.replace(PENDING_JSON, PENDING_JSON + '.migrated') # One-time: a re-run finds nothing to import
+    print(f"✅ Imported {imported} requests from pending_vehicles.json ({skipped} skipped); file kept as .migrated")
+
+
+# --- 5. SUPPORT INBOX (Status index + FTS5 search, see services/support_inbox.py) ---
+def migrate_support_inbox():
+    create_index('ix_support_status_created', 'support_messages', 'status, created_at')
+    if db.engine.dialect.name != 'sqlite' or \
+            not db.session.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+        print("⚠️ SQLite without FTS5: inbox search falls back to LIKE")
+        return
+    existed = 'support_messages_fts' in inspect(db.engine).get_table_names()
+    for statement in SUPPORT_FTS_DDL: db.session.execute(text(statement))
+    if not existed:
+        # Index the messages received before the triggers existed
+        db.session.execute(text("INSERT INTO support_messages_fts(support_messages_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    print(f"✅ Support inbox search in place{'' if existed else ' (existing messages indexed)'}")
+
+
+app = create_app()
+
+with app.app_context():
+    db.create_all() # New tables only; existing tables are altered below
+    migrate_plate_canonical()
+    migrate_open_transaction_constraints()
+    migrate_indexes()
+    migrate_pending_vehicles()
+    migrate_support_inbox()
+    print("SUCCESS: Database migrated.")
@@ -1,4 +1,7 @@
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import validates
 from extensions import db
+from services.plate_index import canonical
 from datetime import datetime  # <--- THIS WAS MISSING
 
 class User(db.Model):
@@ -16,10 +19,18 @@ class User(db.Model):
     # Relationships
     vehicles = db.relationship('Vehicle', backref='owner', lazy=True)
 
+# Approval console filter (services/approvals.page): department is typed freely at sign-up, so match it case-blind
+db.Index('ix_users_dept_role', db.func.upper(User.department), User.role)
+
 class Vehicle(db.Model):
     __tablename__ = 'vehicles' # Good practice to name tables explicitly
     id = db.Column(db.Integer, primary_key=True)
     license_plate = db.Column(db.String(20), unique=True, nullable=False)
+    # OCR-confusion-normalized plate (services/plate_index.canonical) for the gate's indexed exact lookup.
+    # Always derived from license_plate: by the default on every insert (ORM or Core), by
+    # _canonicalize when an ORM object's plate changes.
+    plate_canonical = db.Column(db.String(20), index=True, nullable=True,
+                                default=lambda ctx: canonical(ctx.get_current_parameters()['license_plate']))
     type = db.Column(db.String(20), nullable=False) 
     
     # --- NEW COLUMNS ---
@@ -29,8 +40,34 @@ class Vehicle(db.Model):
     # -------------------
 
     # FIX: changed 'user.user_id' to 'users.user_id' to match the User table name
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @validates('license_plate')
+    def _canonicalize(self, key, plate):
+        self.plate_canonical = canonical(plate) if plate else None
+        return plate
+
+class PendingVehicle(db.Model):
+    """Registration waiting for (or refused by) an admin; replaces pending_vehicles.json."""
+    __tablename__ = 'pending_vehicles'
+    __table_args__ = (
+        db.Index('ix_pending_status_created', 'status', 'created_at'),   # Admin queue, oldest first
+        # One request per plate in the queue, so /approve/<plate> is unambiguous
+        db.Index('ux_pending_open_plate', 'license_plate', unique=True,
+                 sqlite_where=db.text("status = 'pending'"), postgresql_where=db.text("status = 'pending'")),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False, index=True)
+    license_plate = db.Column(db.String(20), nullable=False, index=True)
+    model = db.Column(db.String(50), nullable=True)
+    type = db.Column(db.String(20), nullable=True)
+    dl_number = db.Column(db.String(50), nullable=True)
+    dl_file = db.Column(db.String(150), nullable=True)
+    rc_file = db.Column(db.String(150), nullable=True)
+    status = db.Column(db.String(20), default='pending')    # pending / rejected / approved
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    decided_at = db.Column(db.DateTime, nullable=True)
 
 class ParkingLot(db.Model):
     __tablename__ = 'parking_lots'
@@ -41,6 +78,10 @@ class ParkingLot(db.Model):
 
 class ParkingSpot(db.Model):
     __tablename__ = 'parking_spots'
+    __table_args__ = (
+        db.Index('ux_spots_lot_number', 'lot_id', 'spot_number', unique=True),        # Gate / admin spot lookups
+        db.Index('ix_spots_lot_status', 'lot_id', 'status', 'reserved_for_faculty'),  # Free / occupied counts per lot
+    )
     spot_id = db.Column(db.Integer, primary_key=True)
     lot_id = db.Column(db.Integer, db.ForeignKey('parking_lots.lot_id'), nullable=False)
     spot_number = db.Column(db.Integer, nullable=False)
@@ -49,6 +90,14 @@ class ParkingSpot(db.Model):
 
 class ParkingTransaction(db.Model):
     __tablename__ = 'parking_transactions'
+    # At most one open (exit_time IS NULL) transaction per plate and per spot, even with several gates
+    __table_args__ = (
+        db.Index('ux_txn_open_plate', 'license_plate', unique=True,
+                 sqlite_where=db.text('exit_time IS NULL'), postgresql_where=db.text('exit_time IS NULL')),
+        db.Index('ux_txn_open_spot', 'lot_id', 'spot_number', unique=True,
+                 sqlite_where=db.text('exit_time IS NULL'), postgresql_where=db.text('exit_time IS NULL')),
+        db.Index('ix_txn_plate_exit', 'license_plate', 'exit_time'),  # Dashboard history / analytics per plate
+    )
     transaction_id = db.Column(db.Integer, primary_key=True)
     license_plate = db.Column(db.String(20), nullable=False)
     lot_id = db.Column(db.Integer, nullable=False)
@@ -59,8 +108,53 @@ class ParkingTransaction(db.Model):
 
 class SupportMessage(db.Model):
     __tablename__ = 'support_messages'
+    __table_args__ = (
+        db.Index('ix_support_status_created', 'status', 'created_at'),  # Inbox unread / read / replied tabs, newest first
+    )
     msg_id = db.Column(db.Integer, primary_key=True)
     sender_email = db.Column(db.String(120), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(20), default='unread')
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
\ No newline at end of file
+    status = db.Column(db.String(20), default='unread')     # unread / read / replied
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
+
+# Inbox search (services/support_inbox.py): an FTS5 index over message + sender_email that
+# stores no copy of the text (content=support_messages) and is kept in step by triggers.
+# Status changes don't touch it. Also run by migrate_db.py for existing databases.
+SUPPORT_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS support_messages_fts USING fts5("
+    "message, sender_email, content='support_messages', content_rowid='msg_id')",
+    "CREATE TRIGGER IF NOT EXISTS support_messages_fts_ai AFTER INSERT ON support_messages BEGIN "
+    "INSERT INTO support_messages_fts(rowid, message, sender_email) VALUES (new.msg_id, new.message, new.sender_email); END",
+    "CREATE TRIGGER IF NOT EXISTS support_messages_fts_ad AFTER DELETE ON support_messages BEGIN "
+    "INSERT INTO support_messages_fts(support_messages_fts, rowid, message, sender_email) "
+    "VALUES ('delete', old.msg_id, old.message, old.sender_email); END",
+    "CREATE TRIGGER IF NOT EXISTS support_messages_fts_au AFTER UPDATE OF message, sender_email ON support_messages BEGIN "
+    "INSERT INTO support_messages_fts(support_messages_fts, rowid, message, sender_email) "
+    "VALUES ('delete', old.msg_id, old.message, old.sender_email); "
+    "INSERT INTO support_messages_fts(rowid, message, sender_email) VALUES (new.msg_id, new.message, new.sender_email); END",
+]
+
+def sqlite_has_fts5(ddl, target, bind, **kw):
+    # Other databases / SQLite builds without FTS5 get no index; the inbox falls back to LIKE
+    return bind.dialect.name == 'sqlite' and bind.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar() == 1
+
+for _statement in SUPPORT_FTS_DDL:
+    event.listen(SupportMessage.__table__, 'after_create', DDL(_statement).execute_if(callable_=sqlite_has_fts5))
+
+class OutboxEmail(db.Model):
+    """Emails queued by request handlers and delivered by the background sender (services/outbox.py)."""
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_outbox_status_due', 'status', 'next_attempt_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Text, nullable=False)     # Comma-separated
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    sender = db.Column(db.String(120), nullable=True)    # None = MAIL_DEFAULT_SENDER
+    status = db.Column(db.String(20), default='pending') # pending / sending / sent / dead
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+
+# --- APPROVAL QUEUE (Admin console over the pending_vehicles table) ---
+# page(): keyset pagination in queue order (created_at, id), so page N costs the same as
+# page 1; the applicants of a page are loaded with one IN query.
+# decide(): approves or rejects a selection in one transaction. Approved requests become
+# Vehicle rows through one bulk INSERT, and the gate's plate index is updated once.
+
+def encode_cursor(item):
+    return f"{item.created_at.isoformat()}~{item.id}"
+
+def decode_cursor(cursor):
+    """'2026-10-17T08:00:00.123456~42' -> (datetime, 42), or None (first page) if unusable."""
+    try:
+        created, _, item_id = (cursor or '').partition('~')
+        return datetime.fromisoformat(created), int(item_id)
+    except ValueError:
+        return None
+
+def page(after=None, department=None, role=None, limit=50):
+    """
+    One page of pending requests, oldest first. Returns (items, next cursor or None);
+    items are dicts with the request and its applicant's details.
+    """
+    from extensions import db
+    from models import PendingVehicle as P, User
+
+    query = P.query.filter(P.status == 'pending')
+    if department or role:
+        applicants = select(User.user_id)
+        if department: applicants = applicants.where(func.upper(User.department) == department.strip().upper())
+        if role: applicants = applicants.where(User.role == role)
+        query = query.filter(P.user_id.in_(applicants))
+    position = decode_cursor(after)
+    if position: query = query.filter(tuple_(P.created_at, P.id) > position)
+    rows = query.order_by(P.created_at, P.id).limit(limit + 1).all()
+    rows, more = rows[:limit], len(rows) > limit
+
+    users = {u.user_id: u for u in User.query.filter(User.user_id.in_({r.user_id for r in rows}))} if rows else {}
+    items = []
+    for item in rows:
+        user = users.get(item.user_id)
+        if user is None: continue
+        items.append({
+            "id": item.id, "license_plate": item.license_plate, "type": item.type or item.model, "model": item.model,
+            "dl_number": item.dl_number, "dl_file": item.dl_file, "rc_file": item.rc_file, "created_at": item.created_at,
+            "user_name": user.name, "user_dept": user.department, "user_usn": user.usn, "user_email": user.email,
+            "user_role": user.role
+        })
+    return items, (encode_cursor(rows[-1]) if more else None)
+
+def pending_count():
+    from models import PendingVehicle
+    return PendingVehicle.query.filter_by(status='pending').count()
+
+def decide(ids, action):
+    """
+    Approves ('approve') or rejects ('reject') the pending requests with these ids, all
+    or nothing, and commits. Returns {"done": n, "skipped": [(plate, reason)], "conflict": bool};
+    on a conflict (another admin decided some of them meanwhile) nothing is saved.
+    """
+    from extensions import db
+    from models import PendingVehicle as P, Vehicle
+    from services import plate_index
+
+    now = datetime.utcnow()
+    requests = P.query.filter(P.id.in_(set(ids)), P.status == 'pending').all()
+    skipped = []
+    if action == 'approve':
+        plates = [r.license_plate for r in requests]
+        registered = {p for (p,) in db.session.query(Vehicle.license_plate).filter(Vehicle.license_plate.in_(plates))} if plates else set()
+        skipped = [(r.license_plate, "already registered") for r in requests if r.license_plate in registered]
+        requests = [r for r in requests if r.license_plate not in registered]
+    if not requests: return {"done": 0, "skipped": skipped, "conflict": False}
+
+    # Claim them all: if another admin got to one of them first, the counts differ
+    claimed = P.query.filter(P.id.in_([r.id for r in requests]), P.status == 'pending') \
+                     .update({'status': 'approved' if action == 'approve' else 'rejected', 'decided_at': now},
+                             synchronize_session=False)
+    if claimed != len(requests):
+        db.session.rollback()
+        return {"done": 0, "skipped": skipped, "conflict": True}
+
+    added = []
+    try:
+        if action == 'approve':
+            rows = [{"license_plate": r.license_plate, "type": r.type or r.model or 'Unknown', "dl_number": r.dl_number,
+                     "dl_file": r.dl_file, "rc_file": r.rc_file, "user_id": r.user_id, "created_at": now} for r in requests]
+            added = db.session.execute(insert(Vehicle.__table__).returning(Vehicle.id, Vehicle.license_plate), rows).all()
+        db.session.commit()
+    except IntegrityError:
+        # A plate was registered by someone else between the check and the insert
+        db.session.rollback()
+        return {"done": 0, "skipped": skipped, "conflict": True}
+    if added: plate_index.vehicles_added(added)
+    return {"done": len(requests), "skipped": skipped, "conflict": False}
@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import deque
+
+# --- BACKGROUND FRAME GRABBER (One per camera URL) ---
+class FrameGrabber:
+    """
+    Reads an IP-Webcam style camera on a background thread over one persistent HTTP
+    session, and keeps the last `buffer_size` decoded frames with the time they arrived.
+    Gate handlers read the freshest frame without any network wait.
+      mode='poll'  : fetch {base_url}/shot.jpg every `interval` seconds
+      mode='mjpeg' : keep {base_url}/video open and decode every frame of the stream
+    """
+
+    def __init__(self, base_url, interval=0.2, buffer_size=5, max_age=1.0, timeout=3, mode='poll'):
+        self.base_url = base_url
+        self.mode = mode
+        self.interval = interval
+        self.max_age = max_age
+        self.timeout = timeout
+
+        self._frames = deque(maxlen=buffer_size)   # (received_at, frame)
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()        # requests.Session is not thread-safe
+        self._session = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+        self.grabbed = 0
+        self.failures = 0
+
+    # --- LIFECYCLE ---
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"grabber:{self.base_url}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=self.timeout + 1)
+        if self._session: self._session.close()
+
+    def _run(self):
+        backoff = self.interval
+        while not self._stop.is_set():
+            started = time.time()
+            if self.mode == 'mjpeg':
+                ok = self._stream() # Returns when the stream drops
+            else:
+                ok = self.grab()[0] is not None
+            if ok:
+                backoff = self.interval
+            else:
+                # Camera down: don't hammer it, back off up to 2s between attempts
+                backoff = min(max(backoff * 2, self.interval), 2.0)
+            self._stop.wait(max(0.0, backoff - (time.time() - started)))
+
+    # --- NETWORK ---
+    def grab(self):
+        """
+        Fetches and decodes one frame right now, stores it in the buffer and returns (frame, error).
+        """
+        import cv2
+        import numpy as np
+        import requests
+        try:
+            with self._fetch_lock:
+                if self._session is None: self._session = requests.Session()
+                resp = self._session.get(f"{self.base_url}/shot.jpg", timeout=self.timeout)
+            if resp.status_code != 200:
+                return self._failed("Camera Unreachable")
+            frame = cv2.imdecode(np.frombuffer(resp.content, dtype=np.uint8), -1)
+            if frame is None:
+                return self._failed("Bad Frame")
+        except Exception as e:
+            return self._failed(str(e))
+
+        with self._lock:
+            self._frames.append((time.time(), frame))
+            self.grabbed += 1
+            self.last_error = None
+        return frame, None
+
+    def _stream(self):
+        """
+        Decodes frames from the multipart MJPEG stream until it ends or stop() is called.
+        Frames are cut at JPEG start/end markers, so boundary headers are simply skipped.
+        """
+        import cv2
+        import numpy as np
+        import requests
+        try:
+            session = requests.Session()
+            resp = session.get(f"{self.base_url}/video", stream=True, timeout=self.timeout)
+            if resp.status_code != 200:
+                self._failed("Camera Unreachable"); return False
+            buf = b""
+            for chunk in resp.iter_content(chunk_size=16384):
+                if self._stop.is_set(): break
+                buf += chunk
+                while True:
+                    start = buf.find(b"\xff\xd8")
+                    end = buf.find(b"\xff\xd9", start + 2) if start != -1 else -1
+                    if end == -1:
+                        if start > 0: buf = buf[start:] # Drop boundary headers before the next frame
+                        break
+                    jpg, buf = buf[start : end + 2], buf[end + 2:]
+                    frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), -1)
+                    if frame is None: continue
+                    with self._lock:
+                        self._frames.append((time.time(), frame))
+                        self.grabbed += 1
+                        self.last_error = None
+                if len(buf) > 4 * 1024 * 1024: buf = b"" # No complete frame in 4MB, resync
+            resp.close(); session.close()
+            return True
+        except Exception as e:
+            self._failed(str(e))
+            return False
+
+    def _failed(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+        return None, error
+
+    # --- READERS ---
+    def latest(self, max_age=None):
+        """
+        Freshest buffered frame and its age in seconds, or (None, None) if it is older than max_age.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            if not self._frames: return None, None
+            received_at, frame = self._frames[-1]
+        age = time.time() - received_at
+        if age > max_age: return None, None
+        return frame, age
+
+    def frames(self):
+        """All buffered (received_at, frame) pairs, oldest first."""
+        with self._lock:
+            return list(self._frames)
+
+    def get_frame(self):
+        """
+        Same contract as the gate's old fetch_image: (frame, error).
+        Uses the buffer when it is fresh, otherwise grabs synchronously (e.g. right after startup).
+        """
+        frame, _ = self.latest()
+        if frame is not None: return frame, None
+        return self.grab()
+
+    def stats(self):
+        with self._lock:
+            newest = self._frames[-1][0] if self._frames else None
+            return {
+                "camera": self.base_url,
+                "mode": self.mode,
+                "running": bool(self._thread and self._thread.is_alive()),
+                "buffered": len(self._frames),
+                "frame_age_ms": round((time.time() - newest) * 1000) if newest else None,
+                "grabbed": self.grabbed,
+                "failures": self.failures,
+                "last_error": self.last_error
+            }
+
+
+# --- REGISTRY (Cameras shared by several gate roles get one grabber) ---
+_grabbers = {}
+_grabbers_lock = threading.Lock()
+
+def get_grabber(base_url, config):
+    grabber = _grabbers.get(base_url)
+    if grabber is None:
+        with _grabbers_lock:
+            grabber = _grabbers.get(base_url)
+            if grabber is None:
+                grabber = FrameGrabber(
+                    base_url,
+                    interval=config.get('CAMERA_POLL_INTERVAL', 0.2),
+                    buffer_size=config.get('CAMERA_BUFFER_FRAMES', 5),
+                    max_age=config.get('CAMERA_MAX_FRAME_AGE', 1.0),
+                    mode=config.get('CAMERA_MODE', 'poll')
+                ).start()
+                _grabbers[base_url] = grabber
+    return grabber
+
+def all_stats():
+    return [g.stats() for g in list(_grabbers.values())]
+
+def stop_all():
+    with _grabbers_lock:
+        for g in _grabbers.values(): g.stop()
+        _grabbers.clear()
@@ -0,0 +1,173 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+# --- DEBUG CAPTURE (Forensic gate images, written off the request path) ---
+# Modes, per gate:
+#   off      : never write
+#   failures : only scans that were denied / not matched
+#   sample   : every failure plus 1 in `sample_every` successful scans
+#   all      : every scan
+MODES = ('off', 'failures', 'sample', 'all')
+
+
+class DebugCapture:
+    """
+    Decides which gate frames are worth keeping and hands them to a background writer
+    through a bounded queue. When the queue is full the capture is dropped, never waited on.
+    Files go to `directory` as <timestamp>_<gate>_<status>.jpg plus a .json with the metadata,
+    and the oldest captures are deleted once there are more than `max_files`.
+    Metadata that needs a query is added by the writer through submit(resolve=...).
+    """
+
+    def __init__(self, directory, mode='failures', sample_every=10, max_files=200, queue_size=16, gate_modes=None):
+        self.directory = directory
+        self.default_mode = mode
+        self.sample_every = max(1, sample_every)
+        self.max_files = max_files
+        self._gate_modes = dict(gate_modes or {})
+        self._counters = {}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._files = None   # deque of capture base paths, oldest first (loaded by the writer)
+        self._thread = None
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    # --- SAMPLING ---
+    def mode_for(self, gate):
+        return self._gate_modes.get(gate, self.default_mode)
+
+    def set_mode(self, gate, mode):
+        if mode not in MODES: raise ValueError(f"Unknown capture mode '{mode}'")
+        with self._lock:
+            self._gate_modes[gate] = mode
+
+    def wants(self, gate, failed):
+        """Counts the scan and says whether this one should be captured."""
+        mode = self.mode_for(gate)
+        if mode == 'off': return False
+        if mode == 'all' or failed: return True
+        if mode == 'failures': return False
+        # 'sample': the 1st, (N+1)th, (2N+1)th ... successful scan of this gate
+        with self._lock:
+            n = self._counters.get(gate, 0)
+            self._counters[gate] = n + 1
+        return n % self.sample_every == 0
+
+    # --- QUEUE ---
+    def submit(self, gate, image, status_code, meta=None, resolve=None):
+        """
+        Queues one capture; returns False if the writer is backed up and it was dropped.
+        resolve: optional callable run on the writer thread, whose dict is merged into meta.
+        """
+        self._ensure_writer()
+        item = (time.time(), gate, status_code, image, dict(meta or {}), resolve)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock: self.dropped += 1
+            return False
+        with self._lock: self.submitted += 1
+        return True
+
+    def _ensure_writer(self):
+        if self._thread and self._thread.is_alive(): return
+        with self._lock:
+            if self._thread and self._thread.is_alive(): return
+            self._thread = threading.Thread(target=self._run, name="debug-capture", daemon=True)
+            self._thread.start()
+
+    # --- WRITER THREAD ---
+    def _load_existing(self):
+        os.makedirs(self.directory, exist_ok=True)
+        names = sorted(n[:-4] for n in os.listdir(self.directory) if n.endswith('.jpg'))
+        self._files = deque(os.path.join(self.directory, n) for n in names)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._write(*item)
+            except Exception as e:
+                with self._lock: self.failed += 1
+                print(f"⚠️ DEBUG CAPTURE FAILED: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, at, gate, status_code, image, meta, resolve):
+        import cv2
+        if self._files is None: self._load_existing()
+        if resolve:
+            try: meta.update(resolve())
+            except Exception as e: meta["resolve_error"] = str(e) # Keep the frame anyway
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(at)) + f"{at % 1:.3f}"[1:]
+        base = os.path.join(self.directory, f"{stamp}_{gate}_{status_code}")
+        if os.path.exists(base + '.jpg'): base += f"_{self.written}" # Two captures in the same millisecond
+        cv2.imwrite(base + '.jpg', image)
+        meta.update({"gate": gate, "status_code": status_code, "captured_at": at})
+        with open(base + '.json', 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+        self._files.append(base)
+        with self._lock: self.written += 1
+
+        # Rotate: the directory never holds more than max_files captures
+        while len(self._files) > self.max_files:
+            old = self._files.popleft()
+            for ext in ('.jpg', '.json'):
+                try: os.remove(old + ext)
+                except FileNotFoundError: pass
+
+    def flush(self):
+        """Blocks until everything queued so far is on disk (CLI tools / shutdown)."""
+        if self._thread and self._thread.is_alive(): self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "modes": {**{"default": self.default_mode}, **self._gate_modes},
+                "sample_every": self.sample_every,
+                "queue_depth": self._queue.qsize(),
+                "submitted": self.submitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "files": len(self._files) if self._files is not None else None,
+                "max_files": self.max_files
+            }
+
+
+def parse_gate_modes(value):
+    """'plate_entry=all,id_entry=off' -> {'plate_entry': 'all', 'id_entry': 'off'}"""
+    modes = {}
+    for part in (value or '').split(','):
+        if '=' not in part: continue
+        gate, mode = [p.strip() for p in part.split('=', 1)]
+        if mode in MODES: modes[gate] = mode
+    return modes
+
+
+# --- SHARED CAPTURE (One writer per web process) ---
+_capture = None
+_capture_lock = threading.Lock()
+
+def get_capture(config):
+    global _capture
+    if _capture is None:
+        with _capture_lock:
+            if _capture is None:
+                _capture = DebugCapture(
+                    config.get('DEBUG_CAPTURE_DIR', 'debug_captures'),
+                    mode=config.get('DEBUG_CAPTURE_MODE', 'failures'),
+                    sample_every=config.get('DEBUG_CAPTURE_SAMPLE_EVERY', 10),
+                    max_files=config.get('DEBUG_CAPTURE_MAX_FILES', 200),
+                    queue_size=config.get('DEBUG_CAPTURE_QUEUE', 16),
+                    gate_modes=parse_gate_modes(config.get('DEBUG_CAPTURE_GATES', ''))
+                )
+    return _capture
@@ -0,0 +1,430 @@
+import glob
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- GATE JOURNAL (Barrier decisions survive a locked / unreachable database) ---
+# When a gate write misses its deadline (SQLite busy past GATE_DB_DEADLINE, or the DB is
+# down), the gate still opens: the spot comes from the in-memory allocator and the
+# decision is appended to a local JSONL file (fsync'd before the barrier opens).
+# A reconciler thread replays the file into ParkingTransaction / ParkingSpot once the
+# database takes writes again, in journal order, with the journaled times and spots.
+# Records that no longer fit the database (car already inside, spot taken meanwhile,
+# exit without an open session) are applied as best they can be and copied to the
+# conflicts file for the admin.
+# Every process writes its own file (GATE_JOURNAL_PATH with the pid added, e.g.
+# gate_journal.4711.jsonl) and holds an exclusive lock on a sidecar .lock file while it
+# runs. A file whose lock can be taken belongs to a process that died: the reconcilers
+# of the live processes adopt its records, so nothing it journaled is lost.
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+def _flock(f, block):
+    try:
+        if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if block else fcntl.LOCK_NB))
+        else: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if block else msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        if block: raise
+        return False
+
+def _hold_lock(lock_path, block):
+    """
+    Opens and exclusively locks `lock_path`, or returns None if another process holds it
+    (non-blocking) or it was removed meanwhile by a process adopting its journal.
+    """
+    while True:
+        f = open(lock_path, 'a+')
+        if not _flock(f, block):
+            f.close(); return None
+        try: current = os.path.samestat(os.fstat(f.fileno()), os.stat(lock_path))
+        except FileNotFoundError: current = False
+        if current: return f
+        f.close()
+        if not block: return None
+
+def _read_records(path):
+    records = []
+    if not os.path.exists(path): return records
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            try: records.append(json.loads(line))
+            except ValueError: continue  # Torn last line from a crash mid-append
+    return records
+
+def _write_records(path, records):
+    """Replaces the file atomically with these records."""
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for record in records: f.write(json.dumps(record) + "\n")
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def process_path(base_path, pid=None):
+    """GATE_JOURNAL_PATH -> this process's journal file ('gate_journal.jsonl' -> 'gate_journal.4711.jsonl')."""
+    root, ext = os.path.splitext(base_path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+@contextmanager
+def db_deadline(seconds):
+    """
+    Caps how long the gate waits on a locked SQLite database (PRAGMA busy_timeout on
+    this request's connection), so a long admin write makes the gate fall back instead
+    of stalling. The previous timeout is restored afterwards. No-op on other databases.
+    """
+    from extensions import db
+    conn = db.session.connection()
+    if conn.dialect.name != 'sqlite':
+        yield; return
+    raw = conn.connection.driver_connection
+    previous = raw.execute('PRAGMA busy_timeout').fetchone()[0]
+    raw.execute(f'PRAGMA busy_timeout = {int(seconds * 1000)}')
+    try:
+        yield
+    finally:
+        try: raw.execute(f'PRAGMA busy_timeout = {int(previous)}')
+        except Exception: pass
+
+
+class GateJournal:
+    def __init__(self, app, path, conflicts_path, reconcile_interval=5.0, base_path=None):
+        self.app = app
+        self.path = path
+        self.base_path = base_path      # GATE_JOURNAL_PATH; orphaned journals are looked up next to it
+        self.conflicts_path = conflicts_path
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()   # One reconcile at a time, or records would be applied twice
+        self._records = []          # Pending records, oldest first
+        self._by_plate = {}         # plate -> last pending record for it
+        self._seq = 0
+        self._wake = threading.Event()
+        self._thread = None
+        self.journaled = 0
+        self.replayed = 0
+        self.conflicts = 0
+        self.adopted = 0
+        self.last_error = None
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._owner_lock = _hold_lock(self.path + ".lock", block=True)  # Held for the life of the process
+        self._load()
+
+    # --- FILE ---
+    def _load(self):
+        # Left by an earlier process that had the same pid
+        for record in _read_records(self.path): self._remember(record)
+        if self._records: print(f"📒 GATE JOURNAL: {len(self._records)} decisions waiting to be replayed")
+
+    def _remember(self, record):
+        self._records.append(record)
+        self._by_plate[record["plate"]] = record
+        self._seq = max(self._seq, record.get("seq", 0))
+
+    def _reindex(self):
+        self._by_plate = {}
+        for record in self._records: self._by_plate[record["plate"]] = record
+
+    def append(self, kind, plate, lot_id, spot_number, when, **extra):
+        """Writes one decision durably, then lets the reconciler know."""
+        with self._lock:
+            self._seq += 1
+            record = {"seq": self._seq, "type": kind, "plate": plate, "lot_id": lot_id,
+                      "spot_number": spot_number, "time": when.isoformat(), **extra}
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush(); os.fsync(f.fileno())
+            self._remember(record)
+            self.journaled += 1
+        print(f"📒 GATE JOURNAL: {kind} {plate} -> lot {lot_id} spot #{spot_number} (database busy)")
+        self.start()
+        return record
+
+    def _drop(self, count):
+        """Removes the first `count` records (replayed) by rewriting this process's file atomically."""
+        with self._lock:
+            done, self._records = self._records[:count], self._records[count:]
+            self._reindex()
+            _write_records(self.path, self._records)
+        return done
+
+    # --- ORPHANS (Journals of processes that died before replaying them) ---
+    def _orphan_paths(self):
+        if not self.base_path: return []
+        root, ext = os.path.splitext(self.base_path)
+        own = self.path
+        pattern = re.compile(re.escape(os.path.basename(root)) + r"\.\d+" + re.escape(ext) + r"(\.lock)?$")
+        # A dead process may have left only its lock file (it never had to journal anything)
+        paths = {p[:-len(".lock")] if p.endswith(".lock") else p
+                 for p in glob.glob(glob.escape(root) + ".*" + ext + "*") if pattern.match(os.path.basename(p))}
+        paths.discard(own)
+        if os.path.exists(self.base_path): paths.add(self.base_path)  # Shared file of older versions
+        return sorted(paths)
+
+    def adopt_orphans(self):
+        """
+        Moves the records of every journal whose owner is gone into this one (merged by
+        time, so replay order holds) and deletes that file. Returns how many records moved.
+        """
+        moved = 0
+        for path in self._orphan_paths():
+            lock = _hold_lock(path + ".lock", block=False)
+            if lock is None: continue  # Its process is alive (or another one is adopting it)
+            try:
+                records = _read_records(path)
+                if records:
+                    # Not during a replay: _drop() counts on the records it replayed staying first
+                    with self._replay_lock, self._lock:
+                        merged = sorted(self._records + records, key=lambda r: r["time"])
+                        for seq, record in enumerate(merged, 1): record["seq"] = seq
+                        _write_records(self.path, merged)   # Durable here before the orphan goes
+                        self._records, self._seq = merged, len(merged)
+                        self._reindex()
+                    self._hold_spots(records)
+                    print(f"📒 GATE JOURNAL: adopted {len(records)} decisions from {os.path.basename(path)}")
+                if os.path.exists(path): os.remove(path)
+                moved += len(records)
+            finally:
+                try: os.remove(path + ".lock")
+                except OSError: pass
+                lock.close()
+        self.adopted += moved
+        return moved
+
+    def _record_conflicts(self, conflicts):
+        os.makedirs(os.path.dirname(os.path.abspath(self.conflicts_path)), exist_ok=True)
+        with open(self.conflicts_path, 'a', encoding='utf-8') as f:
+            for record, reason in conflicts:
+                f.write(json.dumps({**record, "conflict": reason, "replayed_at": datetime.now().isoformat()}) + "\n")
+                print(f"⚠️ GATE JOURNAL CONFLICT: {record['type']} {record['plate']}: {reason}")
+        self.conflicts += len(conflicts)
+
+    # --- OVERLAY (What the gate must believe until the journal is replayed) ---
+    def pending(self, plate):
+        """The last not-yet-replayed record for this plate, or None."""
+        return self._by_plate.get(plate) if self._records else None
+
+    def __len__(self):
+        return len(self._records)
+
+    # --- RECONCILER ---
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                self._wake.set(); return self
+            self._thread = threading.Thread(target=self._run, name="gate-journal", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.reconcile_interval); self._wake.clear()
+            try: self.adopt_orphans()
+            except OSError as e: print(f"⚠️ GATE JOURNAL: could not adopt orphaned journals: {e}")
+            if not self._records: continue
+            with self.app.app_context(): self.reconcile()
+
+    def reconcile(self):
+        """Replays every pending record in one transaction. Requires an app context."""
+        with self._replay_lock:
+            return self._reconcile()
+
+    def _reconcile(self):
+        from services import outbox, spot_events
+        with self._lock: batch = list(self._records)
+        if not batch: return 0
+        error = self._replay(batch)
+        replayed = 0 if error else len(batch)
+        if error is not None and not _transient(error):
+            # Something in the batch the database will never take: find it record by record
+            for record in batch:
+                error = self._replay([record])
+                if error is None: replayed += 1
+                elif _transient(error): break
+                else: self._quarantine(record, error)
+        self.last_error = str(error) if error is not None else None
+        if error is not None:
+            print(f"⚠️ GATE JOURNAL: replay of {len(self._records)} decisions failed, will retry: {error}")
+        if replayed:
+            print(f"📒 GATE JOURNAL: replayed {replayed} decisions")
+            outbox.wake()
+            spot_events.resync("journal replay")
+        return replayed
+
+    def _replay(self, records):
+        """
+        Applies the first len(records) pending records in one transaction and drops them.
+        Returns None, or the exception after which everything was rolled back.
+        """
+        from extensions import db
+        from services import spot_allocator
+        touched = set()
+        try:
+            released, conflicts = _apply(records, touched)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._restore_allocator(touched)
+            return e
+        self._drop(len(records))
+        for lot_id, spot_number in released: spot_allocator.spot_released(lot_id, spot_number)
+        if conflicts: self._record_conflicts(conflicts)
+        self.replayed += len(records)
+        return None
+
+    def _quarantine(self, record, error):
+        """Moves a record that can never be replayed (it is first in line) to the conflicts file."""
+        self._drop(1)
+        self._record_conflicts([(record, f"not replayable: {str(error).splitlines()[0][:200]}")])
+
+    def _restore_allocator(self, lot_ids):
+        """
+        A rolled-back replay may have taken spots from the allocator for records that never
+        landed: reload those lots from the database, then hold the spots of the cars this
+        journal still has inside.
+        """
+        from services import spot_allocator
+        if not lot_ids or not spot_allocator.allocator.built: return
+        try:
+            for lot_id in lot_ids: spot_allocator.lot_changed(lot_id)
+        except Exception as e:
+            print(f"⚠️ GATE JOURNAL: could not reload lots {sorted(lot_ids)}, rebuilding on next use: {e}")
+            spot_allocator.allocator.built = False
+            return
+        self.hold_pending(lot_ids)
+
+    def hold_pending(self, lot_ids=None):
+        """Marks taken, after a reload of these lots, the spots of cars the pending records leave inside."""
+        with self._lock: records = list(self._records)
+        self._hold_spots(records, lot_ids)
+
+    @staticmethod
+    def _hold_spots(records, lot_ids=None):
+        """Marks taken, in this process's allocator, the spots of cars these records leave inside."""
+        from services import spot_allocator
+        if not spot_allocator.allocator.built: return  # Nothing loaded yet to correct
+        inside = {}
+        for record in records:
+            if record["type"] == 'entry': inside[record["plate"]] = (record["lot_id"], record["spot_number"])
+            else: inside.pop(record["plate"], None)
+        for lot_id, spot_number in inside.values():
+            if lot_ids is None or lot_id in lot_ids: spot_allocator.allocator.set_spot(lot_id, spot_number, free=False)
+
+    def stats(self):
+        return {
+            "pending": len(self._records),
+            "journaled": self.journaled,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+            "adopted": self.adopted,
+            "reconciler_running": bool(self._thread and self._thread.is_alive()),
+            "last_error": self.last_error,
+            "path": self.path
+        }
+
+
+def _apply(records, touched):
+    """
+    Applies journal records to the session (caller commits). Returns (spots to release in
+    the allocator after the commit, [(record, conflict reason)]). Lots whose allocator
+    state was changed along the way are added to `touched`, for a reload if the commit fails.
+    """
+    from extensions import db
+    from models import User, Vehicle, ParkingLot, ParkingSpot, ParkingTransaction
+    from services import spot_allocator
+    from services.lot_order import get_user_sorted_lots
+    from services.gate_notifications import queue_entry_email, queue_exit_email
+
+    def claim(lot_id, spot_number, faculty=True):
+        query = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number, status='available')
+        if not faculty: query = query.filter_by(reserved_for_faculty=False)
+        return query.update({'status': 'occupied'}, synchronize_session=False)
+
+    released, conflicts, opened = [], [], {}
+    for record in records:
+        plate, when = record["plate"], datetime.fromisoformat(record["time"])
+        txn = opened.get(plate) or ParkingTransaction.query.filter_by(license_plate=plate, exit_time=None).first()
+        vehicle = Vehicle.query.filter_by(license_plate=plate).first()
+        user = db.session.get(User, vehicle.user_id) if vehicle else None
+
+        if record["type"] == 'entry':
+            if txn is not None:
+                conflicts.append((record, f"already inside since {txn.entry_time} (lot {txn.lot_id} spot #{txn.spot_number})"))
+                released.append((record["lot_id"], record["spot_number"]))
+                continue
+            lot_id, spot_number = record["lot_id"], record["spot_number"]
+            if not claim(lot_id, spot_number):
+                # Someone else got the spot in the database meanwhile; the car is parked, so record it elsewhere
+                allocator = spot_allocator.ensure_built()
+                lots = get_user_sorted_lots(user) if user else ParkingLot.query.all()
+                faculty = user is not None and user.role == 'faculty'
+                while True:
+                    picked = allocator.take([lot.lot_id for lot in lots], faculty)
+                    if picked is not None: touched.add(picked[0])
+                    if picked is None or claim(*picked, faculty=faculty): break
+                if picked is None:
+                    conflicts.append((record, f"spot #{spot_number} in lot {lot_id} was taken and no other spot is free"))
+                    continue
+                conflicts.append((record, f"spot #{spot_number} in lot {lot_id} was taken; recorded in lot {picked[0]} spot #{picked[1]}"))
+                lot_id, spot_number = picked
+            txn = ParkingTransaction(license_plate=plate, lot_id=lot_id, spot_number=spot_number, entry_time=when)
+            db.session.add(txn)
+            opened[plate] = txn
+            if user: queue_entry_email(user, db.session.get(ParkingLot, lot_id), spot_number)
+        else:
+            if txn is None:
+                conflicts.append((record, "no open parking session to close"))
+                continue
+            if txn.transaction_id is not None:
+                ParkingTransaction.query.filter_by(transaction_id=txn.transaction_id, exit_time=None) \
+                                        .update({'exit_time': when}, synchronize_session=False)
+            txn.exit_time = when
+            opened.pop(plate, None)
+            ParkingSpot.query.filter_by(lot_id=txn.lot_id, spot_number=txn.spot_number) \
+                             .update({'status': 'available'}, synchronize_session=False)
+            released.append((txn.lot_id, txn.spot_number))
+            if user: queue_exit_email(user, txn, db.session.get(ParkingLot, txn.lot_id))
+        db.session.flush()
+    return released, conflicts
+
+
+def _transient(error):
+    # Another connection holds the SQLite write lock: the same records will go through later
+    from sqlalchemy.exc import OperationalError
+    return isinstance(error, OperationalError) and "database is locked" in str(error)
+
+
+# --- SHARED JOURNAL (One per gate process, loaded on first use) ---
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_journal(app=None):
+    """
+    Returns the process's journal and starts its reconciler, which also adopts the
+    journals of gate processes that died.
+    """
+    global _journal
+    if _journal is None:
+        from flask import current_app
+        app = app or current_app._get_current_object()
+        with _journal_lock:
+            if _journal is None:
+                config = app.config
+                path = config.get('GATE_JOURNAL_PATH', 'gate_journal.jsonl')
+                _journal = GateJournal(
+                    app, process_path(path),
+                    conflicts_path=os.path.splitext(path)[0] + "_conflicts.jsonl",
+                    reconcile_interval=config.get('GATE_JOURNAL_RECONCILE_INTERVAL', 5.0),
+                    base_path=path
+                )
+                _journal.adopt_orphans()
+                _journal.start()
+    return _journal
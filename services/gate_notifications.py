@@ -0,0 +1,35 @@
+from services import metrics, outbox
+
+# --- GATE EMAIL NOTIFICATIONS 📧 (Queued in the outbox, sent by services/outbox.py) ---
+# Both only add a row to the session: call them before the commit that records the entry/exit,
+# then outbox.wake() after it, so the barrier decision never waits on SMTP. Shared by the
+# gate routes and the gate journal's replay.
+
+@metrics.timed('email')
+def queue_entry_email(user, lot, spot_number):
+    body = f"Hello {user.name},\n\nEntry Approved.\n📍 LOT: {lot.location}\n🔢 SPOT: #{spot_number}\n\nDrive carefully!"
+    outbox.enqueue(f"Entry Approved: {lot.location}", [user.email], body)
+
+@metrics.timed('email')
+def queue_exit_email(user, txn, lot):
+    # Calculate Duration
+    duration = txn.exit_time - txn.entry_time
+    hours, remainder = divmod(duration.seconds, 3600)
+    minutes = remainder // 60
+    time_str = f"{hours}h {minutes}m"
+
+    body = f"""
+        Hello {user.name},
+        
+        Your parking session has ended.
+        
+        🚗 VEHICLE:   {txn.license_plate}
+        📍 LOCATION:  {lot.location}
+        
+        🕒 START TIME: {txn.entry_time.strftime('%I:%M %p')}
+        🕒 END TIME:   {txn.exit_time.strftime('%I:%M %p')}
+        ⏳ DURATION:   {time_str}
+        
+        Thank you for using Smart Parking!
+        """
+    outbox.enqueue(f"Exit Summary: {txn.license_plate}", [user.email], body)
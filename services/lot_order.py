@@ -0,0 +1,38 @@
+# --- LOT ORDER (A user's preferred lots first; used by the gate and its journal replay) ---
+
+def get_user_sorted_lots(user, all_lots=None):
+    """
+    Parses "1,3,2,4" from user preferences and returns ParkingLot objects in that order.
+    Pass `all_lots` to reuse one ParkingLot.query.all() across many users (batch replay).
+    """
+    from models import ParkingLot
+    # 1. If no preferences, return default list
+    if not user.preferences:
+        return list(all_lots) if all_lots is not None else ParkingLot.query.all()
+        
+    # 2. Parse the string into a list of IDs
+    try:
+        pref_ids = [int(x) for x in user.preferences.split(',') if x.strip().isdigit()]
+    except:
+        return list(all_lots) if all_lots is not None else ParkingLot.query.all()
+    
+    # 3. Fetch all lots from DB
+    if all_lots is None: all_lots = ParkingLot.query.all()
+    
+    # 4. Sort them based on the ID list
+    # Create a dictionary for fast lookup: {1: LotObj, 2: LotObj...}
+    lot_map = {lot.lot_id: lot for lot in all_lots}
+    
+    sorted_lots = []
+    
+    # Add lots in the user's specific order
+    for pid in pref_ids:
+        if pid in lot_map:
+            sorted_lots.append(lot_map[pid])
+            
+    # Append any missing lots (e.g. if a new lot was added to DB but not in user prefs yet)
+    for lot in all_lots:
+        if lot not in sorted_lots:
+            sorted_lots.append(lot)
+            
+    return sorted_lots
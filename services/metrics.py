@@ -0,0 +1,187 @@
+import bisect
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+# --- GATE PIPELINE METRICS (Per-stage latency histograms + counters) ---
+# Usage in the gate:
+#   @metrics.timed('match')    on a helper: def find_best_match(...)
+#   with metrics.span('commit'): ...
+#   metrics.count('gate_denials_total', reason='campus_full')
+# begin(route) / end(status_code) bracket one scan; end() records the total and, with
+# METRICS_LOG on, writes one JSON log line with every stage's duration.
+# When disabled every call returns straight away (span() hands back a shared no-op).
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+RECENT = 2048   # Samples kept per series for p50 / p95 / p99
+
+_log = logging.getLogger('gate.metrics')
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'n', 'recent')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+        self.recent = deque(maxlen=RECENT)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds; self.n += 1
+        self.recent.append(seconds)
+
+    def quantiles(self):
+        values = sorted(self.recent)
+        if not values: return {}
+        pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 2)
+        return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+class _NoopSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('registry', 'stage', 'started')
+
+    def __init__(self, registry, stage):
+        self.registry = registry; self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe_stage(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=True, log=False):
+        self.enabled = enabled
+        self.log = log
+        self._lock = threading.Lock()
+        self._histograms = {}   # (name, labels tuple) -> Histogram
+        self._counters = {}     # (name, labels tuple) -> int
+
+    # --- TRACE OF THE CURRENT SCAN (Kept on flask.g, so it works in requests and auto-scan threads) ---
+    @staticmethod
+    def _trace():
+        from flask import g, has_app_context
+        return g.get('_metrics_trace') if has_app_context() else None
+
+    def begin(self, route):
+        if not self.enabled: return
+        from flask import g, has_app_context
+        if has_app_context(): g._metrics_trace = {"route": route, "started": time.perf_counter(), "stages": {}}
+
+    def end(self, status_code):
+        if not self.enabled: return
+        trace = self._trace()
+        if trace is None: return
+        from flask import g
+        g._metrics_trace = None
+        elapsed = time.perf_counter() - trace["started"]
+        route = trace["route"]
+        self._observe('gate_request_seconds', (('route', route),), elapsed)
+        self.count('gate_requests_total', route=route, code=str(status_code))
+        if self.log:
+            _log.info(json.dumps({"event": "gate_scan", "route": route, "status": status_code,
+                                  "total_ms": round(elapsed * 1000, 2),
+                                  "stages_ms": {k: round(v * 1000, 2) for k, v in trace["stages"].items()}}))
+
+    # --- RECORDING ---
+    def span(self, stage):
+        return _Span(self, stage) if self.enabled else _NOOP
+
+    def timed(self, stage):
+        """Decorator version of span(); the flag is checked per call, so it can be toggled at runtime."""
+        def wrap(fn):
+            @wraps(fn)
+            def inner(*args, **kwargs):
+                if not self.enabled: return fn(*args, **kwargs)
+                with _Span(self, stage):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def observe_stage(self, stage, seconds):
+        trace = self._trace()
+        route = trace["route"] if trace else "-"
+        if trace: trace["stages"][stage] = trace["stages"].get(stage, 0.0) + seconds
+        self._observe('gate_stage_seconds', (('route', route), ('stage', stage)), seconds)
+
+    def _observe(self, name, labels, seconds):
+        with self._lock:
+            hist = self._histograms.get((name, labels))
+            if hist is None: hist = self._histograms[(name, labels)] = Histogram()
+            hist.observe(seconds)
+
+    def count(self, name, value=1, route=None, **labels):
+        if not self.enabled: return
+        if route is None:
+            trace = self._trace()
+            route = trace["route"] if trace else "-"
+        key = (name, (('route', route),) + tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    # --- EXPORT ---
+    def summary(self):
+        """JSON-friendly view: p50/p95/p99 per series and all counters."""
+        with self._lock:
+            series = [{"metric": name, **dict(labels), "count": h.n, **h.quantiles()}
+                      for (name, labels), h in sorted(self._histograms.items())]
+            counters = [{"metric": name, **dict(labels), "value": v} for (name, labels), v in sorted(self._counters.items())]
+        return {"enabled": self.enabled, "latency": series, "counters": counters}
+
+    def render_prometheus(self):
+        def fmt(labels, extra=()):
+            parts = [f'{k}="{v}"' for k, v in tuple(labels) + tuple(extra)]
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram"); seen.add(name)
+                cumulative = 0
+                for le, c in zip(BUCKETS + ('+Inf',), h.counts):
+                    cumulative += c
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {h.total:.6f}")
+                lines.append(f"{name}_count{fmt(labels)} {h.n}")
+            for (name, labels), v in sorted(self._counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter"); seen.add(name)
+                lines.append(f"{name}{fmt(labels)} {v}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear(); self._counters.clear()
+
+
+# --- SHARED REGISTRY (One per process, switched on by configure() in create_app) ---
+registry = Metrics(enabled=False)
+
+begin, end, span, timed, count = registry.begin, registry.end, registry.span, registry.timed, registry.count
+
+def configure(config):
+    registry.enabled = bool(config.get('METRICS_ENABLED', True))
+    registry.log = bool(config.get('METRICS_LOG', False))
+    if registry.log and not _log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _log.addHandler(handler); _log.setLevel(logging.INFO); _log.propagate = False
+    return registry
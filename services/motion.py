@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import deque
+
+# --- MOTION DETECTOR (Cheap frame differencing on a tiny grayscale copy) ---
+class MotionDetector:
+    """
+    Decides when a frame is worth sending to OCR.
+      empty    -> a large part of the scene differs from the learned empty background
+      arriving -> wait until `stable_frames` consecutive frames barely change (car stopped)
+      scanned  -> OCR was triggered; wait for the scene to return to the background
+    update() returns True exactly when OCR should run.
+    """
+
+    def __init__(self, presence=0.02, motion=0.005, stable_frames=3, clear_frames=3,
+                 pixel_delta=25, size=(160, 90), learn_rate=0.05):
+        self.presence = presence
+        self.motion = motion
+        self.stable_frames = stable_frames
+        self.clear_frames = clear_frames
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.learn_rate = learn_rate
+
+        self.state = 'empty'
+        self._background = None   # float32 running average of the empty scene
+        self._prev = None
+        self._stable = 0
+        self._clear = 0
+        self.presence_ratio = 0.0
+        self.motion_ratio = 0.0
+
+    def _prepare(self, frame):
+        import cv2
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3: small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _changed(self, a, b):
+        import cv2
+        import numpy as np
+        return float(np.count_nonzero(cv2.absdiff(a, b) > self.pixel_delta)) / a.size
+
+    def update(self, frame):
+        import cv2
+        import numpy as np
+        cur = self._prepare(frame)
+        if self._background is None:
+            self._background = cur.astype(np.float32); self._prev = cur
+            return False
+
+        self.motion_ratio = self._changed(cur, self._prev)
+        self.presence_ratio = self._changed(cur, cv2.convertScaleAbs(self._background))
+        self._prev = cur
+        present = self.presence_ratio >= self.presence
+        still = self.motion_ratio < self.motion
+
+        if self.state == 'empty':
+            if present:
+                self.state = 'arriving'; self._stable = 0
+            elif still:
+                # Track slow lighting changes while nothing is in front of the camera
+                cv2.accumulateWeighted(cur, self._background, self.learn_rate)
+            return False
+
+        if self.state == 'arriving':
+            if not present:
+                self.state = 'empty'; return False
+            self._stable = self._stable + 1 if still else 0
+            if self._stable >= self.stable_frames:
+                self.state = 'scanned'; self._clear = 0
+                return True
+            return False
+
+        # state == 'scanned'
+        self._clear = self._clear + 1 if not present else 0
+        if self._clear >= self.clear_frames: self.state = 'empty'
+        return False
+
+    def rearm(self):
+        """Allow one more OCR attempt for the vehicle that is still in front of the camera."""
+        if self.state == 'scanned':
+            self.state = 'arriving'; self._stable = 0
+
+    @property
+    def vehicle_left(self):
+        return self.state == 'empty'
+
+
+# --- DECISION FEED (Consoles long-poll this instead of pressing SCAN) ---
+class DecisionFeed:
+    def __init__(self, maxlen=100):
+        self._events = deque(maxlen=maxlen)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def publish(self, role, status_code, payload):
+        with self._cond:
+            self._seq += 1
+            self._events.append({"seq": self._seq, "role": role, "http_status": status_code,
+                                 "data": payload, "at": time.time()})
+            self._cond.notify_all()
+
+    def wait(self, after, timeout=20.0):
+        """Events with seq > after; blocks up to `timeout` seconds when there are none yet."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after, timeout=timeout)
+            return [e for e in self._events if e["seq"] > after], self._seq
+
+
+# --- AUTO SCANNER (One background thread per gate camera role) ---
+class AutoScanner:
+    """
+    Watches a FrameGrabber, runs the MotionDetector on every new frame and, when a vehicle
+    has stopped, calls `scan(frame)` (OCR + match + decision) inside an app context.
+    `scan` returns (payload, status_code); a 404 "no plate" gets up to max_attempts tries,
+    and so does a scan that raised (OCR / database failure), which the feed sees as a 500.
+    """
+
+    def __init__(self, app, role, grabber, scan, feed, detector, max_attempts=2, idle_wait=0.05):
+        self.app = app
+        self.role = role
+        self.grabber = grabber
+        self.scan = scan
+        self.feed = feed
+        self.detector = detector
+        self.max_attempts = max_attempts
+        self.idle_wait = idle_wait
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_frame_at = None
+        self._attempts = 0
+        self.frames_seen = 0
+        self.vehicles = 0
+        self.ocr_calls = 0
+        self.decisions = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"autoscan:{self.role}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=5)
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def _next_frame(self):
+        frames = self.grabber.frames()
+        if not frames: return None
+        received_at, frame = frames[-1]
+        if received_at == self._last_frame_at: return None
+        self._last_frame_at = received_at
+        return frame
+
+    def _run(self):
+        while not self._stop.is_set():
+            frame = self._next_frame()
+            if frame is None:
+                self._stop.wait(self.idle_wait); continue
+            self.frames_seen += 1
+            try:
+                self.process(frame)
+            except Exception as e:
+                print(f"⚠️ AUTO SCAN ({self.role}) FAILED: {e}")
+
+    def process(self, frame):
+        if self.detector.vehicle_left: self._attempts = 0 # Previous vehicle has gone
+        if not self.detector.update(frame): return
+        if self._attempts == 0: self.vehicles += 1
+        self._attempts += 1
+        self.ocr_calls += 1
+
+        try:
+            with self.app.app_context():
+                payload, status_code = self.scan(frame)
+        except Exception as e:
+            # Without this the detector stays 'scanned' and the car waits until someone presses SCAN
+            self.errors += 1
+            print(f"⚠️ AUTO SCAN ({self.role}) FAILED: {e}")
+            self.feed.publish(self.role, 500, {"status": "error", "msg": f"Auto scan failed: {str(e).splitlines()[0][:200]}"})
+            self._retry()
+            return
+        self.decisions += 1
+        self.feed.publish(self.role, status_code, payload)
+        if status_code == 404: self._retry() # Plate unreadable
+
+    def _retry(self):
+        """Another try on the next stable frame, while the vehicle is still there and attempts remain."""
+        if self._attempts < self.max_attempts: self.detector.rearm()
+
+    def stats(self):
+        return {
+            "role": self.role,
+            "running": self.running,
+            "state": self.detector.state,
+            "frames_seen": self.frames_seen,
+            "vehicles": self.vehicles,
+            "ocr_calls": self.ocr_calls,
+            "ocr_calls_per_vehicle": round(self.ocr_calls / self.vehicles, 2) if self.vehicles else 0.0,
+            "decisions": self.decisions,
+            "errors": self.errors
+        }
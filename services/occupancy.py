@@ -0,0 +1,46 @@
+from sqlalchemy import and_, case, func
+
+# --- OCCUPANCY (Admin dashboard data without loading ParkingSpot objects) ---
+# lot_summaries(): per-lot counts from one GROUP BY over parking_spots (ix_spots_lot_status).
+# spot_grid(lot_id): one lot's spots as parallel arrays, fetched when its grid is opened:
+#   {"lot_id": 1, "spot_number": [1, 2, ...], "status": ["occupied", "available", ...], "reserved": [1, 0, ...]}
+# Both read the database, not the gate's in-memory allocator, so they show journaled /
+# replayed state exactly as it was committed.
+
+def lot_summaries():
+    from extensions import db
+    from models import ParkingLot, ParkingSpot as S
+    occupied = S.status == 'occupied'
+    rows = db.session.query(
+        ParkingLot.lot_id, ParkingLot.location, ParkingLot.number_of_spots,
+        func.count(S.spot_id),
+        func.coalesce(func.sum(case((occupied, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((S.reserved_for_faculty == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((and_(S.reserved_for_faculty == True, ~occupied), 1), else_=0)), 0)
+    ).outerjoin(S, S.lot_id == ParkingLot.lot_id) \
+     .group_by(ParkingLot.lot_id, ParkingLot.location, ParkingLot.number_of_spots) \
+     .order_by(ParkingLot.lot_id).all()
+
+    return [{
+        "lot_id": lot_id, "location": location, "capacity": capacity,
+        "spots": spots, "occupied": occupied_n, "free": spots - occupied_n,
+        "reserved": reserved, "reserved_free": reserved_free
+    } for lot_id, location, capacity, spots, occupied_n, reserved, reserved_free in rows]
+
+def totals(summaries):
+    return {
+        "spots": sum(s["spots"] for s in summaries),
+        "occupied": sum(s["occupied"] for s in summaries),
+        "free": sum(s["free"] for s in summaries)
+    }
+
+def spot_grid(lot_id):
+    from models import ParkingSpot as S
+    rows = S.query.with_entities(S.spot_number, S.status, S.reserved_for_faculty) \
+                  .filter_by(lot_id=lot_id).order_by(S.spot_number).all()
+    return {
+        "lot_id": lot_id,
+        "spot_number": [r[0] for r in rows],
+        "status": [r[1] for r in rows],
+        "reserved": [1 if r[2] else 0 for r in rows]
+    }
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+# --- PERCEPTUAL HASH (dHash: which neighbour is brighter, on a tiny grayscale copy) ---
+def dhash(image, size=16):
+    """
+    size*size-bit difference hash. Near-identical frames (sensor noise, JPEG artefacts,
+    slight lighting change) land within a few bits of each other.
+    """
+    import cv2
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = 0
+    for b in bits.tolist():
+        value = (value << 1) | b
+    return value
+
+
+class OCRCache:
+    """
+    Small LRU of OCR soups keyed by (namespace, frame dHash); the gate uses (kind, gate) as the
+    namespace, so a plate frame can never be answered with an ID card soup or another gate's.
+    A lookup hits when a cached hash of the same namespace is within `max_distance` bits and
+    younger than `ttl` seconds.
+    """
+
+    def __init__(self, max_entries=32, ttl=5.0, max_distance=5):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()   # (namespace, hash) -> (stored_at, soup)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self._lock:
+            best_key = None; best_dist = self.max_distance + 1
+            for entry_key, (stored_at, _) in list(self._entries.items()):
+                if now - stored_at > self.ttl:
+                    del self._entries[entry_key] # Expired: the car may have changed
+                    continue
+                entry_namespace, k = entry_key
+                if entry_namespace != namespace: continue
+                dist = (k ^ key).bit_count()
+                if dist < best_dist: best_key = entry_key; best_dist = dist
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][1]
+
+    def put(self, namespace, key, soup):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.time(), soup)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions
+            }
+
+
+# --- SHARED CACHE (One per web process) ---
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache(config):
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OCRCache(
+                    max_entries=config.get('OCR_CACHE_SIZE', 32),
+                    ttl=config.get('OCR_CACHE_TTL', 5.0),
+                    max_distance=config.get('OCR_CACHE_MAX_DISTANCE', 5)
+                )
+    return _cache
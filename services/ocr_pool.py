@@ -0,0 +1,177 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# --- ERRORS (Turned into 503 "retry" responses by the gate) ---
+class OCRUnavailable(Exception):
+    pass
+
+class OCRBusy(OCRUnavailable):
+    pass
+
+class OCRTimeout(OCRUnavailable):
+    pass
+
+# --- WORKER SIDE (Runs inside each child process) ---
+_reader = None
+
+def _init_worker(languages, gpu):
+    # Each worker loads the easyocr model exactly once, then serves many jobs
+    global _reader
+    import easyocr
+    _reader = easyocr.Reader(list(languages), gpu=gpu)
+
+def _readtext(image, submitted_at, detail=False):
+    started = time.time()
+    if detail:
+        # (text, confidence) pairs; the bounding boxes are not needed by the gate
+        result = [(text, float(conf)) for _, text, conf in _reader.readtext(image, detail=1)]
+    else:
+        result = _reader.readtext(image, detail=0)
+    return result, started - submitted_at, time.time() - started
+
+def _warmup():
+    return _reader is not None
+
+
+class OCRPool:
+    """
+    Runs easyocr in a pool of worker processes so a slow frame never blocks a Flask thread.
+    - At most max_pending images may be queued or running; beyond that OCRBusy is raised
+      immediately instead of letting requests pile up behind each other.
+    - Every call waits at most `timeout` seconds for its results (OCRTimeout otherwise).
+    - Images submitted together (e.g. the binary and gray passes) run in parallel.
+    """
+
+    def __init__(self, workers=2, max_pending=8, timeout=10.0, languages=('en',), gpu=False):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.languages = tuple(languages)
+        self.gpu = gpu
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._waits = deque(maxlen=200)   # seconds spent queued, last N jobs
+        self._runs = deque(maxlen=200)    # seconds spent inside readtext, last N jobs
+        self._counters = {"submitted": 0, "completed": 0, "rejected": 0, "timeouts": 0, "failed": 0}
+
+    # --- LIFECYCLE ---
+    def _get_executor(self):
+        if self._executor is None:
+            # 'spawn' keeps torch out of forked copies of the threaded web server
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.languages, self.gpu)
+            )
+        return self._executor
+
+    def warmup(self):
+        """Starts every worker and waits until each has loaded the model."""
+        with self._lock:
+            executor = self._get_executor()
+        futures = [executor.submit(_warmup) for _ in range(self.workers)]
+        for f in futures: f.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    # --- JOBS ---
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def readtext_many(self, images, detail=False):
+        """
+        OCRs all images in parallel and returns one list per image, in order:
+        strings, or (text, confidence) pairs when detail=True.
+        """
+        with self._lock:
+            if self._pending + len(images) > self.max_pending:
+                self._counters["rejected"] += 1
+                raise OCRBusy(f"OCR queue full ({self._pending} jobs waiting). Please retry.")
+            executor = self._get_executor()
+            self._pending += len(images)
+            self._counters["submitted"] += len(images)
+
+        submitted_at = time.time()
+        futures = []
+        for image in images:
+            try:
+                future = executor.submit(_readtext, image, submitted_at, detail)
+            except (BrokenProcessPool, RuntimeError):
+                self._release(None)
+                continue
+            future.add_done_callback(self._release)
+            futures.append(future)
+
+        if len(futures) != len(images):
+            for f in futures: f.cancel()
+            self._reset_broken(executor)
+            raise OCRBusy("OCR workers restarting. Please retry.")
+
+        deadline = submitted_at + self.timeout
+        results = []
+        try:
+            for f in futures:
+                text, waited, ran = f.result(timeout=max(0.0, deadline - time.time()))
+                results.append(text)
+                with self._lock:
+                    self._waits.append(waited); self._runs.append(ran)
+                    self._counters["completed"] += 1
+        except FutureTimeout:
+            for f in futures: f.cancel()
+            with self._lock: self._counters["timeouts"] += 1
+            raise OCRTimeout(f"OCR took longer than {self.timeout:g}s. Please retry.")
+        except BrokenProcessPool:
+            with self._lock: self._counters["failed"] += 1
+            self._reset_broken(executor)
+            raise OCRBusy("OCR worker crashed. Please retry.")
+        return results
+
+    def _reset_broken(self, executor):
+        # A dead worker poisons the whole executor; start a fresh one on the next job
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- MONITORING ---
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits); runs = sorted(self._runs)
+            return {
+                "workers": self.workers,
+                "queue_depth": self._pending,
+                "queue_limit": self.max_pending,
+                "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "max_wait_ms": round(waits[-1] * 1000, 1) if waits else 0.0,
+                "avg_ocr_ms": round(sum(runs) / len(runs) * 1000, 1) if runs else 0.0,
+                **self._counters
+            }
+
+
+# --- SHARED POOL (One per web process, created on first scan) ---
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool(config):
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCRPool(
+                    workers=config.get('OCR_WORKERS', 2),
+                    max_pending=config.get('OCR_QUEUE_LIMIT', 8),
+                    timeout=config.get('OCR_TIMEOUT', 10.0)
+                )
+    return _pool
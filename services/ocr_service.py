@@ -0,0 +1,145 @@
+import threading
+import time
+
+from services import roi
+
+# --- SOUP CLEANUP (Shared by every backend) ---
+def clean_soup(texts):
+    raw_soup = "".join(texts).upper().replace(" ", "").replace("-", "").replace(".", "")
+    return raw_soup.replace('_', '').replace(';', '').replace(':', '')
+
+def _gray(image):
+    import cv2
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+def _binary(gray):
+    import cv2
+    return cv2.threshold(gray, 80, 255, cv2.THRESH_BINARY)[1]
+
+
+class OCRResult:
+    def __init__(self, soup, confidence, backend, gray_texts=None):
+        self.soup = soup
+        self.confidence = confidence    # Mean easyocr confidence, None if the backend has none
+        self.backend = backend
+        self.gray_texts = gray_texts    # Lets a later backend skip re-reading the gray pass
+
+
+# --- BACKENDS ---
+class OCRBackend:
+    """
+    One way of turning the OCR inputs (plate / ID crops, or the full frame) into a soup.
+    Subclasses implement read(); `previous` is the result of the cheaper backend before it.
+    """
+    name = 'base'
+
+    def read(self, inputs, previous=None):
+        raise NotImplementedError
+
+
+class SinglePassBackend(OCRBackend):
+    """Cheap: one grayscale pass, keeping easyocr's confidences."""
+    name = 'single_pass'
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def read(self, inputs, previous=None):
+        results = self.pool.readtext_many([_gray(img) for img in inputs], detail=True)
+        pairs = [pair for res in results for pair in res]
+        texts = [text for text, _ in pairs]
+        confidence = sum(conf for _, conf in pairs) / len(pairs) if pairs else 0.0
+        return OCRResult(clean_soup(texts), confidence, self.name, gray_texts=texts)
+
+
+class DualPassBackend(OCRBackend):
+    """Expensive: thresholded + grayscale passes (the original gate pipeline)."""
+    name = 'dual_pass'
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def read(self, inputs, previous=None):
+        grays = [_gray(img) for img in inputs]
+        binaries = [_binary(g) for g in grays]
+        if previous is not None and previous.gray_texts is not None:
+            # The gray pass was already read by the cheaper backend, only add the binary pass
+            bin_texts = [t for res in self.pool.readtext_many(binaries) for t in res]
+            gray_texts = previous.gray_texts
+        else:
+            results = self.pool.readtext_many(binaries + grays)
+            bin_texts = [t for res in results[:len(binaries)] for t in res]
+            gray_texts = [t for res in results[len(binaries):] for t in res]
+        return OCRResult(clean_soup(bin_texts + gray_texts), None, self.name)
+
+
+# --- CASCADE (Cheapest backend first, escalate only when unsure) ---
+class OCRCascade:
+    """
+    Runs backends in order and stops at the first one whose result is confident enough
+    (mean confidence >= min_confidence, when it reports one) AND passes `accept(soup)`,
+    e.g. "find_best_match scores above the gate threshold". The last backend always wins.
+    """
+
+    def __init__(self, backends, min_confidence=0.6, use_roi=True):
+        self.backends = backends
+        self.min_confidence = min_confidence
+        self.use_roi = use_roi
+        self._lock = threading.Lock()
+        self._stats = {b.name: {"calls": 0, "accepted": 0, "escalated": 0, "total_ms": 0.0} for b in backends}
+
+    def run(self, image, kind='plate', accept=None):
+        if self.use_roi:
+            inputs, _ = roi.ocr_inputs(image, kind)
+        else:
+            inputs = [image]
+
+        result = None
+        for i, backend in enumerate(self.backends):
+            started = time.perf_counter()
+            result = backend.read(inputs, previous=result)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            last = i == len(self.backends) - 1
+            confident = result.confidence is None or result.confidence >= self.min_confidence
+            good = last or (confident and (accept is None or accept(result.soup)))
+            with self._lock:
+                s = self._stats[backend.name]
+                s["calls"] += 1; s["total_ms"] += elapsed_ms
+                s["accepted" if good else "escalated"] += 1
+            if good: return result
+        return result
+
+    def stats(self):
+        with self._lock:
+            total = sum(s["accepted"] for s in self._stats.values())
+            report = {}
+            for name, s in self._stats.items():
+                report[name] = {
+                    "calls": s["calls"],
+                    "accepted": s["accepted"],
+                    "escalated": s["escalated"],
+                    "hit_rate": round(s["accepted"] / s["calls"], 3) if s["calls"] else 0.0,
+                    "share_of_scans": round(s["accepted"] / total, 3) if total else 0.0,
+                    "avg_ms": round(s["total_ms"] / s["calls"], 1) if s["calls"] else 0.0
+                }
+            return report
+
+
+# --- SHARED CASCADE (One per web process, on top of the OCR worker pool) ---
+_cascade = None
+_cascade_lock = threading.Lock()
+
+def get_cascade(config):
+    global _cascade
+    if _cascade is None:
+        from services import ocr_pool
+        with _cascade_lock:
+            if _cascade is None:
+                pool = ocr_pool.get_pool(config)
+                backends = [DualPassBackend(pool)]
+                if config.get('OCR_CASCADE', True):
+                    backends.insert(0, SinglePassBackend(pool))
+                _cascade = OCRCascade(backends, min_confidence=config.get('OCR_CASCADE_MIN_CONFIDENCE', 0.6),
+                                      use_roi=config.get('OCR_USE_ROI', True))
+    return _cascade
@@ -0,0 +1,225 @@
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+
+# --- EMAIL OUTBOX (Handlers queue, a background thread delivers) ---
+# enqueue() only adds a row to the caller's DB session, so the email is committed (or
+# rolled back) together with the gate transaction / ticket update that caused it.
+# The sender claims due rows in batches and pushes them through one SMTP connection that
+# stays open while there is mail to send. Failed sends back off exponentially and are
+# dead-lettered (status 'dead') after max_attempts. Sent rows are deleted retention_days
+# after sending; dead ones are kept for the admin to look at.
+
+def enqueue(subject, recipients, body, sender=None):
+    """Adds an email to the outbox in the current DB session; the caller commits."""
+    from extensions import db
+    from models import OutboxEmail
+    if isinstance(recipients, str): recipients = [recipients]
+    row = OutboxEmail(subject=subject, recipients=",".join(recipients), body=body, sender=sender,
+                      status='pending', attempts=0, next_attempt_at=datetime.utcnow())
+    db.session.add(row)
+    return row
+
+
+class OutboxSender:
+    """
+    Background delivery thread. Rows are claimed with a conditional UPDATE (status
+    'sending' plus a lease in next_attempt_at), so several web processes can run a
+    sender against the same database without sending anything twice.
+    """
+
+    def __init__(self, app, batch_size=20, poll_interval=2.0, max_attempts=5, backoff=30.0,
+                 keepalive=30.0, lease=300.0, retention_days=30.0, sweep_interval=3600.0, sweep_chunk=500):
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.keepalive = keepalive
+        self.lease = lease
+        self.retention_days = retention_days
+        self.sweep_interval = sweep_interval
+        self.sweep_chunk = sweep_chunk
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None           # flask_mail Connection, open while mail keeps coming
+        self._conn_used_at = 0.0
+        self._swept_at = 0.0        # First sweep right after start
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self.connections = 0
+        self.purged = 0
+
+    # --- LIFECYCLE ---
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set(); self._wake.set()
+        if self._thread: self._thread.join(timeout=10)
+
+    def wake(self):
+        """Called after a commit that queued mail, so it goes out without waiting for the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    while self.drain_once(): pass
+                    self._close_if_idle()
+                    if time.time() - self._swept_at >= self.sweep_interval:
+                        self._swept_at = time.time()
+                        self.purge_sent()
+            except Exception as e:
+                print(f"⚠️ OUTBOX SENDER ERROR: {e}")
+                self._drop_connection()
+            self._wake.wait(self.poll_interval); self._wake.clear()
+        with self.app.app_context(): self._drop_connection()
+
+    # --- DELIVERY ---
+    def _claim(self):
+        from extensions import db
+        from models import OutboxEmail
+        now = datetime.utcnow()
+        # 'sending' rows whose lease ran out belong to a sender that died mid-batch
+        due = OutboxEmail.query.filter(OutboxEmail.status.in_(('pending', 'sending')),
+                                       OutboxEmail.next_attempt_at <= now) \
+                               .order_by(OutboxEmail.next_attempt_at, OutboxEmail.id).limit(self.batch_size).all()
+        lease_until = now + timedelta(seconds=self.lease)
+        claimed = []
+        for row in due:
+            won = OutboxEmail.query.filter_by(id=row.id, status=row.status, next_attempt_at=row.next_attempt_at) \
+                                   .update({'status': 'sending', 'next_attempt_at': lease_until},
+                                           synchronize_session=False)
+            if won: claimed.append(row.id)
+        db.session.commit()
+        return OutboxEmail.query.filter(OutboxEmail.id.in_(claimed)).order_by(OutboxEmail.id).all() if claimed else []
+
+    def drain_once(self):
+        """Sends one batch; returns True if there may be more due mail."""
+        from flask_mail import Message
+        from extensions import db
+        batch = self._claim()
+        if not batch: return False
+
+        for row in batch:
+            try:
+                msg = Message(row.subject, recipients=row.recipients.split(","), body=row.body,
+                              sender=row.sender or None)
+                self._connection().send(msg)
+                row.status = 'sent'; row.sent_at = datetime.utcnow(); row.attempts += 1; row.last_error = None
+                self.sent += 1
+            except Exception as e:
+                # A 4xx/5xx reply only fails this message; anything else (disconnect, timeout) means the connection is gone
+                if not isinstance(e, smtplib.SMTPResponseException): self._drop_connection()
+                self._failed(row, e)
+            db.session.commit()
+        return len(batch) == self.batch_size
+
+    def _failed(self, row, error):
+        row.attempts += 1
+        row.last_error = str(error)[:500]
+        if row.attempts >= self.max_attempts:
+            row.status = 'dead'; self.dead += 1
+            print(f"☠️ OUTBOX: giving up on email #{row.id} to {row.recipients}: {error}")
+        else:
+            row.status = 'pending'; self.failed += 1
+            delay = min(self.backoff * (2 ** (row.attempts - 1)), 3600)
+            row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+    # --- RETENTION (Sent mail is history; the table would otherwise grow forever) ---
+    def purge_sent(self):
+        """
+        Deletes sent rows older than retention_days (0 = keep everything), sweep_chunk rows
+        per commit so gate writes never wait long on the SQLite lock. Returns the count.
+        """
+        if not self.retention_days: return 0
+        from sqlalchemy import delete, select
+        from extensions import db
+        from models import OutboxEmail
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        purged = 0
+        while True:
+            # Oldest first along ix_outbox_status_due, so each chunk stops as soon as it is full
+            chunk = select(OutboxEmail.id).where(OutboxEmail.status == 'sent', OutboxEmail.sent_at < cutoff) \
+                                          .order_by(OutboxEmail.next_attempt_at).limit(self.sweep_chunk)
+            deleted = db.session.execute(delete(OutboxEmail).where(OutboxEmail.id.in_(chunk))).rowcount
+            db.session.commit()
+            purged += deleted
+            if deleted < self.sweep_chunk: break
+        self.purged += purged
+        return purged
+
+    # --- SMTP CONNECTION (Reused across messages and batches) ---
+    def _connection(self):
+        from extensions import mail
+        if self._conn is None:
+            conn = mail.connect()
+            conn.__enter__() # Opens (and logs in to) the SMTP server
+            self._conn = conn
+            self.connections += 1
+        self._conn_used_at = time.time()
+        return self._conn
+
+    def _close_if_idle(self):
+        if self._conn is not None and time.time() - self._conn_used_at > self.keepalive:
+            self._drop_connection()
+
+    def _drop_connection(self):
+        conn, self._conn = self._conn, None
+        if conn is None: return
+        try: conn.__exit__(None, None, None)
+        except Exception: pass
+
+    def stats(self):
+        from extensions import db
+        from models import OutboxEmail
+        counts = dict(db.session.query(OutboxEmail.status, db.func.count()).group_by(OutboxEmail.status).all())
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "queue": {s: counts.get(s, 0) for s in ('pending', 'sending', 'sent', 'dead')},
+            "sent": self.sent,
+            "retried": self.failed,
+            "dead_lettered": self.dead,
+            "smtp_connections": self.connections,
+            "purged": self.purged,
+            "connection_open": self._conn is not None
+        }
+
+
+# --- SHARED SENDER (One per web process, started on first use) ---
+_sender = None
+_sender_lock = threading.Lock()
+
+def get_sender(app=None):
+    """Returns the process's sender, starting it if OUTBOX_SENDER is on. Needs an app (or app context)."""
+    global _sender
+    if _sender is None:
+        from flask import current_app
+        app = app or current_app._get_current_object()
+        with _sender_lock:
+            if _sender is None:
+                config = app.config
+                _sender = OutboxSender(
+                    app,
+                    batch_size=config.get('OUTBOX_BATCH_SIZE', 20),
+                    poll_interval=config.get('OUTBOX_POLL_INTERVAL', 2.0),
+                    max_attempts=config.get('OUTBOX_MAX_ATTEMPTS', 5),
+                    backoff=config.get('OUTBOX_BACKOFF', 30.0),
+                    keepalive=config.get('OUTBOX_KEEPALIVE', 30.0),
+                    retention_days=config.get('OUTBOX_RETENTION_DAYS', 30.0)
+                )
+                if config.get('OUTBOX_SENDER', True): _sender.start()
+    return _sender
+
+def wake():
+    get_sender().wake()
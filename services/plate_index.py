@@ -0,0 +1,372 @@
+import difflib
+import threading
+from collections import Counter
+
+# --- OCR CONFUSION MAP (Letters that easyocr mixes up with digits) ---
+_CONFUSIONS = str.maketrans({
+    'S': '5', 'Z': '2', 'I': '1', 'O': '0', 'B': '8',
+    'D': '0', 'G': '6', 'Q': '0', 'U': '0'
+})
+
+def normalize(text):
+    """
+    Maps OCR-confusable letters to the digit they are usually misread as.
+    Same result as the old chain of .replace() calls, in a single pass.
+    """
+    return text.translate(_CONFUSIONS)
+
+# Characters the gate strips from the OCR soup (see ocr_service.clean_soup)
+_SOUP_NOISE = str.maketrans('', '', ' -._;:')
+
+def canonical(plate):
+    """
+    Form stored in Vehicle.plate_canonical: upper case, soup noise removed, OCR confusions mapped.
+    A clean read of a plate always contains its canonical form in normalize(soup).
+    """
+    return normalize(plate.upper().translate(_SOUP_NOISE))
+
+# --- EXACT SCORER (Sliding Window, unchanged from the gate) ---
+def window_score(norm_soup, norm_plate):
+    """
+    Best difflib ratio of the plate against every window (length n and n-1) of the soup.
+    """
+    n = len(norm_plate)
+    best = 0.0
+    matcher = difflib.SequenceMatcher(None, norm_plate, '')
+    for i in range(len(norm_soup)):
+        chunk = norm_soup[i : i + n]
+        chunk_short = norm_soup[i : i + n - 1] if (i + n - 1) <= len(norm_soup) else ""
+
+        if len(chunk) > n * 0.6:
+            matcher.set_seq2(chunk)
+            score = matcher.ratio()
+            if score > best: best = score
+        if len(chunk_short) > n * 0.6:
+            matcher.set_seq2(chunk_short)
+            score = matcher.ratio()
+            if score > best: best = score
+    return best
+
+def linear_best_match(soup, all_vehicles):
+    """
+    Reference implementation: scores every vehicle against the soup.
+    Kept for benchmarks and for checking the index returns identical results.
+    """
+    norm_soup = normalize(soup)
+    best_vehicle = None; best_score = 0.0
+
+    for v in all_vehicles:
+        plate = v.license_plate.upper()
+        if plate in soup: return v, 1.0
+
+        score = window_score(norm_soup, normalize(plate))
+        if score > best_score:
+            best_score = score; best_vehicle = v
+
+    return best_vehicle, best_score
+
+# --- UPPER BOUNDS (Cheap pruning before running difflib) ---
+def _ratio_bound(common, n):
+    # ratio = 2*M / (n + L) with M <= min(common, L)  ->  never above 2*common / (n + common)
+    if common <= 0: return 0.0
+    return 2.0 * common / (n + common)
+
+def _cannot_win(bound, vehicle_id, best_score, best_id):
+    # Equal scores only matter for vehicles listed before the current best
+    return bound < best_score or (bound == best_score and (best_id is None or vehicle_id > best_id))
+
+def _window_common(norm_soup, entry):
+    """
+    Largest multiset overlap between the plate and any n-length window of the soup.
+    Every chunk scored by window_score is contained in one of these windows.
+    """
+    counts = entry.counts
+    n = entry.length
+    window = Counter()
+    common = 0
+    best = 0
+    for i, ch in enumerate(norm_soup):
+        # Slide in the new character
+        window[ch] += 1
+        if window[ch] <= counts.get(ch, 0): common += 1
+        # Slide out the character that fell off the left edge
+        if i >= n:
+            old = norm_soup[i - n]
+            if window[old] <= counts.get(old, 0): common -= 1
+            window[old] -= 1
+        if common > best:
+            best = common
+            if best == n: break
+    return best
+
+
+def _trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class _Entry:
+    __slots__ = ('vehicle_id', 'plate', 'norm_plate', 'length', 'counts', 'grams')
+
+    def __init__(self, vehicle_id, plate):
+        self.vehicle_id = vehicle_id
+        self.plate = plate
+        self.norm_plate = normalize(plate)
+        self.length = len(self.norm_plate)
+        self.counts = Counter(self.norm_plate)
+        self.grams = _trigrams(self.norm_plate)
+
+
+class PlateIndex:
+    """
+    In-memory plate matcher. Returns exactly what linear_best_match would:
+      1. Exact raw-plate substrings are found with one dict lookup per soup window.
+      2. The few plates sharing the most normalized trigrams with the soup are
+         scored first, so a strong best score is known early.
+      3. Every other plate gets a character-count upper bound on its difflib score,
+         and is only scored if that bound could still beat (or tie an earlier
+         vehicle with) the best score so far.
+    Ties are broken by vehicle id, which is the order Vehicle.query.all() returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}      # vehicle_id -> _Entry
+        self._by_plate = {}     # upper plate -> set of vehicle_ids
+        self._lengths = Counter()
+        self._grams = {}        # normalized trigram -> set of vehicle_ids
+        self.built = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- MAINTENANCE ---
+    def rebuild(self, vehicles):
+        with self._lock:
+            self._entries = {}; self._by_plate = {}; self._lengths = Counter(); self._grams = {}
+            for v in vehicles:
+                self._add(v.id, v.license_plate)
+            self.built = True
+
+    def add(self, vehicle):
+        with self._lock:
+            self._add(vehicle.id, vehicle.license_plate)
+
+    def add_many(self, vehicles):
+        """Anything with .id / .license_plate (ORM objects or rows), under one lock acquisition."""
+        with self._lock:
+            for v in vehicles: self._add(v.id, v.license_plate)
+
+    def remove(self, vehicle_id):
+        with self._lock:
+            entry = self._entries.pop(vehicle_id, None)
+            if not entry: return
+            ids = self._by_plate.get(entry.plate)
+            ids.discard(vehicle_id)
+            if not ids: del self._by_plate[entry.plate]
+            self._lengths[len(entry.plate)] -= 1
+            if not self._lengths[len(entry.plate)]: del self._lengths[len(entry.plate)]
+            for gram in entry.grams:
+                ids = self._grams[gram]
+                ids.discard(vehicle_id)
+                if not ids: del self._grams[gram]
+
+    def _add(self, vehicle_id, license_plate):
+        if vehicle_id in self._entries: self.remove(vehicle_id)
+        entry = _Entry(vehicle_id, license_plate.upper())
+        self._entries[vehicle_id] = entry
+        self._by_plate.setdefault(entry.plate, set()).add(vehicle_id)
+        self._lengths[len(entry.plate)] += 1
+        for gram in entry.grams:
+            self._grams.setdefault(gram, set()).add(vehicle_id)
+
+    # --- LOOKUP ---
+    def match(self, soup, min_score=0.0, seed_candidates=8):
+        """
+        Returns (vehicle_id, score), or (None, 0.0) when nothing scores above zero.
+        Plates that cannot reach min_score are never scored, so results below
+        min_score are only a lower bound (the gate rejects those anyway).
+        """
+        norm_soup = normalize(soup)
+        with self._lock:
+            entries = self._entries
+            by_plate = self._by_plate
+            lengths = list(self._lengths)
+
+            # 1. Exact substring fast path (lowest vehicle id wins, like the linear scan)
+            exact = None
+            for length in lengths:
+                for i in range(len(soup) - length + 1):
+                    ids = by_plate.get(soup[i : i + length])
+                    if ids:
+                        first = min(ids)
+                        if exact is None or first < exact: exact = first
+            if exact is not None: return exact, 1.0
+
+            # 2. Trigram shortlist (vehicle ids sharing the most trigrams with the soup)
+            hits = Counter()
+            for gram in _trigrams(norm_soup):
+                ids = self._grams.get(gram)
+                if ids: hits.update(ids)
+            shortlist = [entries[vid] for vid, _ in hits.most_common(seed_candidates)]
+            entries = list(entries.values())
+
+        best_id = None; best_score = 0.0
+        for e in shortlist:
+            score = window_score(norm_soup, e.norm_plate)
+            if score > best_score or (score == best_score and score > 0.0 and e.vehicle_id < best_id):
+                best_score = score; best_id = e.vehicle_id
+        scored = {e.vehicle_id for e in shortlist}
+
+        # 3. Bound every other plate by its character overlap with the whole soup
+        soup_counts = Counter(norm_soup)
+        candidates = []
+        for e in entries:
+            if e.vehicle_id in scored: continue
+            common = 0
+            for ch, cnt in e.counts.items():
+                have = soup_counts.get(ch)
+                if have: common += cnt if cnt < have else have
+            bound = _ratio_bound(common, e.length)
+            if bound > 0.0 and bound >= min_score: candidates.append((-bound, e.vehicle_id, e))
+        candidates.sort()
+
+        # 4. Score best-bound-first, skipping plates that cannot win
+        for neg_bound, vehicle_id, e in candidates:
+            bound = -neg_bound
+            if bound < best_score: break
+            if _cannot_win(bound, vehicle_id, best_score, best_id): continue
+            bound = _ratio_bound(_window_common(norm_soup, e), e.length)
+            if bound < min_score or _cannot_win(bound, vehicle_id, best_score, best_id): continue
+
+            score = window_score(norm_soup, e.norm_plate)
+            if score > best_score or (score == best_score and score > 0.0 and vehicle_id < best_id):
+                best_score = score; best_id = vehicle_id
+
+        return best_id, best_score
+
+
+# --- SQL FAST PATH (Indexed exact lookup, no fuzzy scoring) ---
+_lengths = None   # Distinct canonical plate lengths, so only windows that could match are sent
+_lengths_lock = threading.Lock()
+
+def _plate_lengths():
+    global _lengths
+    if _lengths is None:
+        from sqlalchemy import func
+        from extensions import db
+        from models import Vehicle
+        with _lengths_lock:
+            if _lengths is None:
+                rows = db.session.query(func.length(Vehicle.plate_canonical)).filter(
+                    Vehicle.plate_canonical.isnot(None)).distinct().all()
+                _lengths = sorted(n for (n,) in rows if n)
+    return _lengths
+
+def exact_match(soup):
+    """
+    Looks up every plate-length window of the soup in one indexed query on
+    license_plate / plate_canonical. Returns the Vehicle, or None when nothing hits.
+    Same winner as the fuzzy path for these reads: an exact raw plate beats a
+    normalized one, then the lowest vehicle id. Requires an app context.
+    """
+    from sqlalchemy import or_
+    from models import Vehicle
+    lengths = _plate_lengths()
+    if not lengths or not soup: return None
+    norm_soup = normalize(soup)
+    raw = {soup[i : i + n] for n in lengths for i in range(len(soup) - n + 1)}
+    norm = {norm_soup[i : i + n] for n in lengths for i in range(len(norm_soup) - n + 1)}
+    if not norm: return None
+
+    hits = Vehicle.query.filter(or_(Vehicle.license_plate.in_(raw), Vehicle.plate_canonical.in_(norm))) \
+                        .order_by(Vehicle.id).all()
+    for v in hits:
+        if v.license_plate.upper() in soup: return v
+    return hits[0] if hits else None
+
+def match_many(plates, min_score=0.0):
+    """
+    Matches a batch of typed plates against one snapshot: a single indexed query for
+    the exact / canonical hits, the fuzzy index for the rest, and a single query to
+    load those vehicles. Returns {plate: (Vehicle or None, score)}. Requires an app context.
+    """
+    from sqlalchemy import or_
+    from models import Vehicle
+    wanted = {p: canonical(p) for p in set(plates) if p}
+    if not wanted: return {}
+    hits = Vehicle.query.filter(or_(Vehicle.license_plate.in_(list(wanted)),
+                                    Vehicle.plate_canonical.in_(set(wanted.values())))) \
+                        .order_by(Vehicle.id).all()
+    by_raw, by_canonical = {}, {}
+    for v in hits:
+        by_raw.setdefault(v.license_plate.upper(), v)
+        by_canonical.setdefault(v.plate_canonical, v)
+
+    results, fuzzy = {}, []
+    for plate, canon in wanted.items():
+        vehicle = by_raw.get(plate) or by_canonical.get(canon)
+        if vehicle: results[plate] = (vehicle, 1.0)
+        else: fuzzy.append(plate)
+    index = ensure_built() if fuzzy else None   # One staleness check for the batch
+    fuzzy = {plate: index.match(plate, min_score=min_score) for plate in fuzzy}
+    ids = {vehicle_id for vehicle_id, _ in fuzzy.values() if vehicle_id is not None}
+    loaded = {v.id: v for v in Vehicle.query.filter(Vehicle.id.in_(ids))} if ids else {}
+    for plate, (vehicle_id, score) in fuzzy.items():
+        results[plate] = (loaded.get(vehicle_id), score)
+    return results
+
+# --- SHARED INSTANCE (One per process, built on first use, reloaded when the table changes) ---
+plate_index = PlateIndex()
+_signature = None   # _vehicles_signature() the index was last brought up to date with
+
+def _vehicles_signature():
+    """
+    (count, id, plate of the newest vehicle): one query, answered from indexes.
+    Any insert changes the newest vehicle (a new one reusing a deleted max id has
+    another plate), any delete without an insert changes the count.
+    """
+    from sqlalchemy import func, select
+    from extensions import db
+    from models import Vehicle
+    count = select(func.count(Vehicle.id)).scalar_subquery()
+    max_id = select(func.max(Vehicle.id)).scalar_subquery()
+    newest = db.session.query(count, Vehicle.id, Vehicle.license_plate).filter(Vehicle.id == max_id).first()
+    return tuple(newest) if newest else (0, None, None)
+
+def ensure_built():
+    """
+    Returns the shared index, loading every Vehicle the first time it is needed, and
+    again whenever the vehicles table no longer matches it: other processes approve
+    and delete cars too, and the hooks below only reach this process's index.
+    Requires an app context.
+    """
+    global _signature, _lengths
+    signature = _vehicles_signature()
+    if plate_index.built and signature == _signature: return plate_index
+    from models import Vehicle
+    with plate_index._lock:
+        if not plate_index.built or signature != _signature:
+            plate_index.rebuild(Vehicle.query.order_by(Vehicle.id).all())
+            _signature, _lengths = signature, None
+    return plate_index
+
+def _record_signature():
+    # After this process's own change: record the new signature so it doesn't trigger a full reload
+    global _signature
+    if plate_index.built: _signature = _vehicles_signature()
+
+def vehicles_added(vehicles):
+    """New vehicles (approvals): the SQL fast path's plate lengths are reset once."""
+    global _lengths
+    _lengths = None
+    # Only needed once built; an unbuilt index loads the vehicles from the DB anyway
+    if plate_index.built:
+        plate_index.add_many(vehicles)
+        _record_signature()
+
+def vehicle_removed(vehicle_id):
+    global _lengths
+    _lengths = None
+    if plate_index.built:
+        plate_index.remove(vehicle_id)
+        _record_signature()
@@ -0,0 +1,59 @@
+from sqlalchemy import delete, exists, insert, select
+
+# --- SPOT PROVISIONING (Set-based create / resize / delete of a lot's spots) ---
+# add_spots() inserts plain rows through one Core executemany per chunk, with no ParkingSpot
+# objects in the session. remove_spots_above() is one DELETE whose WHERE clause refuses to
+# run while any of the spots it would remove is occupied, so a car that parks in between
+# cannot lose its spot. Both leave the commit (and the allocator / live-event hooks) to the caller.
+
+def parse_ranges(text):
+    """'1-40, 101-120, 7' -> [(1, 40), (101, 120), (7, 7)]; raises ValueError on anything else."""
+    ranges = []
+    for part in (text or '').split(','):
+        part = part.strip()
+        if not part: continue
+        lo, _, hi = part.partition('-')
+        lo, hi = int(lo), int(hi or lo)
+        if lo < 1 or hi < lo: raise ValueError(f"bad spot range '{part}'")
+        ranges.append((lo, hi))
+    return ranges
+
+def reserved_rule(capacity, ratio=0.2, ranges=None):
+    """
+    spot_number -> reserved_for_faculty. Explicit ranges win; otherwise the first
+    `ratio` of the lot is reserved (the original 20% rule).
+    """
+    if ranges:
+        return lambda n: any(lo <= n <= hi for lo, hi in ranges)
+    limit = capacity * ratio
+    return lambda n: n <= limit
+
+def add_spots(lot_id, first, last, reserved=None, chunk=5000):
+    """Inserts spots first..last (inclusive) as available; returns how many."""
+    from extensions import db
+    from models import ParkingSpot
+    table = ParkingSpot.__table__
+    reserved = reserved or (lambda n: False)
+    for start in range(first, last + 1, chunk):
+        rows = [{"lot_id": lot_id, "spot_number": n, "status": 'available', "reserved_for_faculty": bool(reserved(n))}
+                for n in range(start, min(start + chunk, last + 1))]
+        db.session.execute(insert(table), rows)
+    return max(0, last - first + 1)
+
+def remove_spots_above(lot_id, keep):
+    """
+    Deletes the lot's spots numbered above `keep` (0 = all of them) unless one of them is
+    occupied. Returns (deleted, first occupied spot number or None).
+    """
+    from extensions import db
+    from models import ParkingSpot
+    table = ParkingSpot.__table__
+    other = table.alias()
+    occupied = exists().where(other.c.lot_id == lot_id, other.c.spot_number > keep, other.c.status == 'occupied')
+    deleted = db.session.execute(
+        delete(table).where(table.c.lot_id == lot_id, table.c.spot_number > keep, ~occupied)).rowcount
+    if deleted: return deleted, None
+    blocker = db.session.execute(
+        select(table.c.spot_number).where(table.c.lot_id == lot_id, table.c.spot_number > keep, table.c.status == 'occupied')
+                                   .order_by(table.c.spot_number).limit(1)).scalar()
+    return 0, blocker
@@ -0,0 +1,105 @@
+# --- REGION OF INTEREST (Crop plates / ID cards before OCR) ---
+# OCR cost grows with pixel count, and most of a gate frame is road or wall.
+# A quick edge + contour pass finds plate-shaped (or card-shaped) rectangles,
+# so easyocr only reads those crops. If nothing plausible is found the caller
+# falls back to the (downscaled) full frame, so accuracy never gets worse than before.
+
+# Width / height of the box we are looking for
+ASPECT_RANGES = {
+    'plate': (2.0, 6.5),   # Indian plates are ~4.5:1 (single row) or ~2:1 (two rows)
+    'id':    (1.2, 2.0),   # CR80 ID cards are ~1.59:1
+}
+
+DETECT_WIDTH = 640      # Edge detection runs on a copy this wide
+MAX_CROP_WIDTH = 800    # Crops wider than this are downscaled before OCR
+MAX_FRAME_WIDTH = 1280  # Full-frame fallback is downscaled to this
+
+
+def _resize_to_width(image, max_width):
+    import cv2
+    h, w = image.shape[:2]
+    if w <= max_width: return image, 1.0
+    scale = max_width / w
+    return cv2.resize(image, (max_width, int(round(h * scale))), interpolation=cv2.INTER_AREA), scale
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a; bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    return inter / float(aw * ah + bw * bh - inter) if inter else 0.0
+
+
+def find_regions(image, kind='plate', max_regions=2, min_area=0.004, max_area=0.5):
+    """
+    Returns up to `max_regions` (x, y, w, h) boxes in original image coordinates,
+    largest first. min_area / max_area are fractions of the frame area.
+    """
+    import cv2
+    import numpy as np
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small, scale = _resize_to_width(gray, DETECT_WIDTH)
+    frame_area = small.shape[0] * small.shape[1]
+    lo, hi = ASPECT_RANGES[kind]
+
+    edges = cv2.Canny(cv2.GaussianBlur(small, (5, 5), 0), 50, 150)
+    # Join the broken outline of a plate border into one closed contour
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((3, 5), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for c in contours:
+        x, y, w, h = cv2.boundingRect(c)
+        area = w * h
+        if h == 0 or not (min_area * frame_area <= area <= max_area * frame_area): continue
+        if not (lo <= w / float(h) <= hi): continue
+        # Rectangles fill most of their bounding box; text strokes and clutter don't
+        if cv2.contourArea(cv2.convexHull(c)) < 0.6 * area: continue
+        boxes.append((x, y, w, h))
+
+    # Keep the largest of overlapping boxes (inner and outer edge of the same plate)
+    boxes.sort(key=lambda b: b[2] * b[3], reverse=True)
+    picked = []
+    for b in boxes:
+        if all(_iou(b, p) < 0.3 for p in picked): picked.append(b)
+        if len(picked) == max_regions: break
+
+    H, W = gray.shape[:2]
+    result = []
+    for x, y, w, h in picked:
+        # Back to full-resolution coordinates, with a little margin so edge characters survive
+        x, y, w, h = [int(round(v / scale)) for v in (x, y, w, h)]
+        pad_x, pad_y = int(w * 0.06), int(h * 0.12)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(W, x + w + pad_x), min(H, y + h + pad_y)
+        result.append((x0, y0, x1 - x0, y1 - y0))
+    return result
+
+
+def ocr_inputs(image, kind='plate'):
+    """
+    Images to hand to easyocr: the candidate crops (downscaled if huge), or the
+    downscaled full frame when no candidate was found. Returns (images, used_roi).
+    """
+    regions = find_regions(image, kind)
+    if not regions:
+        return [_resize_to_width(image, MAX_FRAME_WIDTH)[0]], False
+    crops = [_resize_to_width(image[y : y + h, x : x + w], MAX_CROP_WIDTH)[0] for x, y, w, h in regions]
+    return crops, True
+
+
+def ocr_passes(image, kind='plate', use_roi=True):
+    """
+    The thresholded + grayscale passes for every OCR input, all binary passes first
+    (same order as the original single-frame soup). Returns (passes, used_roi).
+    """
+    import cv2
+    if use_roi:
+        inputs, used_roi = ocr_inputs(image, kind)
+    else:
+        inputs, used_roi = [image], False
+    grays = [cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img for img in inputs]
+    binaries = [cv2.threshold(g, 80, 255, cv2.THRESH_BINARY)[1] for g in grays]
+    return binaries + grays, used_roi
+
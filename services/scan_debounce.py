@@ -0,0 +1,90 @@
+import threading
+import time
+
+# --- SCAN DEBOUNCE (Repeated presses of SCAN for the same car) ---
+# Per gate, a decision is remembered for `window` seconds under the OCR soup and under
+# the matched plate. A repeat scan gets that decision back (marked "repeat": true)
+# without running the match, the "already inside" query or the allocation again.
+# Two presses that arrive together are coalesced: the second waits for the first
+# one's decision instead of racing it to the database. Once a car is let through at one
+# gate, whatever the other gates remembered about it is dropped (it is now inside / out).
+
+class ScanDebouncer:
+    def __init__(self, window=3.0, max_entries=512):
+        self.window = window
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._decisions = {}    # (gate, key) -> (decided_at, payload, status_code, plate)
+        self._inflight = {}     # (gate, key) -> Event, set when its decision is settled
+        self.suppressed = {}    # gate -> repeat scans answered from memory
+        self.coalesced = 0
+
+    def _fresh(self, slot, now):
+        entry = self._decisions.get(slot)
+        if entry and now - entry[0] <= self.window: return entry
+        return None
+
+    def claim(self, gate, key):
+        """
+        Returns the remembered (payload, status_code) for this key, waiting for an identical
+        scan that is still being decided. Returns None when there is none; the caller then
+        owns the key and must settle() it (also on errors).
+        """
+        if not self.window or not key: return None
+        slot = (gate, key)
+        waited = False
+        while True:
+            with self._lock:
+                entry = self._fresh(slot, time.time())
+                if entry:
+                    self.suppressed[gate] = self.suppressed.get(gate, 0) + 1
+                    self.coalesced += waited
+                    return {**entry[1], "repeat": True}, entry[2]
+                pending = self._inflight.get(slot)
+                if pending is None:
+                    self._inflight[slot] = threading.Event()
+                    return None
+            waited = True
+            if not pending.wait(self.window): return None # Owner is stuck; decide without it
+
+    def settle(self, gate, keys, payload=None, status_code=None, plate=None):
+        """
+        Remembers the decision under every key (payload None = nothing to remember) and
+        wakes waiters. `plate` is the matched plate, so other gates can forget it.
+        """
+        now = time.time()
+        let_through = payload is not None and payload.get("status") == "allowed" and not payload.get("repeat")
+        if payload is not None: payload = {k: v for k, v in payload.items() if k != "repeat"}
+        with self._lock:
+            if plate and let_through:
+                self._decisions = {slot: v for slot, v in self._decisions.items() if slot[0] == gate or v[3] != plate}
+            for key in keys:
+                if not key: continue
+                slot = (gate, key)
+                if payload is not None: self._decisions[slot] = (now, payload, status_code, plate)
+                pending = self._inflight.pop(slot, None)
+                if pending: pending.set()
+            if len(self._decisions) > self.max_entries:
+                self._decisions = {k: v for k, v in self._decisions.items() if now - v[0] <= self.window}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "window_s": self.window,
+                "entries": len(self._decisions),
+                "suppressed": dict(self.suppressed),
+                "coalesced": self.coalesced
+            }
+
+
+# --- SHARED DEBOUNCER (One per web process) ---
+_debouncer = None
+_debouncer_lock = threading.Lock()
+
+def get_debouncer(config):
+    global _debouncer
+    if _debouncer is None:
+        with _debouncer_lock:
+            if _debouncer is None:
+                _debouncer = ScanDebouncer(window=config.get('SCAN_DEBOUNCE_WINDOW', 3.0))
+    return _debouncer
@@ -0,0 +1,170 @@
+import heapq
+import threading
+
+# --- FREE-SPOT ALLOCATOR (Per-lot min-heaps, no query per preferred lot) ---
+class _LotPool:
+    """
+    Free spot numbers of one lot, split into the faculty-reserved and open pools.
+    Heaps are cleaned lazily: an entry only counts while it is still in the matching free set.
+    """
+    __slots__ = ('reserved_free', 'open_free', 'reserved_heap', 'open_heap', 'reserved')
+
+    def __init__(self):
+        self.reserved_free = set()
+        self.open_free = set()
+        self.reserved_heap = []
+        self.open_heap = []
+        self.reserved = {}      # spot_number -> reserved_for_faculty, for every spot in the lot
+
+    def set_spot(self, spot_number, reserved, free):
+        self.reserved_free.discard(spot_number); self.open_free.discard(spot_number)
+        self.reserved[spot_number] = reserved
+        if not free: return
+        if reserved:
+            self.reserved_free.add(spot_number); heapq.heappush(self.reserved_heap, spot_number)
+        else:
+            self.open_free.add(spot_number); heapq.heappush(self.open_heap, spot_number)
+
+    def remove_spot(self, spot_number):
+        self.reserved_free.discard(spot_number); self.open_free.discard(spot_number)
+        self.reserved.pop(spot_number, None)
+
+    @staticmethod
+    def _top(heap, free):
+        while heap and heap[0] not in free: heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def lowest_free(self, faculty):
+        """Lowest free spot number; faculty may use both pools, everyone else only the open one."""
+        open_top = self._top(self.open_heap, self.open_free)
+        if not faculty: return open_top
+        reserved_top = self._top(self.reserved_heap, self.reserved_free)
+        if open_top is None: return reserved_top
+        if reserved_top is None: return open_top
+        return min(open_top, reserved_top)
+
+    def counts(self):
+        return {"free_reserved": len(self.reserved_free), "free_open": len(self.open_free), "spots": len(self.reserved)}
+
+    def summary(self):
+        """Same keys as services/occupancy.lot_summaries(), from memory."""
+        spots, free = len(self.reserved), len(self.reserved_free) + len(self.open_free)
+        return {"spots": spots, "free": free, "occupied": spots - free,
+                "reserved": sum(1 for r in self.reserved.values() if r), "reserved_free": len(self.reserved_free)}
+
+
+class SpotAllocator:
+    """
+    Mirrors ParkingSpot.status / reserved_for_faculty in memory so the gate can pick
+    "the lowest available spot in the first preferred lot with space" without a query
+    per lot. Every write path (entry, exit, admin lot edits) reports back here.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._lots = {}         # lot_id -> _LotPool
+        self.built = False
+
+    # --- MAINTENANCE ---
+    def rebuild(self, spots):
+        """spots: iterable of (lot_id, spot_number, status, reserved_for_faculty)."""
+        with self._lock:
+            self._lots = {}
+            for lot_id, spot_number, status, reserved in spots:
+                self._pool(lot_id).set_spot(spot_number, bool(reserved), status == 'available')
+            self.built = True
+
+    def load_lot(self, lot_id, spots):
+        """Replaces one lot's state (after create/edit); spots as in rebuild()."""
+        with self._lock:
+            pool = self._lots[lot_id] = _LotPool()
+            for _, spot_number, status, reserved in spots:
+                pool.set_spot(spot_number, bool(reserved), status == 'available')
+
+    def drop_lot(self, lot_id):
+        with self._lock:
+            self._lots.pop(lot_id, None)
+
+    def set_spot(self, lot_id, spot_number, reserved=None, free=None):
+        """Updates one spot; reserved / free left as None keep their current value."""
+        with self._lock:
+            pool = self._pool(lot_id)
+            if reserved is None: reserved = pool.reserved.get(spot_number, False)
+            if free is None: free = spot_number in pool.reserved_free or spot_number in pool.open_free
+            pool.set_spot(spot_number, reserved, free)
+
+    def _pool(self, lot_id):
+        pool = self._lots.get(lot_id)
+        if pool is None: pool = self._lots[lot_id] = _LotPool()
+        return pool
+
+    # --- ALLOCATION ---
+    def take(self, lot_ids, faculty):
+        """
+        Marks the lowest free spot of the first lot in `lot_ids` that has one as taken,
+        and returns (lot_id, spot_number), or None when every lot is full.
+        """
+        with self._lock:
+            for lot_id in lot_ids:
+                pool = self._lots.get(lot_id)
+                if pool is None: continue
+                spot_number = pool.lowest_free(faculty)
+                if spot_number is not None:
+                    pool.set_spot(spot_number, pool.reserved[spot_number], free=False)
+                    return lot_id, spot_number
+            return None
+
+    def release(self, lot_id, spot_number):
+        self.set_spot(lot_id, spot_number, free=True)
+
+    def is_reserved(self, lot_id, spot_number):
+        with self._lock:
+            pool = self._lots.get(lot_id)
+            return bool(pool and pool.reserved.get(spot_number))
+
+    def stats(self):
+        with self._lock:
+            return {lot_id: pool.counts() for lot_id, pool in self._lots.items()}
+
+    def summaries(self, lot_ids=None):
+        """lot_id -> summary() for the given lots (default all)."""
+        with self._lock:
+            ids = self._lots.keys() if lot_ids is None else [i for i in lot_ids if i in self._lots]
+            return {lot_id: self._lots[lot_id].summary() for lot_id in ids}
+
+
+# --- SHARED INSTANCE (One per process, built on first use) ---
+allocator = SpotAllocator()
+
+def _spot_rows(lot_id=None):
+    from models import ParkingSpot
+    query = ParkingSpot.query.with_entities(ParkingSpot.lot_id, ParkingSpot.spot_number,
+                                            ParkingSpot.status, ParkingSpot.reserved_for_faculty)
+    if lot_id is not None: query = query.filter_by(lot_id=lot_id)
+    return query.all()
+
+def ensure_built():
+    """
+    Loads every ParkingSpot (one query) the first time it is needed.
+    Requires an app context.
+    """
+    if allocator.built: return allocator
+    with allocator._lock:
+        if not allocator.built:
+            allocator.rebuild(_spot_rows())
+    return allocator
+
+# Hooks for the write paths; like plate_index, an unbuilt allocator reads the DB on first use anyway
+def lot_changed(lot_id):
+    if allocator.built: allocator.load_lot(lot_id, _spot_rows(lot_id))
+
+def lot_deleted(lot_id):
+    if allocator.built: allocator.drop_lot(lot_id)
+
+def spot_changed(spot):
+    if allocator.built:
+        allocator.set_spot(spot.lot_id, spot.spot_number, reserved=bool(spot.reserved_for_faculty),
+                           free=spot.status == 'available')
+
+def spot_released(lot_id, spot_number):
+    if allocator.built: allocator.release(lot_id, spot_number)
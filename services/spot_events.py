@@ -0,0 +1,140 @@
+import json
+import queue
+import threading
+from collections import deque
+
+# --- LIVE SPOT EVENTS (Process-local pub/sub behind /api/admin/events) ---
+# Gate and admin handlers publish after their commit; every open dashboard gets the
+# delta over Server-Sent Events instead of reloading the page:
+#   spot    {"seq", "lot_id", "spot_number", "status", "reserved", "lot": {counts}}
+#   lot     {"seq", "lot_id", "deleted", "lot": {counts}}    lot created / resized / deleted
+#   resync  {"seq", "reason", "lots": {lot_id: counts}}      bulk change (batch replay, journal replay)
+# Counts are absolute values from the gate's in-memory spot allocator (same keys as
+# occupancy.lot_summaries()), so applying an event twice is harmless and the stream
+# itself never queries the database. A client that reconnects with Last-Event-ID gets
+# the events it missed from the history, or a fresh snapshot when they are gone.
+
+class _Subscriber:
+    __slots__ = ('queue',)
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Too far behind: drop what it has and send a snapshot instead (None marker)
+            with self.queue.mutex: self.queue.queue.clear()
+            self.queue.put_nowait(None)
+
+
+class SpotEventBus:
+    def __init__(self, history=1024, queue_size=256):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self.seq = 0
+        self.published = 0
+
+    def publish(self, kind, counts=None, **fields):
+        """`counts` is called under the bus lock, so later events never carry older counts."""
+        with self._lock:
+            self.seq += 1
+            event = {"seq": self.seq, "type": kind, **fields}
+            if counts: event.update(counts())
+            self._history.append(event)
+            self.published += 1
+            for sub in self._subscribers: sub.push(event)
+        return event
+
+    def subscribe(self, since=None):
+        """
+        Returns (subscriber, missed events after `since`). Missed is None when the client
+        needs a snapshot: first connect, or `since` has already left the history.
+        """
+        sub = _Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+            if since is None or since > self.seq: return sub, None
+            if since == self.seq: return sub, []
+            if not self._history or self._history[0]["seq"] > since + 1: return sub, None
+            return sub, [e for e in self._history if e["seq"] > since]
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stats(self):
+        with self._lock:
+            return {"seq": self.seq, "published": self.published,
+                    "subscribers": len(self._subscribers), "history": len(self._history)}
+
+
+# --- SHARED BUS (One per web process) ---
+_bus = None
+_bus_lock = threading.Lock()
+
+def get_bus(config=None):
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                if config is None:
+                    from flask import current_app
+                    config = current_app.config
+                _bus = SpotEventBus(history=config.get('SPOT_EVENTS_HISTORY', 1024),
+                                    queue_size=config.get('SPOT_EVENTS_QUEUE', 256))
+    return _bus
+
+# Publishers (call after the commit; they need an app context to build the allocator once)
+def spot(lot_id, spot_number, status, reserved=None):
+    from services import spot_allocator
+    allocator = spot_allocator.ensure_built()
+    if reserved is None: reserved = allocator.is_reserved(lot_id, spot_number)
+    return get_bus().publish('spot', lot_id=lot_id, spot_number=spot_number, status=status, reserved=bool(reserved),
+                             counts=lambda: {"lot": allocator.summaries([lot_id]).get(lot_id)})
+
+def lot(lot_id, deleted=False):
+    from services import spot_allocator
+    allocator = spot_allocator.ensure_built()
+    return get_bus().publish('lot', lot_id=lot_id, deleted=deleted,
+                             counts=lambda: {"lot": None if deleted else allocator.summaries([lot_id]).get(lot_id)})
+
+def resync(reason):
+    from services import spot_allocator
+    allocator = spot_allocator.ensure_built()
+    return get_bus().publish('resync', reason=reason, counts=lambda: {"lots": allocator.summaries()})
+
+
+# --- SSE FORMAT ---
+def format_sse(event):
+    # Event type as the SSE "event:" name, seq as "id:" so the browser sends Last-Event-ID on reconnect
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def stream(since=None, heartbeat=15.0):
+    """
+    Generator of SSE text for one client. Call it inside the request (the allocator the
+    counts come from is built there); iterating needs no app context afterwards.
+    """
+    from services import spot_allocator
+    allocator = spot_allocator.ensure_built()
+    bus = get_bus()
+
+    def generate():
+        sub, missed = bus.subscribe(since)
+        try:
+            yield "retry: 3000\n\n"
+            if missed is None: missed = [{"seq": bus.seq, "type": "snapshot", "lots": allocator.summaries()}]
+            for event in missed: yield format_sse(event)
+            while True:
+                try:
+                    event = sub.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"; continue
+                if event is None: event = {"seq": bus.seq, "type": "snapshot", "lots": allocator.summaries()}
+                yield format_sse(event)
+        finally:
+            bus.unsubscribe(sub)
+    return generate()
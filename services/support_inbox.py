@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from sqlalchemy import String, column, or_, table, text, tuple_, type_coerce
+
+# --- SUPPORT INBOX (Admin console over support_messages) ---
+# page(): keyset pagination, newest first on (created_at, msg_id), optionally one status
+# (ix_support_status_created) and a search over message + sender_email through the FTS5
+# index from models.SUPPORT_FTS_DDL. created_at is written by the database (no microseconds),
+# so cursors carry the stored text and are compared as text, never re-formatted. Search
+# results page on msg_id alone, in the index's own order.
+
+STATUSES = ('unread', 'read', 'replied')
+FTS = table('support_messages_fts', column('rowid'), column('support_messages_fts'))
+
+_fts = None  # Whether support_messages_fts exists; looked up once per process
+
+def fts_available():
+    global _fts
+    if _fts is None:
+        from extensions import db
+        _fts = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'support_messages_fts'")).first() is not None \
+            if db.engine.dialect.name == 'sqlite' else False
+    return _fts
+
+def match_expression(query):
+    """
+    Search box text -> FTS5 MATCH expression: every word must appear, as a word prefix
+    ('park gate' finds "parking at gate 2"). Words are quoted, so FTS5 operators typed
+    by the admin are searched for literally instead of raising a syntax error.
+    """
+    words = [w.replace('"', '""') for w in (query or '').split()]
+    return ' '.join(f'"{w}"*' for w in words if w.strip('"'))
+
+def encode_cursor(created_raw, msg_id):
+    return f"{created_raw}~{msg_id}"
+
+def decode_cursor(cursor):
+    """'2026-10-17 08:00:00~42' -> ('2026-10-17 08:00:00', 42), or None (first page) if unusable."""
+    created, _, msg_id = (cursor or '').partition('~')
+    try:
+        datetime.fromisoformat(created)
+        return created, int(msg_id)
+    except ValueError:
+        return None
+
+def page(after=None, status=None, query=None, limit=50):
+    """One page of messages, newest first. Returns (SupportMessage list, next cursor or None)."""
+    from extensions import db
+    from models import SupportMessage as M
+
+    created_raw = type_coerce(M.created_at, String)   # Same column, read and compared as stored
+    q = db.session.query(M, created_raw)
+    if status in STATUSES: q = q.filter(M.status == status)
+    position = decode_cursor(after)
+    expression = match_expression(query)
+    if expression and fts_available():
+        # Walk the FTS index itself newest first (its rowid is msg_id, which grows with
+        # created_at), so a word in half the inbox still reads one page, not every match
+        q = q.join(FTS, FTS.c.rowid == M.msg_id).filter(FTS.c.support_messages_fts.match(expression))
+        if position: q = q.filter(FTS.c.rowid < position[1])
+        order = (FTS.c.rowid.desc(),)
+    else:
+        if query and query.strip():
+            like = f"%{query.strip()}%"
+            q = q.filter(or_(M.message.ilike(like), M.sender_email.ilike(like)))
+        if position: q = q.filter(tuple_(created_raw, M.msg_id) < position)
+        order = (M.created_at.desc(), M.msg_id.desc())
+    rows = q.order_by(*order).limit(limit + 1).all()
+    rows, more = rows[:limit], len(rows) > limit
+    return [m for m, _ in rows], (encode_cursor(rows[-1][1], rows[-1][0].msg_id) if more else None)
+
+def unread_count():
+    from models import SupportMessage
+    return SupportMessage.query.filter_by(status='unread').count()
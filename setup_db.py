@@ -1,3 +1,6 @@
+import os
+os.environ.setdefault('ENABLE_GATE', '0') # Maintenance scripts never need the gate's OCR stack
+
 from app import create_app
 from extensions import db
 
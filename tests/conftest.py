@@ -0,0 +1,52 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('ENABLE_GATE', '0')       # No OCR stack or cameras
+os.environ.setdefault('OUTBOX_SENDER', '0')     # Queued mail stays in the table
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on a fresh SQLite file, inside an app context, with the per-process caches reset."""
+    import config
+    monkeypatch.setattr(config.Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setattr(config.Config, 'GATE_JOURNAL_PATH', str(tmp_path / 'gate_journal.jsonl'))
+    from app import create_app
+    from extensions import db
+    from services import plate_index, spot_allocator, support_inbox
+    monkeypatch.setattr(plate_index, 'plate_index', plate_index.PlateIndex())
+    monkeypatch.setattr(plate_index, '_lengths', None)
+    monkeypatch.setattr(plate_index, '_signature', None)
+    monkeypatch.setattr(spot_allocator, 'allocator', spot_allocator.SpotAllocator())
+    monkeypatch.setattr(support_inbox, '_fts', None)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def campus(app):
+    """Two lots of five spots (spot 1 reserved for faculty), a student and a faculty member with a car each."""
+    from extensions import db
+    from models import User, Vehicle, ParkingLot, ParkingSpot
+    lots = [ParkingLot(location=name, number_of_spots=5) for name in ("A", "B")]
+    db.session.add_all(lots); db.session.flush()
+    db.session.add_all([ParkingSpot(lot_id=lot.lot_id, spot_number=n, reserved_for_faculty=n == 1)
+                        for lot in lots for n in range(1, 6)])
+    student = User(name="Stu", email="stu@rvce.edu.in", phone="9", usn="1RV22CS001", password_hash="x",
+                   role='student', department='CSE', preferences="1,2")
+    faculty = User(name="Fac", email="fac@rvce.edu.in", phone="9", password_hash="x",
+                   role='faculty', department='ECE', preferences="2,1")
+    db.session.add_all([student, faculty]); db.session.flush()
+    db.session.add_all([Vehicle(license_plate='KA01AB1234', type='car', user_id=student.user_id),
+                        Vehicle(license_plate='KA05MN4321', type='car', user_id=faculty.user_id)])
+    db.session.commit()
+    return {"lots": [lot.lot_id for lot in lots], "student": student, "faculty": faculty, "now": datetime.now()}
@@ -0,0 +1,49 @@
+from extensions import db
+from models import ParkingLot, ParkingSpot
+from services import spot_allocator
+from blueprints.gate import allocate_spot
+
+
+def other_process(lot_id, spot_number, **values):
+    # A write this process's allocator never hears about
+    ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number).update(values)
+    db.session.commit()
+
+
+def lots(campus):
+    return ParkingLot.query.filter(ParkingLot.lot_id.in_(campus["lots"])).order_by(ParkingLot.lot_id).all()
+
+
+def test_spot_freed_elsewhere_is_found_before_campus_full(app, campus):
+    spot_allocator.ensure_built()
+    for _ in range(10): allocate_spot(lots(campus), faculty=True)
+    db.session.commit()
+    assert allocate_spot(lots(campus), faculty=True) == (None, None)
+
+    lot_b = campus["lots"][1]
+    other_process(lot_b, 3, status='available')
+    lot, spot_number = allocate_spot(lots(campus), faculty=True)
+    assert (lot.lot_id, spot_number) == (lot_b, 3)
+
+
+def test_spot_reserved_elsewhere_is_not_given_to_a_student(app, campus):
+    spot_allocator.ensure_built()
+    lot_a = campus["lots"][0]
+    other_process(lot_a, 2, reserved_for_faculty=True)
+    lot, spot_number = allocate_spot(lots(campus), faculty=False)
+    assert (lot.lot_id, spot_number) == (lot_a, 3)
+    db.session.commit()
+    assert ParkingSpot.query.filter_by(lot_id=lot_a, spot_number=2).one().status == 'available'
+    assert spot_allocator.allocator.is_reserved(lot_a, 2)
+
+
+def test_spot_unreserved_elsewhere_is_offered_to_students(app, campus):
+    spot_allocator.ensure_built()
+    for _ in range(8): allocate_spot(lots(campus), faculty=False)
+    db.session.commit()
+    assert allocate_spot(lots(campus), faculty=False) == (None, None)
+
+    lot_a = campus["lots"][0]
+    other_process(lot_a, 1, reserved_for_faculty=False)
+    lot, spot_number = allocate_spot(lots(campus), faculty=False)
+    assert (lot.lot_id, spot_number) == (lot_a, 1)
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from services import approvals
+
+
+@pytest.fixture
+def queue(app, campus):
+    from extensions import db
+    from models import PendingVehicle
+    base = datetime(2026, 1, 1)
+    rows = [PendingVehicle(user_id=campus["student" if i % 2 else "faculty"].user_id, license_plate=f'KA09PV{1000 + i}',
+                           model='Car', status='pending', created_at=base + timedelta(seconds=i // 2)) for i in range(7)]
+    rows.append(PendingVehicle(user_id=campus["student"].user_id, license_plate='KA01AB1234', model='Car',
+                               status='pending', created_at=base + timedelta(minutes=5)))
+    db.session.add_all(rows); db.session.commit()
+    return [r.id for r in rows]
+
+
+def test_approve_registers_vehicles_and_is_not_repeated(queue):
+    from models import PendingVehicle, Vehicle
+    result = approvals.decide(queue[:3], 'approve')
+    assert result == {"done": 3, "skipped": [], "conflict": False}
+    approved = Vehicle.query.filter(Vehicle.license_plate.in_(['KA09PV1000', 'KA09PV1001', 'KA09PV1002'])).all()
+    assert len(approved) == 3 and all(v.plate_canonical for v in approved)
+    assert {p.status for p in PendingVehicle.query.filter(PendingVehicle.id.in_(queue[:3]))} == {'approved'}
+    # Already decided: nothing left to claim
+    assert approvals.decide(queue[:3], 'reject') == {"done": 0, "skipped": [], "conflict": False}
+
+
+def test_already_registered_plate_is_skipped(queue):
+    result = approvals.decide([queue[-1], queue[0]], 'approve')
+    assert result == {"done": 1, "skipped": [('KA01AB1234', "already registered")], "conflict": False}
+
+
+def test_reject_keeps_the_row_as_rejected(queue):
+    from models import PendingVehicle, Vehicle
+    assert approvals.decide(queue[3:5], 'reject')["done"] == 2
+    assert {p.status for p in PendingVehicle.query.filter(PendingVehicle.id.in_(queue[3:5]))} == {'rejected'}
+    assert Vehicle.query.filter_by(license_plate='KA09PV1003').first() is None
+
+
+def test_request_claimed_by_another_admin_meanwhile_saves_nothing(queue):
+    from extensions import db
+    from models import PendingVehicle, Vehicle
+
+    def other_admin(conn, cursor, statement, parameters, context, executemany):
+        # Between decide()'s read and its claim, another admin rejects one of the requests
+        if statement.startswith("UPDATE pending_vehicles"):
+            cursor.execute("UPDATE pending_vehicles SET status = 'rejected' WHERE id = ?", (queue[1],))
+    event.listen(db.engine, 'before_cursor_execute', other_admin)
+    try:
+        result = approvals.decide(queue[:3], 'approve')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', other_admin)
+    assert result == {"done": 0, "skipped": [], "conflict": True}
+    assert Vehicle.query.filter(Vehicle.license_plate.like('KA09PV%')).count() == 0
+    assert PendingVehicle.query.filter(PendingVehicle.id.in_([queue[0], queue[2]]), PendingVehicle.status == 'pending').count() == 2
+
+
+def test_pages_walk_the_queue_once_in_order(queue):
+    seen, cursor = [], None
+    while True:
+        items, cursor = approvals.page(after=cursor, limit=3)
+        seen += [item["id"] for item in items]
+        if not cursor: break
+    assert seen == queue
+
+
+def test_department_filter_is_case_insensitive(queue, campus):
+    items, _ = approvals.page(department='ece', role='faculty')
+    assert items and {item["user_email"] for item in items} == {campus["faculty"].email}
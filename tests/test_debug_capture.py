@@ -0,0 +1,38 @@
+import json
+import threading
+
+import numpy
+from sqlalchemy import event
+
+from extensions import db
+from services import debug_capture, plate_index
+from blueprints.gate import capture_debug
+
+
+def test_denied_scan_loads_the_best_plate_on_the_writer(app, campus, tmp_path, monkeypatch):
+    capture = debug_capture.DebugCapture(str(tmp_path / 'captures'))
+    monkeypatch.setattr(debug_capture, '_capture', capture)
+    plate_index.ensure_built()   # As the decision before it did
+
+    scan_thread, queries = threading.get_ident(), []
+    def on_scan_thread(conn, cursor, statement, *args):
+        if threading.get_ident() == scan_thread: queries.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', on_scan_thread)
+    try:
+        capture_debug('plate_entry', numpy.zeros((8, 8, 3), numpy.uint8), 404,
+                      {"status": "denied", "msg": "No Plate Found"}, 'INDKA01A8I234')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', on_scan_thread)
+    capture.flush()
+
+    assert queries == []
+    meta = json.loads(next((tmp_path / 'captures').glob('*.json')).read_text())
+    assert meta["best_plate"] == 'KA01AB1234' and meta["score"] >= 0.65
+
+
+def test_failing_resolve_still_writes_the_capture(tmp_path):
+    capture = debug_capture.DebugCapture(str(tmp_path))
+    capture.submit('exit_plate', numpy.zeros((8, 8, 3), numpy.uint8), 404, {"soup": "X"}, resolve=lambda: 1 / 0)
+    capture.flush()
+    meta = json.loads(next(tmp_path.glob('*.json')).read_text())
+    assert "division by zero" in meta["resolve_error"] and capture.stats()["written"] == 1
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from services import gate_journal, spot_allocator
+from services.gate_journal import GateJournal, _hold_lock, _read_records, _write_records, process_path
+
+
+def record(seq, kind, plate, lot_id, spot_number, minute):
+    return {"seq": seq, "type": kind, "plate": plate, "lot_id": lot_id, "spot_number": spot_number,
+            "time": (datetime(2026, 5, 1, 8, 0) + timedelta(minutes=minute)).isoformat()}
+
+
+@pytest.fixture
+def base(tmp_path):
+    return str(tmp_path / 'gate_journal.jsonl')
+
+
+def journal(app, base, pid):
+    return GateJournal(app, process_path(base, pid), conflicts_path=base + '.conflicts', base_path=base)
+
+
+def test_each_process_writes_its_own_file(base):
+    assert process_path(base, 4711).endswith('gate_journal.4711.jsonl')
+    assert process_path(base) == process_path(base, os.getpid())
+
+
+def test_replaying_one_journal_leaves_another_processes_records_alone(app, base):
+    # The shared file used to be rewritten from one process's records (user-018)
+    _write_records(process_path(base, 1), [record(1, 'entry', 'KA01AB1234', 1, 2, 0)])
+    _write_records(process_path(base, 2), [record(1, 'entry', 'KA05MN4321', 2, 2, 1)])
+    first, second = journal(app, base, 1), journal(app, base, 2)
+    first._drop(len(first))
+    assert len(first) == 0 and _read_records(first.path) == []
+    assert [r["plate"] for r in _read_records(second.path)] == ['KA05MN4321'] and len(second) == 1
+
+
+def test_dead_process_journal_is_adopted_in_time_order(app, base):
+    live = journal(app, base, 2)
+    live._remember(record(1, 'entry', 'KA05MN4321', 2, 2, 5)); _write_records(live.path, live._records)
+    _write_records(process_path(base, 1), [record(1, 'entry', 'KA01AB1234', 1, 2, 0),
+                                           record(2, 'exit', 'KA01AB1234', 1, 2, 9)])
+    open(process_path(base, 1) + '.lock', 'w').close()     # Its lock file, no longer held by anyone
+
+    assert live.adopt_orphans() == 2
+    assert [(r["seq"], r["plate"], r["type"]) for r in _read_records(live.path)] == \
+           [(1, 'KA01AB1234', 'entry'), (2, 'KA05MN4321', 'entry'), (3, 'KA01AB1234', 'exit')]
+    assert not os.path.exists(process_path(base, 1)) and not os.path.exists(process_path(base, 1) + '.lock')
+    assert live.pending('KA01AB1234')["type"] == 'exit' and live.adopted == 2
+
+
+def test_journal_of_a_running_process_is_not_adopted(app, base):
+    other = process_path(base, 1)
+    _write_records(other, [record(1, 'entry', 'KA01AB1234', 1, 2, 0)])
+    owner = _hold_lock(other + '.lock', block=True)          # That process is alive
+    live = journal(app, base, 2)
+    assert live.adopt_orphans() == 0 and os.path.exists(other)
+    owner.close()                                            # ...and now it died
+    assert live.adopt_orphans() == 1 and not os.path.exists(other)
+
+
+def test_replay_writes_transactions_and_frees_the_journal(app, campus, base):
+    from models import ParkingSpot, ParkingTransaction
+    lot = campus["lots"][0]
+    live = journal(app, base, 2)
+    for r in (record(1, 'entry', 'KA01AB1234', lot, 2, 0), record(2, 'entry', 'KA05MN4321', lot, 3, 1),
+              record(3, 'exit', 'KA01AB1234', lot, 2, 30)):
+        live._remember(r)
+    assert live.reconcile() == 3 and len(live) == 0
+    open_txns = ParkingTransaction.query.filter_by(exit_time=None).all()
+    assert [(t.license_plate, t.spot_number) for t in open_txns] == [('KA05MN4321', 3)]
+    assert ParkingSpot.query.filter_by(lot_id=lot, spot_number=3).one().status == 'occupied'
+    assert ParkingSpot.query.filter_by(lot_id=lot, spot_number=2).one().status == 'available'
+
+
+def test_failed_replay_gives_back_the_spots_it_took(app, campus, base, monkeypatch):
+    # A rolled-back replay must not leave allocator spots taken for records that never landed (user-018)
+    from extensions import db
+    from models import ParkingSpot, ParkingTransaction
+    lot_a, lot_b = campus["lots"]
+    allocator = spot_allocator.ensure_built()
+    # Spot B/1 went to another car in the database; the journal says KA05MN4321 parked there
+    ParkingSpot.query.filter_by(lot_id=lot_b, spot_number=1).update({'status': 'occupied'})
+    db.session.add(ParkingTransaction(license_plate='KA99ZZ9999', lot_id=lot_b, spot_number=1, entry_time=datetime.now()))
+    db.session.commit()
+    allocator.set_spot(lot_b, 1, free=False)
+    live = journal(app, base, 2)
+    live._remember(record(1, 'entry', 'KA05MN4321', lot_b, 1, 0))
+    before = allocator.stats()
+
+    def locked(): raise OperationalError("COMMIT", {}, sqlite3.OperationalError("database is locked"))
+    monkeypatch.setattr(db.session, 'commit', locked)
+    assert live.reconcile() == 0
+    monkeypatch.undo()
+
+    assert allocator.stats() == before and len(live) == 1 and "database is locked" in live.last_error
+
+
+def test_record_the_database_rejects_goes_to_conflicts_and_the_rest_replays(app, campus, base, monkeypatch):
+    # One bad record used to fail the whole batch on every pass, forever (user-018)
+    from models import ParkingTransaction
+    lot_a, lot_b = campus["lots"]
+    live = journal(app, base, 2)
+    live._remember(record(1, 'entry', 'KA01AB1234', lot_a, 2, 0))
+    live._remember(record(2, 'entry', 'KA05MN4321', lot_b, 2, 1))
+    real_apply = gate_journal._apply
+    def apply(records, touched):
+        if any(r["plate"] == 'KA01AB1234' for r in records): raise ValueError("bad row")
+        return real_apply(records, touched)
+    monkeypatch.setattr(gate_journal, '_apply', apply)
+
+    assert live.reconcile() == 1 and len(live) == 0 and live.last_error is None
+    assert [t.license_plate for t in ParkingTransaction.query.all()] == ['KA05MN4321']
+    quarantined = _read_records(base + '.conflicts')
+    assert [r["plate"] for r in quarantined] == ['KA01AB1234'] and "bad row" in quarantined[0]["conflict"]
+
+
+def test_taken_spot_is_replaced_with_one_the_owner_may_use(app, campus, base):
+    from extensions import db
+    from models import ParkingSpot, ParkingTransaction
+    lot_a, lot_b = campus["lots"]
+    spot_allocator.ensure_built()
+    # Lot A is full, so the student's journaled spot A/1 is gone; lot B's lowest free spot is reserved #1
+    for lot_id, spot_number in [(lot_a, 2), (lot_a, 3), (lot_a, 4), (lot_a, 5), (lot_a, 1)]:
+        ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number).update({'status': 'occupied'})
+        spot_allocator.allocator.set_spot(lot_id, spot_number, free=False)
+    db.session.commit()
+    live = journal(app, base, 2)
+    live._remember(record(1, 'entry', 'KA01AB1234', lot_a, 1, 0))
+
+    assert live.reconcile() == 1
+    txn = ParkingTransaction.query.filter_by(license_plate='KA01AB1234').one()
+    assert (txn.lot_id, txn.spot_number) == (lot_b, 2)
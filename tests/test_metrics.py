@@ -0,0 +1,29 @@
+from services.metrics import BUCKETS, RECENT, Histogram
+
+
+def test_quantiles_pick_from_recent_samples():
+    h = Histogram()
+    for ms in range(100, 0, -1):     # Arrival order must not matter
+        h.observe(ms / 1000)
+    assert h.quantiles() == {"p50_ms": 51.0, "p95_ms": 96.0, "p99_ms": 100.0}
+    assert h.n == 100 and round(h.total, 6) == 5.05
+
+
+def test_quantiles_of_one_sample_and_none():
+    assert Histogram().quantiles() == {}
+    h = Histogram(); h.observe(0.0042)
+    assert h.quantiles() == {"p50_ms": 4.2, "p95_ms": 4.2, "p99_ms": 4.2}
+
+
+def test_quantiles_only_see_the_recent_window():
+    h = Histogram()
+    for _ in range(RECENT): h.observe(10.0)
+    for _ in range(RECENT): h.observe(0.001)
+    assert h.quantiles()["p99_ms"] == 1.0
+    assert h.n == 2 * RECENT
+
+
+def test_buckets_are_upper_bounds_with_an_overflow_bucket():
+    h = Histogram()
+    h.observe(BUCKETS[0]); h.observe(BUCKETS[0] * 1.01); h.observe(BUCKETS[-1] * 2)
+    assert h.counts[0] == 1 and h.counts[1] == 1 and h.counts[-1] == 1
@@ -0,0 +1,42 @@
+import contextlib
+
+from services.motion import AutoScanner, DecisionFeed
+
+
+class FakeApp:
+    def app_context(self): return contextlib.nullcontext()
+
+
+class StoppedCar:
+    """A detector that always says "scan now", and counts rearm() calls."""
+    state = 'scanned'
+    vehicle_left = False
+
+    def __init__(self): self.rearms = 0
+    def update(self, frame): return True
+    def rearm(self): self.rearms += 1
+
+
+def scanner(scan, max_attempts=2):
+    feed, detector = DecisionFeed(), StoppedCar()
+    return AutoScanner(FakeApp(), 'entry', None, scan, feed, detector, max_attempts=max_attempts), feed, detector
+
+
+def test_failed_scan_is_reported_and_retried_within_the_attempt_limit():
+    # An exception in scan() used to leave the detector 'scanned' with nothing on the console (user-005)
+    def broken(frame): raise RuntimeError("OCR worker died\nTraceback ...")
+    auto, feed, detector = scanner(broken, max_attempts=2)
+    auto.process('frame 1'); auto.process('frame 2')
+    events, _ = feed.wait(0, timeout=0)
+    assert [(e["http_status"], e["data"]) for e in events] == \
+           [(500, {"status": "error", "msg": "Auto scan failed: OCR worker died"})] * 2
+    assert detector.rearms == 1 and auto.stats()["errors"] == 2 and auto.stats()["decisions"] == 0
+
+
+def test_unreadable_plate_is_retried_and_a_decision_is_not():
+    auto, feed, detector = scanner(lambda frame: ({"status": "error", "msg": "No plate"}, 404), max_attempts=3)
+    auto.process('frame')
+    assert detector.rearms == 1
+    decided, _, _ = scanner(lambda frame: ({"status": "allowed"}, 200))
+    decided.process('frame')
+    assert decided.detector.rearms == 0 and decided.feed.wait(0, timeout=0)[1] == 1
@@ -0,0 +1,40 @@
+import time
+
+from services.ocr_cache import OCRCache
+
+PLATE = ('plate', 'entry')
+ID_CARD = ('id', 'entry')
+
+
+def test_near_duplicate_frame_hits_within_its_namespace():
+    cache = OCRCache(max_distance=3)
+    cache.put(PLATE, 0b1011_0000, "KA01AB1234")
+    assert cache.get(PLATE, 0b1011_0011) == "KA01AB1234"      # 2 bits away
+    assert cache.get(PLATE, 0b0100_1111) is None                 # 8 bits away
+
+
+def test_plate_and_id_scans_never_share_entries():
+    # The same frame hash under another kind or gate must not return this soup (user-006)
+    cache = OCRCache()
+    cache.put(PLATE, 12345, "KA01AB1234")
+    assert cache.get(ID_CARD, 12345) is None
+    assert cache.get(('plate', 'exit'), 12345) is None
+    cache.put(ID_CARD, 12345, "1RV22CS001")
+    assert cache.get(PLATE, 12345) == "KA01AB1234" and cache.get(ID_CARD, 12345) == "1RV22CS001"
+
+
+def test_closest_hash_of_the_namespace_wins():
+    cache = OCRCache(max_distance=4)
+    cache.put(ID_CARD, 0b0000, "ID-FAR")
+    cache.put(PLATE, 0b0111, "PLATE-FAR")
+    cache.put(PLATE, 0b0001, "PLATE-NEAR")
+    assert cache.get(PLATE, 0b0000) == "PLATE-NEAR"
+
+
+def test_entries_expire_and_evict_oldest_first():
+    cache = OCRCache(max_entries=2, ttl=0.05, max_distance=0)
+    cache.put(PLATE, 1, "a"); cache.put(PLATE, 2, "b"); cache.put(PLATE, 3, "c")
+    assert cache.get(PLATE, 1) is None and cache.get(PLATE, 3) == "c"
+    assert cache.evictions == 1
+    time.sleep(0.1)
+    assert cache.get(PLATE, 3) is None
@@ -0,0 +1,112 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from services.plate_index import PlateIndex, canonical, linear_best_match
+
+STATES = ['KA', 'MH', 'TN', 'AP', 'DL']
+
+
+def random_plate(rng):
+    return f"{rng.choice(STATES)}{rng.randint(1, 99):02d}{rng.choice('ABCDEFGHJKMNPRSTUVWXYZ')}" \
+           f"{rng.choice('ABCDEFGHJKMNPRSTUVWXYZ')}{rng.randint(0, 9999):04d}"
+
+
+def misread(plate, rng):
+    """A plate as OCR returns it: swapped look-alikes, a dropped character, noise around it."""
+    chars = list(plate)
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randrange(len(chars))
+        chars[i] = {'0': 'O', '1': 'I', '5': 'S', '8': 'B', '2': 'Z'}.get(chars[i], rng.choice('ABCXYZ0123'))
+    if rng.random() < 0.3: del chars[rng.randrange(len(chars))]
+    return rng.choice(['', 'IND', 'XX']) + ''.join(chars) + rng.choice(['', 'KARNATAKA', '7'])
+
+
+@pytest.fixture(scope='module')
+def fleet():
+    rng = random.Random(42)
+    plates = list(dict.fromkeys(random_plate(rng) for _ in range(150)))
+    vehicles = [SimpleNamespace(id=i + 1, license_plate=p) for i, p in enumerate(plates)]
+    index = PlateIndex()
+    index.rebuild(vehicles)
+    return vehicles, index
+
+
+def linear(soup, vehicles):
+    vehicle, score = linear_best_match(soup, vehicles)
+    return (vehicle.id if vehicle else None), score
+
+
+def test_match_agrees_with_linear_scan(fleet):
+    vehicles, index = fleet
+    rng = random.Random(7)
+    soups = [misread(rng.choice(vehicles).license_plate, rng) for _ in range(120)]
+    soups += [random_plate(rng) for _ in range(30)]    # Unregistered cars
+    for soup in soups:
+        assert index.match(soup) == linear(soup, vehicles), soup
+
+
+def test_exact_plate_in_soup_wins(fleet):
+    vehicles, index = fleet
+    target = vehicles[123]
+    assert index.match("IND" + target.license_plate + "KARNATAKA") == (target.id, 1.0)
+
+
+def test_ties_go_to_the_lowest_vehicle_id():
+    vehicles = [SimpleNamespace(id=1, license_plate='KA01AB1234'), SimpleNamespace(id=2, license_plate='KA01AB1234')]
+    index = PlateIndex(); index.rebuild(vehicles)
+    assert index.match('KA01AB1234') == linear('KA01AB1234', vehicles) == (1, 1.0)
+    assert index.match('KA01AB12') == linear('KA01AB12', vehicles)
+
+
+def test_add_and_remove_keep_matching_in_step(fleet):
+    vehicles, _ = fleet
+    index = PlateIndex(); index.rebuild(vehicles[:100])
+    index.add_many(vehicles[100:])
+    index.remove(vehicles[10].id)
+    remaining = vehicles[:10] + vehicles[11:]
+    rng = random.Random(3)
+    for _ in range(30):
+        soup = misread(rng.choice(vehicles).license_plate, rng)
+        assert index.match(soup) == linear(soup, remaining), soup
+    assert index.match(vehicles[10].license_plate)[0] != vehicles[10].id
+
+
+def test_canonical_strips_soup_noise_and_confusions():
+    assert canonical('ka-01 ab.1234') == 'KA01A81234'
+
+
+
+
+def test_index_follows_vehicles_changed_by_another_process(app, campus):
+    from sqlalchemy import delete, insert
+    from extensions import db
+    from models import Vehicle
+    from services import plate_index as shared
+
+    assert shared.ensure_built().match('TN22XY987B', min_score=0.8)[0] is None
+    # Written behind this process's hooks, the way another gate / admin process would
+    db.session.execute(insert(Vehicle.__table__), [{"license_plate": 'TN22XY9876', "type": 'car',
+                                                    "user_id": campus["student"].user_id}])
+    db.session.commit()
+    new_id = Vehicle.query.filter_by(license_plate='TN22XY9876').one().id
+    assert shared.ensure_built().match('TN22XY987B', min_score=0.8)[0] == new_id
+
+    db.session.execute(delete(Vehicle.__table__).where(Vehicle.id == new_id))
+    db.session.commit()
+    assert shared.ensure_built().match('TN22XY987B', min_score=0.8)[0] is None
+
+
+def test_own_changes_do_not_reload_the_index(app, campus, monkeypatch):
+    from extensions import db
+    from models import Vehicle
+    from services import plate_index as shared
+
+    index = shared.ensure_built()
+    vehicle = Vehicle.query.filter_by(license_plate='KA01AB1234').one()
+    vehicle_id = vehicle.id
+    db.session.delete(vehicle); db.session.commit()
+    shared.vehicle_removed(vehicle_id)
+    monkeypatch.setattr(index, 'rebuild', lambda vehicles: pytest.fail("index reloaded"))
+    assert shared.ensure_built().match('KA01AB1234')[0] != vehicle_id
@@ -0,0 +1,27 @@
+import pytest
+
+from services.provisioning import parse_ranges, reserved_rule
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1-40, 101-120, 7", [(1, 40), (101, 120), (7, 7)]),
+    ("5", [(5, 5)]),
+    (" 3 - 4 ,", [(3, 4)]),
+    ("", []),
+    (None, []),
+])
+def test_parse_ranges(text, expected):
+    assert parse_ranges(text) == expected
+
+
+@pytest.mark.parametrize("text", ["0-3", "9-2", "a-b", "1-2-3", "-4", "1,,x"])
+def test_parse_ranges_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        parse_ranges(text)
+
+
+def test_reserved_rule_prefers_explicit_ranges():
+    rule = reserved_rule(100, 0.2, parse_ranges("50-52"))
+    assert [n for n in range(1, 101) if rule(n)] == [50, 51, 52]
+    ratio = reserved_rule(100, 0.2)
+    assert [n for n in range(1, 101) if ratio(n)] == list(range(1, 21))
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from services.scan_debounce import ScanDebouncer
+
+ALLOWED = {"status": "allowed", "plate": "KA01AB1234"}
+
+
+def test_first_scan_owns_the_key_and_repeats_get_its_decision():
+    d = ScanDebouncer(window=5)
+    assert d.claim('entry', 'soup') is None
+    d.settle('entry', ['soup', 'KA01AB1234'], ALLOWED, 200, plate='KA01AB1234')
+    assert d.claim('entry', 'soup') == ({**ALLOWED, "repeat": True}, 200)
+    assert d.claim('entry', 'KA01AB1234') == ({**ALLOWED, "repeat": True}, 200)
+    assert d.stats()["suppressed"] == {'entry': 2}
+
+
+def test_decisions_expire_and_are_per_gate():
+    d = ScanDebouncer(window=0.05)
+    d.claim('entry', 'soup'); d.settle('entry', ['soup'], {"status": "denied"}, 400)
+    assert d.claim('exit', 'soup') is None
+    time.sleep(0.1)
+    assert d.claim('entry', 'soup') is None
+
+
+def test_disabled_window_or_empty_key_never_claims():
+    assert ScanDebouncer(window=0).claim('entry', 'soup') is None
+    d = ScanDebouncer()
+    assert d.claim('entry', '') is None and d.claim('entry', '') is None
+
+
+def test_concurrent_scan_waits_for_the_owner():
+    d = ScanDebouncer(window=5)
+    assert d.claim('entry', 'soup') is None
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(d.claim('entry', 'soup')))
+    waiter.start()
+    time.sleep(0.05)
+    assert waiter.is_alive()                 # Coalesced, not racing the owner to the database
+    d.settle('entry', ['soup'], ALLOWED, 200)
+    waiter.join(1)
+    assert result == [({**ALLOWED, "repeat": True}, 200)] and d.stats()["coalesced"] == 1
+
+
+def test_settle_without_a_decision_hands_the_key_to_the_waiter():
+    d = ScanDebouncer(window=5)
+    d.claim('entry', 'soup')
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(d.claim('entry', 'soup')))
+    waiter.start(); time.sleep(0.05)
+    d.settle('entry', ['soup'])              # Owner failed: nothing to remember
+    waiter.join(1)
+    assert result == [None]
+
+
+def test_letting_a_car_through_drops_what_other_gates_remember():
+    d = ScanDebouncer(window=5)
+    d.claim('exit', 'KA01AB1234'); d.settle('exit', ['KA01AB1234'], {"status": "denied"}, 404, plate='KA01AB1234')
+    d.claim('entry', 'soup'); d.settle('entry', ['soup'], ALLOWED, 200, plate='KA01AB1234')
+    assert d.claim('exit', 'KA01AB1234') is None
+    assert d.claim('entry', 'soup') is not None
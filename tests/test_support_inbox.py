@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import support_inbox
+from services.support_inbox import decode_cursor, encode_cursor, match_expression
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("park gate", '"park"* "gate"*'),
+    ('say "hi"', '"say"* """hi"""*'),
+    ("NEAR(a b) OR -x", '"NEAR(a"* "b)"* "OR"* "-x"*'),
+    ('  "" ', ''),
+    (None, ''),
+])
+def test_match_expression_quotes_every_word(query, expected):
+    assert match_expression(query) == expected
+
+
+def test_cursor_round_trip_and_garbage():
+    assert decode_cursor(encode_cursor('2026-10-17 08:00:00', 42)) == ('2026-10-17 08:00:00', 42)
+    for bad in (None, '', 'yesterday~3', '2026-10-17 08:00:00', '2026-10-17 08:00:00~x'):
+        assert decode_cursor(bad) is None
+
+
+@pytest.fixture
+def inbox(app):
+    from extensions import db
+    from models import SupportMessage
+    base = datetime(2026, 3, 1, 9, 0, 0)
+    words = ["refund for gate fee", "sticker lost", "camera misread my plate", "refund please"]
+    db.session.add_all([SupportMessage(sender_email=f"user{i % 3}@rvce.edu.in", message=words[i % 4],
+                                       status='unread' if i % 2 else 'read', created_at=base + timedelta(seconds=i // 3))
+                        for i in range(20)])
+    db.session.commit()
+    # Stored like the database writes it (no microseconds), as contact_admin's rows are
+    db.session.execute(db.text("UPDATE support_messages SET created_at = substr(created_at, 1, 19)"))
+    db.session.commit()
+
+
+def walk(**filters):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = support_inbox.page(after=cursor, limit=3, **filters)
+        seen += [m.msg_id for m in rows]
+        if not cursor: return seen
+
+
+def test_pages_share_a_second_without_skipping_or_repeating(inbox):
+    assert walk() == list(range(20, 0, -1))
+    assert walk(status='unread') == [i for i in range(20, 0, -1) if (i - 1) % 2]
+
+
+@pytest.mark.parametrize("fts", [None, False])   # FTS5 index, then the LIKE fallback
+def test_search_pages(inbox, monkeypatch, fts):
+    monkeypatch.setattr(support_inbox, '_fts', fts)
+    assert walk(query='refund') == [i for i in range(20, 0, -1) if (i - 1) % 4 in (0, 3)]
+    assert walk(query='user2@rvce.edu.in') == [i for i in range(20, 0, -1) if (i - 1) % 3 == 2]
+
+
+def test_search_with_fts_syntax_does_not_raise(inbox):
+    assert support_inbox.fts_available()
+    assert walk(query='"refund" OR NEAR(') == []
+    assert walk(query='misread AND') == []
+    assert walk(query='camera misread') == [i for i in range(20, 0, -1) if (i - 1) % 4 == 2]
@@ -0,0 +1,19 @@
+from sqlalchemy import insert
+
+from extensions import db
+from models import Vehicle
+from services.plate_index import canonical
+
+
+def test_vehicle_plate_canonical_is_filled_on_every_write_path(app, campus):
+    orm = Vehicle.query.filter_by(license_plate='KA01AB1234').one()
+    assert orm.plate_canonical == canonical('KA01AB1234')
+
+    db.session.execute(insert(Vehicle.__table__), [{"license_plate": 'MH12DE5678', "type": 'car',
+                                                    "user_id": campus["student"].user_id}])
+    db.session.commit()
+    assert Vehicle.query.filter_by(license_plate='MH12DE5678').one().plate_canonical == canonical('MH12DE5678')
+
+    orm.license_plate = 'KA01ZZ0001'
+    db.session.commit()
+    assert db.session.get(Vehicle, orm.id).plate_canonical == canonical('KA01ZZ0001')
@@ -0,0 +1,108 @@
+"""
+Stand-in for the IP Webcam phone app used at the gates.
+
+Serves /shot.jpg and an MJPEG /video stream like the real camera, with a
+synthetic frame showing a plate, so the gate can be exercised without hardware.
+Set `camera.plate = None` for an empty scene (no car at the barrier).
+
+Usage:  python tools/fake_camera.py [--port 8080] [--plate KA01AB1234] [--delay 0.05]
+Then point MY_PHONE_IP in blueprints/gate.py at http://127.0.0.1:8080.
+
+From Python (e.g. in tests or benchmarks):
+    server, url = start_fake_camera(plate="KA01AB1234")
+    ...
+    server.shutdown()
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+
+def render_frame(plate, offset=0, width=640, height=360):
+    """Gray road; when `plate` is set, a dark car body with a white plate shifted `offset` px right."""
+    frame = np.full((height, width, 3), 60, dtype=np.uint8)
+    if plate:
+        x = 110 + offset
+        cv2.rectangle(frame, (x, 120), (x + 420, 330), (30, 30, 120), -1)
+        cv2.rectangle(frame, (x + 40, 200), (x + 380, 270), (255, 255, 255), -1)
+        cv2.rectangle(frame, (x + 40, 200), (x + 380, 270), (0, 0, 0), 3)
+        cv2.putText(frame, plate, (x + 55, 250), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (0, 0, 0), 4)
+    return frame
+
+
+class FakeCamera:
+    def __init__(self, plate="KA01AB1234", delay=0.0, fps=10):
+        self.plate = plate
+        self.offset = 0
+        self.delay = delay
+        self.fps = fps
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def jpeg(self):
+        with self._lock:
+            self.requests += 1
+        ok, buf = cv2.imencode('.jpg', render_frame(self.plate, self.offset))
+        return buf.tobytes()
+
+
+def make_handler(camera):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/video':
+                return self.stream()
+            if path != '/shot.jpg':
+                self.send_error(404); return
+            if camera.delay: time.sleep(camera.delay)
+            body = camera.jpeg()
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def stream(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+            self.end_headers()
+            try:
+                while True:
+                    body = camera.jpeg()
+                    self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                    self.wfile.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body + b"\r\n")
+                    time.sleep(1.0 / camera.fps)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def start_fake_camera(host='127.0.0.1', port=0, plate="KA01AB1234", delay=0.0):
+    """Runs the camera on a background thread. Returns (server, base_url); server.camera is the FakeCamera."""
+    camera = FakeCamera(plate=plate, delay=delay)
+    server = ThreadingHTTPServer((host, port), make_handler(camera))
+    server.daemon_threads = True
+    server.camera = camera
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--plate', default="KA01AB1234")
+    parser.add_argument('--delay', type=float, default=0.0, help="Seconds of simulated network latency per shot")
+    args = parser.parse_args()
+
+    camera = FakeCamera(plate=args.plate, delay=args.delay)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(camera))
+    print(f"📷 Fake camera on http://{args.host}:{args.port}/shot.jpg (plate {args.plate})")
+    server.serve_forever()
@@ -0,0 +1,113 @@
+"""
+Local SMTP stand-in for the outbox sender (no TLS, accepts any login).
+
+Keeps every delivered message in memory and counts connections, so tests and
+benchmarks can check that mail went out, and over how many SMTP sessions.
+`delay` adds latency to each connection (like a TLS handshake to smtp.gmail.com)
+and `fail_every=N` rejects every Nth message with a 451, to exercise retries.
+
+Usage:  python tools/fake_smtp.py [--port 1025] [--delay 0.3]
+Then run the app with MAIL_SERVER=127.0.0.1, MAIL_PORT=1025, MAIL_USE_TLS=False.
+
+From Python (e.g. in tests or benchmarks):
+    server, port = start_fake_smtp()
+    ...
+    server.messages, server.connections
+    server.shutdown()
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        if server.delay: time.sleep(server.delay)
+        with server.lock: server.connections += 1
+        self.reply("220 fake-smtp ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw: return
+            line = raw.decode(errors='replace').rstrip("\r\n")
+            cmd = line[:4].upper()
+            if cmd == "EHLO":
+                self.reply("250-fake-smtp"); self.reply("250-AUTH PLAIN LOGIN"); self.reply("250 8BITMIME")
+            elif cmd == "HELO":
+                self.reply("250 fake-smtp")
+            elif cmd == "AUTH":
+                self.reply("235 2.7.0 Authentication successful")
+            elif cmd == "MAIL":
+                mail_from, rcpt_to = line[10:].strip(), []
+                self.reply("250 OK")
+            elif cmd == "RCPT":
+                rcpt_to.append(line[8:].strip()); self.reply("250 OK")
+            elif cmd == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"): break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                with server.lock:
+                    server.received += 1
+                    reject = server.fail_every and server.received % server.fail_every == 0
+                    if not reject:
+                        server.messages.append({"from": mail_from, "to": rcpt_to, "data": b"".join(data)})
+                self.reply("451 4.3.0 Try again later" if reject else "250 OK queued")
+            elif cmd == "RSET":
+                mail_from, rcpt_to = None, []; self.reply("250 OK")
+            elif cmd == "NOOP":
+                self.reply("250 OK")
+            elif cmd == "QUIT":
+                self.reply("221 Bye"); return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, delay=0.0, fail_every=0):
+        super().__init__(address, SMTPHandler)
+        self.delay = delay
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self.received = 0
+
+
+def start_fake_smtp(host="127.0.0.1", port=0, delay=0.0, fail_every=0):
+    """Serves in a daemon thread; returns (server, port)."""
+    server = FakeSMTPServer((host, port), delay=delay, fail_every=fail_every)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--delay', type=float, default=0.0, help="Seconds added to each connection")
+    parser.add_argument('--fail-every', type=int, default=0, help="Reject every Nth message with a 451")
+    args = parser.parse_args()
+
+    server, port = start_fake_smtp(port=args.port, delay=args.delay, fail_every=args.fail_every)
+    print(f"📮 Fake SMTP on 127.0.0.1:{port}  (Ctrl+C to stop)")
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.5)
+            with server.lock: new = server.messages[seen:]
+            for m in new:
+                subject = next((l for l in m["data"].decode(errors='replace').splitlines() if l.startswith("Subject:")), "")
+                print(f"✉️  {m['to']}  {subject}")
+            seen += len(new)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,296 @@
+"""
+EXPLAIN QUERY PLAN audit of the SQL the application actually sends.
+
+A before_cursor_execute listener records every statement the engine executes
+while drive() walks the gate, admin, user and auth routes through the Flask
+test client on a small fixture, plus the work that has no route of its own
+(allocator and plate index rebuilds, gate journal replay, the outbox sender).
+Each distinct statement is then explained with the parameters it first ran
+with. A statement fails the audit when its plan reads a whole table ("SCAN
+<table>" without a usable index), unless every step that ran it is listed in
+LISTINGS as meant to read that table in full (e.g. all parking lots for the
+dashboard).
+
+Usage:  python tools/query_audit.py [--db sqlite:///instance/parking.db] [-v]
+
+Without --db the schema from models.py is created in a throwaway database,
+which checks the indexes the models declare. Pass --db to audit the indexes of
+a real database after running migrate_db.py; driving the routes writes to it,
+so a copy of the file is audited. Exits 1 if any statement falls back to a
+full scan.
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ['ENABLE_GATE'] = '1'         # The gate routes are part of the audit
+os.environ['OUTBOX_SENDER'] = '0'       # drive() runs the sender's rounds itself
+
+from sqlalchemy import event
+
+import config
+
+AUDITED = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+PASSWORD = 'audit'
+
+# Steps that read a whole table on purpose: step -> tables it may scan
+LISTINGS = {
+    "allocator rebuild":     {"parking_spots"},
+    "plate index rebuild":   {"vehicles"},
+    "gate entry student":    {"parking_lots"},    # Preferred-lot order needs every lot
+    "gate entry faculty":    {"parking_lots"},
+    "gate batch replay":     {"parking_lots"},
+    "gate journal replay":   {"parking_lots"},
+    "admin dashboard":       {"parking_lots"},
+    "admin occupancy":       {"parking_lots"},
+    "admin messages":        {"sqlite_master"},   # support_inbox.fts_available(), once per process
+    "user dashboard":        {"parking_lots"},
+    "outbox stats":          {"email_outbox"},    # Counts per status over the whole queue
+}
+
+
+class Capture:
+    """
+    before_cursor_execute listener: {sql: [first parameters, [steps that ran it]]}.
+    Only the driving thread is recorded, so the gate's background threads never
+    lend a statement to the wrong step.
+    """
+
+    def __init__(self):
+        self.statements = {}
+        self.steps = []
+        self.current = None
+        self.thread = threading.get_ident()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.current is None or threading.get_ident() != self.thread: return
+        if not statement.lstrip().upper().startswith(AUDITED): return
+        # executemany gets a list of rows (insertmanyvalues batches already come flattened)
+        if parameters and isinstance(parameters[0], (tuple, list, dict)): parameters = parameters[0]
+        seen = self.statements.setdefault(statement, [parameters, []])
+        if self.current not in seen[1]: seen[1].append(self.current)
+
+    @contextlib.contextmanager
+    def step(self, name):
+        self.current = name
+        if name not in self.steps: self.steps.append(name)
+        try: yield
+        finally: self.current = None
+
+
+def seed():
+    """A fixture every route can act on: two lots, a student, a faculty member and an admin, queued work."""
+    from extensions import db, bcrypt
+    from models import User, Vehicle, ParkingLot, ParkingSpot, PendingVehicle, SupportMessage, OutboxEmail
+    pw = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+    lots = [ParkingLot(location=f"Audit Lot {n}", number_of_spots=10) for n in (1, 2)]
+    db.session.add_all(lots); db.session.flush()
+    db.session.add_all([ParkingSpot(lot_id=lot.lot_id, spot_number=n, reserved_for_faculty=n <= 2)
+                        for lot in lots for n in range(1, 11)])
+    people = {
+        "student": User(name="Audit Student", email="student@query-audit.local", phone="9", usn="1QA22CS001",
+                        password_hash=pw, role='student', department='CSE',
+                        preferences=f"{lots[0].lot_id},{lots[1].lot_id}"),
+        "faculty": User(name="Audit Faculty", email="faculty@query-audit.local", phone="9", password_hash=pw,
+                        role='faculty', department='CSE', preferences=f"{lots[1].lot_id},{lots[0].lot_id}"),
+        "admin": User(name="Audit Admin", email="admin@query-audit.local", phone="9", password_hash=pw,
+                      role='admin', department='ADMIN'),
+    }
+    db.session.add_all(people.values()); db.session.flush()
+    student, faculty = people["student"], people["faculty"]
+    db.session.add_all([
+        Vehicle(license_plate='QA01AA0001', type='car', user_id=student.user_id),
+        Vehicle(license_plate='QA01AA0002', type='car', user_id=student.user_id),
+        Vehicle(license_plate='QA01AA0003', type='car', user_id=faculty.user_id),
+        Vehicle(license_plate='QA01AA0004', type='car', user_id=faculty.user_id),
+        Vehicle(license_plate='QA01AA0005', type='car', user_id=faculty.user_id),
+    ])
+    now = datetime.utcnow()
+    db.session.add_all([PendingVehicle(user_id=student.user_id, license_plate=f'QA09PV{1000 + i}', model='Car',
+                                       status='pending', created_at=now + timedelta(seconds=i)) for i in range(4)])
+    db.session.add_all([SupportMessage(sender_email=f"driver{i}@query-audit.local", message=f"gate camera ticket {i}")
+                        for i in range(3)])
+    db.session.add(OutboxEmail(recipients="driver0@query-audit.local", subject="audit", body="audit",
+                               status='pending', attempts=0, next_attempt_at=now - timedelta(minutes=1)))
+    db.session.commit()
+    return {"lots": [lot.lot_id for lot in lots]}
+
+
+def drive(app, capture, fixture):
+    """Runs every route and background job once, each inside its capture step."""
+    from extensions import db
+    from models import ParkingTransaction, PendingVehicle
+    from services import approvals, gate_journal, outbox, plate_index, spot_allocator, support_inbox
+
+    lot_a, lot_b = fixture["lots"]
+    client = app.test_client()
+    login = lambda email: client.post('/api/auth/login', data={"email": email, "password": PASSWORD})
+
+    # --- background ---
+    with app.app_context():
+        with capture.step("allocator rebuild"): spot_allocator.ensure_built()
+        with capture.step("plate index rebuild"): plate_index.ensure_built()
+
+    # --- gate ---
+    gate = lambda path, body: client.post('/api/gate/' + path, json=body)
+    with capture.step("gate entry student"):
+        gate('scan_plate_entry', {"manual_plate": 'QA01AA0001'})
+        gate('verify_id_and_grant', {"plate": 'QA01AA0001', "expected_usn": '1QA22CS001', "manual_id": '1QA22CS001'})
+    with capture.step("gate entry faculty"): gate('scan_plate_entry', {"manual_plate": 'QA01AA0003'})
+    with capture.step("gate exit"): gate('scan_exit_id', {"manual_id": 'QA01AA0003'})
+    with capture.step("gate batch replay"):
+        gate('events/batch', {"events": [{"type": "entry", "plate": 'QA01AA0004', "time": "2026-01-05T08:00:00"},
+                                         {"type": "exit", "plate": 'QA01AA0004', "time": "2026-01-05T09:00:00"}]})
+    with app.app_context():
+        # The replay itself, on records as a gate writes them (the reconciler thread would race a real journal)
+        picked = spot_allocator.ensure_built().take([lot_b], faculty=True)
+        records = [{"seq": n, "type": kind, "plate": 'QA01AA0005', "lot_id": picked[0], "spot_number": picked[1],
+                    "time": datetime.now().isoformat()} for n, kind in enumerate(('entry', 'exit'), 1)]
+        with capture.step("gate journal replay"):
+            gate_journal._apply(records, set())
+            db.session.commit()
+        parked = ParkingTransaction.query.filter_by(license_plate='QA01AA0001', exit_time=None).first()
+
+    # --- admin ---
+    login("admin@query-audit.local")
+    admin = '/api/admin/'
+    with app.app_context():
+        approvals_after = approvals.page(limit=1)[1]
+        inbox_after = support_inbox.page(limit=1)[1]
+        pending = [p.id for p in PendingVehicle.query.filter_by(status='pending').order_by(PendingVehicle.id)]
+    with capture.step("admin dashboard"): client.get(admin + 'dashboard')
+    with capture.step("admin occupancy"): client.get(admin + 'occupancy')
+    with capture.step("admin lot grid"): client.get(admin + f'lot_grid/{lot_a}')
+    with capture.step("admin spot details"): client.get(admin + f'spot_details/{parked.lot_id}/{parked.spot_number}')
+    with capture.step("admin toggle faculty"):
+        client.post(admin + f'toggle_faculty/{parked.lot_id}/{parked.spot_number}')
+        client.post(admin + f'toggle_faculty/{lot_b}/9')
+    with capture.step("admin create lot"): client.post(admin + 'create_lot', data={"location": "Audit Lot 3", "capacity": 20})
+    with capture.step("admin edit lot grow"): client.post(admin + f'edit_lot/{lot_b}', data={"capacity": 15})
+    with capture.step("admin edit lot shrink"):
+        client.post(admin + f'edit_lot/{lot_b}', data={"capacity": 8})
+        client.post(admin + f'edit_lot/{parked.lot_id}', data={"capacity": parked.spot_number - 1})   # Blocked
+    with capture.step("admin delete lot"):
+        client.post(admin + f'delete_lot/{parked.lot_id}')    # Blocked: a car is parked
+        client.post(admin + f'delete_lot/{lot_b}')
+    with capture.step("admin approvals"):
+        client.get(admin + 'approvals')
+        client.get(admin + 'approvals', query_string={"after": approvals_after})
+        client.get(admin + 'approvals', query_string={"department": "cse", "role": "student"})
+    with capture.step("admin approve / reject"):
+        client.post(admin + 'approvals/bulk', data={"action": "approve", "ids": pending[:2]})
+        client.post(admin + 'approvals/bulk', data={"action": "reject", "ids": pending[2:3]})
+        client.get(admin + 'approve/QA09PV1003')
+        client.get(admin + 'reject/QA09PV1003')
+    with capture.step("admin messages"):
+        client.get(admin + 'messages')
+        client.get(admin + 'messages', query_string={"after": inbox_after})
+        client.get(admin + 'messages', query_string={"status": "unread"})
+        client.get(admin + 'messages', query_string={"q": "camera"})
+    with capture.step("admin mark read / reply"):
+        client.get(admin + 'mark_read/1')
+        client.post(admin + 'reply_message', data={"msg_id": 2, "reply_text": "Sorted."})
+    with capture.step("outbox stats"): client.get(admin + 'outbox_stats')
+
+    # --- user ---
+    login("student@query-audit.local")
+    with capture.step("user dashboard"): client.get('/user/dashboard')
+    with capture.step("user analytics"): client.get('/user/analytics')
+    with capture.step("user register vehicle"):
+        client.post('/user/register_vehicle', data={"license_plate": "QA02BB2222", "model": "Car",
+                                                    "dl_number": "KA0120220001234"})
+    with capture.step("user delete vehicle"): client.post('/user/delete_vehicle/QA01AA0002')
+    with capture.step("user preferences"): client.post('/user/update_preferences', json={"order": [lot_a]})
+
+    # --- auth ---
+    with capture.step("auth login"): login("faculty@query-audit.local")
+    with capture.step("auth contact admin"):
+        client.post('/api/auth/contact_admin', data={"contact_email": "driver9@query-audit.local", "message": "Gate 2 is stuck"})
+    # Registration checks the official student list (CSV); the audit's applicant is on it
+    from blueprints import auth
+    auth.MASTER_STUDENT_LIST["audit.new@rvce.edu.in"] = {"name": "Audit Applicant", "usn": "RVCE22CS999", "branch": "CSE"}
+    with capture.step("auth register"):
+        client.post('/api/auth/register', data={"name": "Audit Applicant", "email": "audit.new@rvce.edu.in",
+                                                "phone": "9876543210", "usn": "RVCE22CS999", "password": "Passw0rd!",
+                                                "role": "student", "department": "CSE"})
+
+    # --- outbox sender ---
+    with app.app_context():
+        sender = outbox.get_sender(app)
+        with capture.step("outbox send"): sender.drain_once()
+        with capture.step("outbox purge"): sender.purge_sent()
+        with capture.step("outbox stats"): sender.stats()
+        db.session.remove()
+
+
+def scanned_tables(plan_rows):
+    """
+    Tables a plan reads in full: 'SCAN parking_transactions' (no index at all). A virtual
+    table scan with constraints ('SCAN support_messages_fts VIRTUAL TABLE INDEX 0:M2', an
+    FTS5 MATCH) is an index lookup; one with none ('INDEX 0:') reads everything.
+    """
+    def indexed(detail):
+        return ' USING ' in detail or bool(detail.partition(' VIRTUAL TABLE INDEX ')[2].partition(':')[2])
+    return [detail.split()[1] for *_, detail in plan_rows
+            if detail.startswith('SCAN ') and not indexed(detail) and not detail.endswith(('CONSTANT ROW', 'CONSTANT ROWS'))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', help="SQLite URI whose indexes to audit (a copy is used; default: fresh schema from models.py)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Print every plan")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix='query_audit_')
+    audit_db = os.path.join(work, 'audit.db')
+    if args.db:
+        if not args.db.startswith('sqlite:///'): sys.exit("--db must be a sqlite:/// URI")
+        shutil.copyfile(args.db[len('sqlite:///'):], audit_db)
+    config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + audit_db
+    config.Config.GATE_JOURNAL_PATH = os.path.join(work, 'gate_journal.jsonl')
+    config.Config.MAIL_SUPPRESS_SEND = True
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    capture = Capture()
+    with app.app_context():
+        db.create_all()
+        fixture = seed()
+        event.listen(db.engine, 'before_cursor_execute', capture)
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):   # The gate prints a line per decision / email
+        drive(app, capture, fixture)
+
+    failures = 0
+    with app.app_context():
+        event.remove(db.engine, 'before_cursor_execute', capture)
+        connection = db.session.connection()
+        for sql, (params, steps) in capture.statements.items():
+            plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all()
+            unexpected = [t for t in scanned_tables(plan) if not all(t in LISTINGS.get(s, ()) for s in steps)]
+            name = steps[0] + (f" +{len(steps) - 1}" if len(steps) > 1 else "")
+            if unexpected:
+                failures += 1
+                print(f"❌ {name:<28} full scan of {', '.join(unexpected)}")
+            elif plan:
+                print(f"✅ {name:<28} {plan[0][-1]}{'  (listing)' if scanned_tables(plan) else ''}")
+            if args.verbose or unexpected:
+                print(f"     {', '.join(steps)}: {' '.join(sql.split())}")
+                for *_, detail in plan: print(f"       {detail}")
+        db.session.rollback()
+
+    print(f"\n{len(capture.statements)} distinct statements captured.")
+    ran = {step for _, steps in capture.statements.values() for step in steps}
+    silent = [step for step in capture.steps if step not in ran]
+    if silent: print(f"⚠️ No SQL from: {', '.join(silent)} (route redirected or failed?)")
+    if failures:
+        print(f"{failures} statements fall back to a full table scan.")
+        sys.exit(1)
+    print("No unexpected full table scans.")